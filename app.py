@@ -1,14 +1,48 @@
+import asyncio
+import os
+import signal
+import sys
+
+from rich.console import Group
+from rich.table import Table
 from textual.app import App, ComposeResult
-from textual.containers import Container, Horizontal, Vertical
-from textual.widgets import Header, Footer, Button, DataTable, Input, Label, Static
-from textual.widgets.data_table import RowKey
+from textual.containers import Container, Horizontal, Vertical, VerticalScroll
+from textual.widgets import Header, Footer, Button, Input, Label, Static
 from textual.screen import Screen, ModalScreen
 from textual import on
 from textual.binding import Binding
+from textual.message import Message
+from textual.worker import get_current_worker
 
+from data_io import EXPORT_FORMATS
 from models import Student
-from data_manager import DataManager
+from data_manager import (
+    CHANGE_ADDED,
+    CHANGE_RELOADED,
+    CHANGE_REMOVED,
+    CHANGE_UPDATED,
+    Change,
+    ConflictError,
+    DataManager,
+    SORT_FIELDS,
+)
+from search_index import normalize_query
+from virtual_table import VirtualTable
+from watcher import DataWatcher
+
+
+# Seconds to wait after the last keystroke before searching as the user types
+SEARCH_DEBOUNCE = 0.2
+
+# Tab showing aggregate statistics rather than a table of records
+STATS_TAB = "stats"
 
+# Bin widths of the GPA and age histograms on the statistics tab
+GPA_BIN_WIDTH = 0.5
+AGE_BIN_WIDTH = 5
+
+# Width in characters of the longest histogram bar
+HISTOGRAM_WIDTH = 30
 
 # Define custom CSS for layout and styling
 CUSTOM_CSS = """
@@ -64,6 +98,10 @@ Screen {
     background: $surface;
 }
 
+#stats-content {
+    padding: 0 1;
+}
+
 #action-bar {
     width: 100%;
     height: 3;
@@ -194,15 +232,6 @@ class AddEditStudentModal(ModalScreen):
         try:
             age = int(age_text)
             gpa = float(gpa_text)
-            
-            if not (0 <= gpa <= 4.0):
-                self.app.notify("GPA must be between 0.0 and 4.0", severity="error")
-                return
-            
-            if not (16 <= age <= 99):
-                self.app.notify("Age must be between 16 and 99", severity="error")
-                return
-                
         except ValueError:
             self.app.notify("Age must be an integer and GPA must be a number", severity="error")
             return
@@ -217,6 +246,13 @@ class AddEditStudentModal(ModalScreen):
             gpa=gpa,
         )
         
+        # Range checks are shared with bulk imports
+        try:
+            student.validate()
+        except ValueError as error:
+            self.app.notify(str(error), severity="error")
+            return
+        
         # Use the callback if provided
         if self.on_save_callback:
             self.on_save_callback(student)
@@ -359,11 +395,6 @@ class AddEditTeacherModal(ModalScreen):
         
         try:
             age = int(age_text)
-            
-            if not (18 <= age <= 99):
-                self.app.notify("Age must be between 18 and 99", severity="error")
-                return
-                
         except ValueError:
             self.app.notify("Age must be an integer", severity="error")
             return
@@ -379,6 +410,13 @@ class AddEditTeacherModal(ModalScreen):
             title=title,
         )
         
+        # Range checks are shared with bulk imports
+        try:
+            teacher.validate()
+        except ValueError as error:
+            self.app.notify(str(error), severity="error")
+            return
+        
         # Use the callback if provided
         if self.on_save_callback:
             self.on_save_callback(teacher)
@@ -480,16 +518,6 @@ class AddEditFacultyModal(ModalScreen):
         try:
             established_year = int(established_year_text)
             num_staff = int(num_staff_text)
-            
-            current_year = 2025  # Update this as needed
-            if not (1500 <= established_year <= current_year):
-                self.app.notify(f"Established year must be between 1500 and {current_year}", severity="error")
-                return
-                
-            if num_staff <= 0:
-                self.app.notify("Number of staff must be positive", severity="error")
-                return
-                
         except ValueError:
             self.app.notify("Year and number of staff must be integers", severity="error")
             return
@@ -505,6 +533,13 @@ class AddEditFacultyModal(ModalScreen):
             num_staff=num_staff,
         )
         
+        # Range checks are shared with bulk imports
+        try:
+            faculty.validate()
+        except ValueError as error:
+            self.app.notify(str(error), severity="error")
+            return
+        
         # Use the callback if provided
         if self.on_save_callback:
             self.on_save_callback(faculty)
@@ -608,6 +643,81 @@ class DeleteFacultyConfirmationModal(ModalScreen):
         self.action_delete()
 
 
+class ExportModal(ModalScreen):
+    """Modal dialog asking where to export the records shown on a tab."""
+    
+    BINDINGS = [Binding("escape", "cancel", "Cancel")]
+    
+    def __init__(self, collection: str, query: str = None, on_export_callback=None):
+        """Initialize with the collection and the search query its table is filtered by."""
+        super().__init__()
+        self.collection = collection
+        self.search_query = query
+        self.on_export_callback = on_export_callback
+    
+    def compose(self) -> ComposeResult:
+        """Create child widgets for the modal."""
+        with Container(id="dialog"):
+            title = f"Export {self.collection.capitalize()}"
+            if self.search_query:
+                title += f" matching '{self.search_query}'"
+            yield Label(title, id="dialog-title")
+            
+            yield Label(f"File ({', '.join(EXPORT_FORMATS.values())}):")
+            yield Input(
+                value=os.path.join(os.getcwd(), f"{self.collection}.csv"),
+                placeholder="Enter file path",
+                id="export-path",
+            )
+            
+            with Horizontal(id="dialog-buttons"):
+                yield Button("Cancel", variant="error", id="cancel-button")
+                yield Button("Export", variant="success", id="export-button")
+    
+    def action_cancel(self) -> None:
+        """Close the modal without exporting."""
+        self.dismiss(None)
+    
+    def action_export(self) -> None:
+        """Start the export and close the modal."""
+        path = self.query_one("#export-path", expect_type=Input).value.strip()
+        if not path:
+            self.app.notify("A file path is required", severity="error")
+            return
+        if self.on_export_callback:
+            self.on_export_callback(path)
+        self.dismiss()
+    
+    @on(Button.Pressed, "#cancel-button")
+    def on_cancel_pressed(self) -> None:
+        """Handle the cancel button press."""
+        self.action_cancel()
+    
+    @on(Button.Pressed, "#export-button")
+    @on(Input.Submitted, "#export-path")
+    def on_export_pressed(self) -> None:
+        """Handle the export button press or Enter in the path field."""
+        self.action_export()
+
+
+class DataChanged(Message):
+    """Posted when the data manager reports a change to a collection."""
+    
+    def __init__(self, change: Change):
+        """Initialize with the change reported by the data manager."""
+        super().__init__()
+        self.change = change
+
+
+class WriteFailed(Message):
+    """Posted when the data manager fails to write changes in the background, or drops some."""
+    
+    def __init__(self, error: Exception):
+        """Initialize with the error raised by the write."""
+        super().__init__()
+        self.error = error
+
+
 class StudentManagerApp(App):
     """Main application for managing university data."""
     
@@ -621,17 +731,33 @@ class StudentManagerApp(App):
         Binding("d", "delete_entity", "Delete"),
         Binding("f", "focus_search", "Search"),
         Binding("r", "refresh", "Refresh"),
+        Binding("x", "export", "Export"),
+        Binding("s", "save", "Save"),
+        Binding("o", "sort", "Sort"),
+        Binding("O", "reverse_sort", "Reverse Sort", show=False),
         Binding("1", "show_students", "Students"),
         Binding("2", "show_teachers", "Teachers"), 
         Binding("3", "show_faculties", "Faculties"),
+        Binding("4", "show_stats", "Stats"),
     ]
     
-    def __init__(self):
+    def __init__(self, data_manager: DataManager = None):
         """Initialize the application."""
         super().__init__()
-        self.data_manager = DataManager()
+        self.data_manager = data_manager if data_manager is not None else DataManager()
         self.deletion_in_progress = False
         self.current_tab = "students"  # Track active tab
+        self._search_timer = None  # Pending search-as-you-type timer
+        # Search query each table is filtered by, or None when it shows everything
+        self._table_queries = {"students": None, "teachers": None, "faculties": None}
+        # Data version each table reflects; older change messages are skipped
+        self._table_versions = {"students": 0, "teachers": 0, "faculties": 0}
+        # Field and direction each table is sorted by, or None for insertion order
+        self._table_sorts = {"students": None, "teachers": None, "faculties": None}
+        self._sort_refresh_pending = set()  # Sorted tables with a re-read scheduled
+        self._reported_warnings = 0  # Load warnings already shown
+        self._stats_refresh_pending = False  # Statistics redraw scheduled
+        self.save_error = None  # Why queued changes could not be written on exit
     
     def compose(self) -> ComposeResult:
         """Create child widgets for the app."""
@@ -642,16 +768,19 @@ class StudentManagerApp(App):
                 yield Button("Students", classes="tab-button -active", id="students-tab")
                 yield Button("Teachers", classes="tab-button", id="teachers-tab")
                 yield Button("Faculties", classes="tab-button", id="faculties-tab")
+                yield Button("Stats", classes="tab-button", id="stats-tab")
             
             with Horizontal(id="search-bar"):
                 yield Label("Search:")
                 yield Input(placeholder="Search by name or other fields", id="search-input")
                 yield Button("Search", variant="primary", id="search-button")
             
-            # Tables for each entity type - without visible parameter
-            yield DataTable(id="students-table", classes="data-table")
-            yield DataTable(id="teachers-table", classes="data-table")
-            yield DataTable(id="faculties-table", classes="data-table")
+            # Tables for each entity type; rows are rendered only when visible
+            yield VirtualTable(id="students-table", classes="data-table")
+            yield VirtualTable(id="teachers-table", classes="data-table")
+            yield VirtualTable(id="faculties-table", classes="data-table")
+            with VerticalScroll(id="stats-table", classes="data-table"):
+                yield Static(id="stats-content")
             
             with Horizontal(id="action-bar"):
                 yield Button("Add", variant="success", id="add-button")
@@ -667,26 +796,212 @@ class StudentManagerApp(App):
         # Initially hide teachers and faculties tables using display property instead of visible
         self.query_one("#teachers-table").display = False
         self.query_one("#faculties-table").display = False
+        self.query_one("#stats-table").display = False
+        
+        if self.data_manager.read_only:
+            self.sub_title = "Read-only"
+            self.query_one("#action-bar").disabled = True
         
         # Load student data
         self._load_students()
+        
+        self._report_load_warnings()
+        
+        # Patch tables in place as data changes instead of reloading them
+        self.data_manager.subscribe(self._on_data_manager_change)
+        self.data_manager.on_write_error = self._on_write_error
+        
+        # Quit as usual, writing queued changes, when asked to terminate
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.exit)
+        except (NotImplementedError, RuntimeError):
+            pass  # Not supported by this event loop, e.g. on Windows
+        
+        # Load the other collections in the background once students are shown
+        self.call_after_refresh(self._start_prefetch)
+    
+    def _start_prefetch(self) -> None:
+        """Load the collections of the hidden tabs in a worker thread."""
+        self.run_worker(self._prefetch, thread=True, group="prefetch")
+        if not self.data_manager.read_only:
+            self.run_worker(self._watch_data, thread=True, group="watcher")
+    
+    def _watch_data(self) -> None:
+        """Apply changes other sessions make to the data files until the app exits.
+        
+        Changes reach the tables as data manager change messages, so only the
+        rows affected are redrawn.
+        """
+        worker = get_current_worker()
+        watcher = DataWatcher(self.data_manager.data_dir)
+        last_error = None
+        try:
+            # Stopped before the data manager is closed; a check already under way
+            # then finds it closed and does nothing
+            while not worker.is_cancelled and not self.data_manager.closed:
+                # Check after timeouts too: inotify misses writes from other hosts
+                # on network drives, which only file stats reveal
+                watcher.wait()
+                try:
+                    if self.data_manager.sync():
+                        self.call_from_thread(self._report_load_warnings)
+                    last_error = None
+                except (OSError, ValueError) as error:
+                    # Report a failure once, not on every check while it lasts
+                    if str(error) != last_error:
+                        last_error = str(error)
+                        self.call_from_thread(
+                            self.notify, f"Could not load changes: {error}", severity="error"
+                        )
+        finally:
+            watcher.close()
+    
+    def _prefetch(self) -> None:
+        """Load every collection and report problems found while loading."""
+        self.data_manager.prefetch()
+        self.call_from_thread(self._report_load_warnings)
+    
+    def _report_load_warnings(self) -> None:
+        """Show load warnings, such as snapshot recovery, not shown yet."""
+        warnings = self.data_manager.load_warnings
+        for warning in warnings[self._reported_warnings:]:
+            self.notify(warning, severity="warning")
+        self._reported_warnings = len(warnings)
+    
+    def on_unmount(self) -> None:
+        """Write pending changes and release the data manager when the app shuts down.
+        
+        A failure is kept in ``save_error`` for the caller to report, as the
+        screen is gone by then.
+        """
+        self.data_manager.unsubscribe(self._on_data_manager_change)
+        self.data_manager.on_write_error = None
+        try:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGTERM)
+        except (NotImplementedError, RuntimeError):
+            pass
+        self.workers.cancel_group(self, "watcher")
+        try:
+            self.data_manager.close()
+        except (OSError, ValueError, RuntimeError) as error:
+            self.save_error = error
+    
+    def _on_write_error(self, error: Exception) -> None:
+        """Forward a background write failure to the app's message queue."""
+        self.post_message(WriteFailed(error))
+    
+    @on(WriteFailed)
+    def on_write_failed(self, message: WriteFailed) -> None:
+        """Warn that changes are not saved yet, or were dropped for someone else's."""
+        if isinstance(message.error, ConflictError):
+            self.notify(str(message.error), severity="warning")
+            return
+        self.notify(f"Could not save changes, retrying: {message.error}", severity="error")
+    
+    def _on_data_manager_change(self, change: Change) -> None:
+        """Forward a data manager change to the app's message queue.
+        
+        Changes may be reported from any thread; posting a message hands them
+        to the UI thread.
+        """
+        self.post_message(DataChanged(change))
+    
+    @on(DataChanged)
+    def on_data_changed(self, message: DataChanged) -> None:
+        """Apply a single change to the affected table."""
+        change = message.change
+        collection = change.collection
+        if self.current_tab == STATS_TAB:
+            self._schedule_stats_refresh()
+            return
+        if collection != self.current_tab:
+            # Hidden tables are left stale and rebuilt once when shown
+            return
+        if change.version <= self._table_versions[collection]:
+            # The table was rebuilt after this change was made
+            return
+        if self._table_sorts[collection] is not None:
+            # A change may move rows anywhere; the sort order is read again once
+            self._schedule_sort_refresh(collection)
+            return
+        # Changes are posted from several threads, so one may overtake another;
+        # a gap in the versions means an earlier change has not arrived yet
+        missed = change.version != self._table_versions[collection] + 1
+        self._table_versions[collection] = change.version
+        table = self.query_one(f"#{collection}-table", expect_type=VirtualTable)
+        
+        query = self._table_queries[collection]
+        
+        if change.kind == CHANGE_RELOADED or missed:
+            if query is not None:
+                # The search box still shows the query, so keep the table filtered by it
+                self._search_table(collection)
+            elif collection == "students":
+                self._load_students()
+            elif collection == "teachers":
+                self._load_teachers()
+            else:
+                self._load_faculties()
+        elif change.kind == CHANGE_ADDED:
+            record = self._get_record(collection, change.record_id)
+            if record is not None and (query is None or self._matches(record, query)):
+                table.add_row(change.record_id)
+        elif change.kind == CHANGE_UPDATED:
+            if query is None:
+                table.refresh_row(change.record_id)
+                return
+            record = self._get_record(collection, change.record_id)
+            if record is None or not self._matches(record, query):
+                table.remove_row(change.record_id)
+            elif change.record_id in table.row_keys:
+                table.refresh_row(change.record_id)
+            else:
+                # It matches now; searching again puts it in its place
+                self._search_table(collection)
+        elif change.kind == CHANGE_REMOVED:
+            table.remove_row(change.record_id)
+    
+    def _get_record(self, collection: str, record_id: str):
+        """Return a record of the named collection, or None if there is none."""
+        if collection == "students":
+            return self.data_manager.get_student_by_id(record_id)
+        if collection == "teachers":
+            return self.data_manager.get_teacher_by_id(record_id)
+        return self.data_manager.get_faculty_by_id(record_id)
+    
+    @staticmethod
+    def _matches(record, query: str) -> bool:
+        """Check whether a record matches a search query."""
+        return normalize_query(query) in record.search_key()
+    
+    def _search_table(self, tab: str) -> None:
+        """Show the records matching a table's search query again, e.g. after a reload."""
+        version = None
+        while version != self.data_manager.get_version(tab):
+            # Search again if the data changed meanwhile, so the results match the version
+            version = self.data_manager.get_version(tab)
+            results = self._search_ids(tab, self._table_queries[tab])
+        self._table_versions[tab] = version
+        if tab == "students":
+            self._show_student_results(results)
+        elif tab == "teachers":
+            self._show_teacher_results(results)
+        else:
+            self._show_faculty_results(results)
     
     def _setup_tables(self) -> None:
         """Setup data tables for all entity types."""
         # Set up students table
-        students_table = self.query_one("#students-table", expect_type=DataTable)
+        students_table = self.query_one("#students-table", expect_type=VirtualTable)
         students_table.add_columns("Name", "Age", "Major", "GPA")
-        students_table.cursor_type = "row"
         
         # Set up teachers table
-        teachers_table = self.query_one("#teachers-table", expect_type=DataTable)
+        teachers_table = self.query_one("#teachers-table", expect_type=VirtualTable)
         teachers_table.add_columns("Name", "Age", "Department", "Title")
-        teachers_table.cursor_type = "row"
         
         # Set up faculties table
-        faculties_table = self.query_one("#faculties-table", expect_type=DataTable)
+        faculties_table = self.query_one("#faculties-table", expect_type=VirtualTable)
         faculties_table.add_columns("Name", "Building", "Head", "Est. Year", "Staff")
-        faculties_table.cursor_type = "row"
     
     # Tab switching methods
     def action_show_students(self) -> None:
@@ -701,6 +1016,10 @@ class StudentManagerApp(App):
         """Switch to Faculties tab."""
         self._switch_tab("faculties")
     
+    def action_show_stats(self) -> None:
+        """Switch to Stats tab."""
+        self._switch_tab(STATS_TAB)
+    
     def _switch_tab(self, tab_name: str) -> None:
         """Switch between different tabs."""
         if self.current_tab == tab_name:
@@ -714,69 +1033,290 @@ class StudentManagerApp(App):
         self.query_one(f"#{self.current_tab}-table").display = False
         self.query_one(f"#{tab_name}-table").display = True
         
+        # Searching and editing only apply to the record tables
+        self.query_one("#search-bar").disabled = tab_name == STATS_TAB
+        self.query_one("#action-bar").disabled = (
+            tab_name == STATS_TAB or self.data_manager.read_only
+        )
+        
         # Update search placeholder
         search_input = self.query_one("#search-input", expect_type=Input)
         if tab_name == "students":
             search_input.placeholder = "Search students by name or major"
         elif tab_name == "teachers":
             search_input.placeholder = "Search teachers by name, department or title"
-        else:
+        elif tab_name == "faculties":
             search_input.placeholder = "Search faculties by name, building or head name"
         
         # Update current tab
         self.current_tab = tab_name
         
-        # Load appropriate data
-        if tab_name == "students":
-            self._load_students()
-        elif tab_name == "teachers":
-            self._load_teachers()
-        else:
-            self._load_faculties()
+        if tab_name == STATS_TAB:
+            self._refresh_stats()
+            return
+        
+        # Tables keep their rows while hidden, so only rebuild one that shows
+        # search results or whose data changed since it was last brought up to date
+        if (self._table_queries[tab_name] is not None or
+                self._table_versions[tab_name] != self.data_manager.get_version(tab_name)):
+            self._load_current_tab()
+    
+    # Row formatting methods, called only for rows being drawn
+    def _student_cells(self, student_id: str) -> tuple:
+        """Return the table cells of a student."""
+        student = self.data_manager.get_student_by_id(student_id)
+        if student is None:
+            return ()
+        return (student.full_name(), str(student.age), student.major, f"{student.gpa:.2f}")
+    
+    def _teacher_cells(self, teacher_id: str) -> tuple:
+        """Return the table cells of a teacher."""
+        teacher = self.data_manager.get_teacher_by_id(teacher_id)
+        if teacher is None:
+            return ()
+        return (teacher.full_name(), str(teacher.age), teacher.department, teacher.title)
+    
+    def _faculty_cells(self, faculty_id: str) -> tuple:
+        """Return the table cells of a faculty."""
+        faculty = self.data_manager.get_faculty_by_id(faculty_id)
+        if faculty is None:
+            return ()
+        return (
+            faculty.name,
+            faculty.building,
+            faculty.head_name,
+            str(faculty.established_year),
+            str(faculty.num_staff),
+        )
     
     # Data loading methods
     def _load_students(self) -> None:
-        """Load students into the table."""
-        table = self.query_one("#students-table", expect_type=DataTable)
-        table.clear()
-        
-        for student in self.data_manager.get_all_students():
-            table.add_row(
-                student.full_name(),
-                str(student.age),
-                student.major,
-                f"{student.gpa:.2f}",
-                key=student.id
-            )
+        """Load students into the table, in the chosen sort order if any."""
+        self._table_queries["students"] = None
+        if self._table_sorts["students"] is not None:
+            self._sort_table("students")
+            return
+        table = self.query_one("#students-table", expect_type=VirtualTable)
+        table.set_rows(self.data_manager.get_all_student_ids(), self._student_cells)
+        self._table_versions["students"] = self.data_manager.get_version("students")
     
     def _load_teachers(self) -> None:
-        """Load teachers into the table."""
-        table = self.query_one("#teachers-table", expect_type=DataTable)
-        table.clear()
-        
-        for teacher in self.data_manager.get_all_teachers():
-            table.add_row(
-                teacher.full_name(),
-                str(teacher.age),
-                teacher.department,
-                teacher.title,
-                key=teacher.id
-            )
+        """Load teachers into the table, in the chosen sort order if any."""
+        self._table_queries["teachers"] = None
+        if self._table_sorts["teachers"] is not None:
+            self._sort_table("teachers")
+            return
+        table = self.query_one("#teachers-table", expect_type=VirtualTable)
+        table.set_rows(self.data_manager.get_all_teacher_ids(), self._teacher_cells)
+        self._table_versions["teachers"] = self.data_manager.get_version("teachers")
     
     def _load_faculties(self) -> None:
-        """Load faculties into the table."""
-        table = self.query_one("#faculties-table", expect_type=DataTable)
-        table.clear()
-        
-        for faculty in self.data_manager.get_all_faculties():
-            table.add_row(
-                faculty.name,
-                faculty.building,
-                faculty.head_name,
-                str(faculty.established_year),
-                str(faculty.num_staff),
-                key=faculty.id
-            )
+        """Load faculties into the table, in the chosen sort order if any."""
+        self._table_queries["faculties"] = None
+        if self._table_sorts["faculties"] is not None:
+            self._sort_table("faculties")
+            return
+        table = self.query_one("#faculties-table", expect_type=VirtualTable)
+        table.set_rows(self.data_manager.get_all_faculty_ids(), self._faculty_cells)
+        self._table_versions["faculties"] = self.data_manager.get_version("faculties")
+    
+    def _load_current_tab(self) -> None:
+        """Load all entities of the current tab into its table."""
+        if self.current_tab == "students":
+            self._load_students()
+        elif self.current_tab == "teachers":
+            self._load_teachers()
+        else:
+            self._load_faculties()
+    
+    # Sorting methods; the data manager keeps each sort order up to date
+    @on(VirtualTable.HeaderSelected)
+    def on_header_selected(self, message: VirtualTable.HeaderSelected) -> None:
+        """Sort by the clicked column, or reverse the order if already sorted by it."""
+        tab = self.current_tab
+        fields = SORT_FIELDS[tab]
+        if message.column >= len(fields):
+            return
+        field = fields[message.column]
+        current = self._table_sorts[tab]
+        self._set_sort(tab, (field, current is not None and current[0] == field and not current[1]))
+    
+    def action_sort(self) -> None:
+        """Sort by the next column, or show insertion order after the last one."""
+        if self.current_tab == STATS_TAB:
+            return
+        tab = self.current_tab
+        fields = SORT_FIELDS[tab]
+        current = self._table_sorts[tab]
+        column = 0 if current is None else fields.index(current[0]) + 1
+        self._set_sort(tab, (fields[column], False) if column < len(fields) else None)
+    
+    def action_reverse_sort(self) -> None:
+        """Reverse the sort order of the current table."""
+        if self.current_tab == STATS_TAB or self._table_sorts[self.current_tab] is None:
+            return
+        field, descending = self._table_sorts[self.current_tab]
+        self._set_sort(self.current_tab, (field, not descending))
+    
+    def _set_sort(self, tab: str, sort) -> None:
+        """Sort a table by ``(field, descending)``, or by insertion order for None."""
+        self._table_sorts[tab] = sort
+        table = self.query_one(f"#{tab}-table", expect_type=VirtualTable)
+        if sort is None:
+            table.set_sort(None)
+        else:
+            table.set_sort(SORT_FIELDS[tab].index(sort[0]), sort[1])
+        if sort is None and self._table_queries[tab] is None:
+            self._load_current_tab()
+        else:
+            self._sort_table(tab)
+    
+    def _sort_table(self, tab: str) -> None:
+        """Fill a table in its sort order, filtered by its search, from a worker thread.
+        
+        Sorting by a field for the first time takes a while on large
+        collections, so the screen keeps responding and shows the new order
+        when it is ready.
+        """
+        query = self._table_queries[tab]
+        sort = self._table_sorts[tab]
+        self.run_worker(
+            lambda: self._run_sort(tab, query, sort),
+            thread=True,
+            exclusive=True,
+            group=f"sort-{tab}",
+        )
+    
+    def _run_sort(self, tab: str, query: str, sort) -> None:
+        """Read a table's rows in sort order from the data manager in a worker thread."""
+        version = self.data_manager.get_version(tab)
+        ids = self._search_ids(tab, query) if query else None
+        if sort is not None:
+            ids = self.data_manager.sorted_ids(tab, sort[0], sort[1], ids)
+        if not get_current_worker().is_cancelled:
+            self.call_from_thread(self._show_sorted, tab, query, sort, ids, version)
+    
+    def _show_sorted(self, tab: str, query: str, sort, ids, version: int) -> None:
+        """Show sorted rows unless the sort or search changed or newer rows are shown."""
+        if sort != self._table_sorts[tab] or query != self._table_queries[tab]:
+            return
+        if version < self._table_versions[tab]:
+            return
+        self._table_versions[tab] = version
+        if tab == "students":
+            self._show_student_results(ids)
+        elif tab == "teachers":
+            self._show_teacher_results(ids)
+        else:
+            self._show_faculty_results(ids)
+    
+    def _schedule_sort_refresh(self, tab: str) -> None:
+        """Read a sorted table's rows again once after a burst of changes."""
+        if tab not in self._sort_refresh_pending:
+            self._sort_refresh_pending.add(tab)
+            self.call_after_refresh(self._refresh_sorted, tab)
+    
+    def _refresh_sorted(self, tab: str) -> None:
+        """Read the rows of a sorted table again."""
+        self._sort_refresh_pending.discard(tab)
+        if self._table_sorts[tab] is not None:
+            self._sort_table(tab)
+    
+    # Statistics methods, reading aggregates the data manager keeps up to date
+    def _schedule_stats_refresh(self) -> None:
+        """Redraw the statistics once after a burst of changes."""
+        if not self._stats_refresh_pending:
+            self._stats_refresh_pending = True
+            self.call_after_refresh(self._refresh_stats)
+    
+    def _refresh_stats(self) -> None:
+        """Draw the statistics tab."""
+        self._stats_refresh_pending = False
+        if self.current_tab != STATS_TAB:
+            return
+        self.query_one("#stats-content", expect_type=Static).update(Group(
+            *self._student_stats_tables(),
+            self._teacher_stats_table(),
+            self._faculty_stats_table(),
+        ))
+    
+    @staticmethod
+    def _histogram_table(title: str, label: str, bins, bin_width: float, fmt: str) -> Table:
+        """Build a table with one bar per histogram bin."""
+        table = Table(title=title, title_justify="left", expand=False)
+        table.add_column(label)
+        table.add_column("Count", justify="right")
+        table.add_column("")
+        largest = max((count for _, count in bins), default=0)
+        for start, count in bins:
+            bar = "█" * max(1, round(count / largest * HISTOGRAM_WIDTH))
+            table.add_row(f"{start:{fmt}}–{start + bin_width:{fmt}}", str(count), bar)
+        return table
+    
+    def _student_stats_tables(self) -> list:
+        """Build the student summary, per-major counts and distributions."""
+        columns = self.data_manager.student_columns
+        gpa = columns.distributions["gpa"]
+        age = columns.distributions["age"]
+        
+        def number(value, fmt):
+            return "-" if value is None else f"{value:{fmt}}"
+        
+        summary = Table(title=f"Students: {len(columns)}", title_justify="left")
+        summary.add_column("")
+        summary.add_column("Mean", justify="right")
+        summary.add_column("Min", justify="right")
+        summary.add_column("Max", justify="right")
+        summary.add_row("GPA", number(gpa.mean, ".2f"), number(gpa.min, ".2f"), number(gpa.max, ".2f"))
+        summary.add_row("Age", number(age.mean, ".1f"), number(age.min, "d"), number(age.max, "d"))
+        
+        majors = Table(title="Students per major", title_justify="left")
+        majors.add_column("Major")
+        majors.add_column("Students", justify="right")
+        majors.add_column("Mean GPA", justify="right")
+        mean_gpa = columns.mean_by_major("gpa")
+        for major, count in sorted(columns.count_by_major().items(), key=lambda item: -item[1]):
+            majors.add_row(major or "(none)", str(count), f"{mean_gpa[major]:.2f}")
+        
+        return [
+            summary,
+            majors,
+            self._histogram_table("GPA distribution", "GPA", gpa.histogram(GPA_BIN_WIDTH),
+                                  GPA_BIN_WIDTH, ".1f"),
+            self._histogram_table("Age distribution", "Age", age.histogram(AGE_BIN_WIDTH),
+                                  AGE_BIN_WIDTH, "d"),
+        ]
+    
+    def _teacher_stats_table(self) -> Table:
+        """Build the teacher counts per department and per title."""
+        stats = self.data_manager.teacher_stats
+        table = Table(title=f"Teachers: {len(stats)}", title_justify="left")
+        table.add_column("Department")
+        table.add_column("Teachers", justify="right")
+        table.add_column("Title")
+        table.add_column("Teachers", justify="right")
+        departments = stats.departments.most_common()
+        titles = stats.titles.most_common()
+        for row in range(max(len(departments), len(titles))):
+            cells = []
+            for counts in (departments, titles):
+                if row < len(counts):
+                    name, count = counts[row]
+                    cells += [name or "(none)", str(count)]
+                else:
+                    cells += ["", ""]
+            table.add_row(*cells)
+        return table
+    
+    def _faculty_stats_table(self) -> Table:
+        """Build the staff numbers per faculty."""
+        stats = self.data_manager.faculty_stats
+        table = Table(title=f"Faculties: {len(stats)}", title_justify="left", show_footer=True)
+        table.add_column("Faculty", footer="Total")
+        table.add_column("Staff", justify="right", footer=str(stats.total_staff))
+        for name, staff in stats.staff_by_faculty.most_common():
+            table.add_row(name or "(none)", str(staff))
+        return table
     
     # Selection methods
     def _get_selected_entity(self):
@@ -790,70 +1330,48 @@ class StudentManagerApp(App):
     
     def _get_selected_student(self):
         """Get the currently selected student."""
-        table = self.query_one("#students-table", expect_type=DataTable)
-        if table.cursor_row is None:
+        table = self.query_one("#students-table", expect_type=VirtualTable)
+        student_id = table.cursor_row_key
+        if student_id is None:
             self.notify("No student selected", severity="warning")
             return None
         
-        try:
-            row_index = table.cursor_row
-            row_keys = list(table.rows.keys())
-            
-            if row_index < 0 or row_index >= len(row_keys):
-                self.notify("Invalid row selection", severity="error")
-                return None
-                
-            row_key = row_keys[row_index]
-            return self.data_manager.get_student_by_id(row_key)
-        except Exception as e:
-            self.notify(f"Error getting selected student: {str(e)}", severity="error")
-            return None
+        return self.data_manager.get_student_by_id(student_id)
     
     def _get_selected_teacher(self):
         """Get the currently selected teacher."""
-        table = self.query_one("#teachers-table", expect_type=DataTable)
-        if table.cursor_row is None:
+        table = self.query_one("#teachers-table", expect_type=VirtualTable)
+        teacher_id = table.cursor_row_key
+        if teacher_id is None:
             self.notify("No teacher selected", severity="warning")
             return None
         
-        try:
-            row_index = table.cursor_row
-            row_keys = list(table.rows.keys())
-            
-            if row_index < 0 or row_index >= len(row_keys):
-                self.notify("Invalid row selection", severity="error")
-                return None
-                
-            row_key = row_keys[row_index]
-            return self.data_manager.get_teacher_by_id(row_key)
-        except Exception as e:
-            self.notify(f"Error getting selected teacher: {str(e)}", severity="error")
-            return None
+        return self.data_manager.get_teacher_by_id(teacher_id)
     
     def _get_selected_faculty(self):
         """Get the currently selected faculty."""
-        table = self.query_one("#faculties-table", expect_type=DataTable)
-        if table.cursor_row is None:
+        table = self.query_one("#faculties-table", expect_type=VirtualTable)
+        faculty_id = table.cursor_row_key
+        if faculty_id is None:
             self.notify("No faculty selected", severity="warning")
             return None
         
-        try:
-            row_index = table.cursor_row
-            row_keys = list(table.rows.keys())
-            
-            if row_index < 0 or row_index >= len(row_keys):
-                self.notify("Invalid row selection", severity="error")
-                return None
-                
-            row_key = row_keys[row_index]
-            return self.data_manager.get_faculty_by_id(row_key)
-        except Exception as e:
-            self.notify(f"Error getting selected faculty: {str(e)}", severity="error")
-            return None
+        return self.data_manager.get_faculty_by_id(faculty_id)
     
     # Action methods
+    def _can_edit(self) -> bool:
+        """Whether records can be changed from the current tab, telling the user if not."""
+        if self.current_tab == STATS_TAB:
+            return False
+        if self.data_manager.read_only:
+            self.notify("Data is open read-only", severity="warning")
+            return False
+        return True
+    
     async def action_add_entity(self) -> None:
         """Add an entity based on current tab."""
+        if not self._can_edit():
+            return
         if self.current_tab == "students":
             await self._add_student()
         elif self.current_tab == "teachers":
@@ -865,7 +1383,6 @@ class StudentManagerApp(App):
         """Show the add student modal."""
         def on_save_callback(student):
             self.data_manager.add_student(student)
-            self._load_students()
         
         modal = AddEditStudentModal(on_save_callback=on_save_callback)
         await self.push_screen(modal)
@@ -874,7 +1391,6 @@ class StudentManagerApp(App):
         """Show the add teacher modal."""
         def on_save_callback(teacher):
             self.data_manager.add_teacher(teacher)
-            self._load_teachers()
         
         modal = AddEditTeacherModal(on_save_callback=on_save_callback)
         await self.push_screen(modal)
@@ -883,13 +1399,14 @@ class StudentManagerApp(App):
         """Show the add faculty modal."""
         def on_save_callback(faculty):
             self.data_manager.add_faculty(faculty)
-            self._load_faculties()
         
         modal = AddEditFacultyModal(on_save_callback=on_save_callback)
         await self.push_screen(modal)
     
     async def action_edit_entity(self) -> None:
         """Edit an entity based on current tab."""
+        if not self._can_edit():
+            return
         if self.current_tab == "students":
             await self._edit_student()
         elif self.current_tab == "teachers":
@@ -904,8 +1421,11 @@ class StudentManagerApp(App):
             return
         
         def on_save_callback(updated_student):
-            self.data_manager.update_student(updated_student)
-            self._load_students()
+            try:
+                self.data_manager.update_student(updated_student, expected=student)
+            except ConflictError as error:
+                self.notify(str(error), severity="warning")
+                return
             self.notify(f"Updated student: {updated_student.full_name()}")
         
         modal = AddEditStudentModal(edit_student=student, on_save_callback=on_save_callback)
@@ -918,8 +1438,11 @@ class StudentManagerApp(App):
             return
         
         def on_save_callback(updated_teacher):
-            self.data_manager.update_teacher(updated_teacher)
-            self._load_teachers()
+            try:
+                self.data_manager.update_teacher(updated_teacher, expected=teacher)
+            except ConflictError as error:
+                self.notify(str(error), severity="warning")
+                return
             self.notify(f"Updated teacher: {updated_teacher.full_name()}")
         
         modal = AddEditTeacherModal(edit_teacher=teacher, on_save_callback=on_save_callback)
@@ -932,8 +1455,11 @@ class StudentManagerApp(App):
             return
         
         def on_save_callback(updated_faculty):
-            self.data_manager.update_faculty(updated_faculty)
-            self._load_faculties()
+            try:
+                self.data_manager.update_faculty(updated_faculty, expected=faculty)
+            except ConflictError as error:
+                self.notify(str(error), severity="warning")
+                return
             self.notify(f"Updated faculty: {updated_faculty.name}")
         
         modal = AddEditFacultyModal(edit_faculty=faculty, on_save_callback=on_save_callback)
@@ -941,6 +1467,8 @@ class StudentManagerApp(App):
     
     async def action_delete_entity(self) -> None:
         """Delete an entity based on current tab."""
+        if not self._can_edit():
+            return
         if self.current_tab == "students":
             await self._delete_student()
         elif self.current_tab == "teachers":
@@ -960,11 +1488,17 @@ class StudentManagerApp(App):
         self.deletion_in_progress = True
         
         def on_confirm_callback(student_to_delete):
-            if self.data_manager.delete_student(student_to_delete.id):
-                self._load_students()
-                self.notify(f"Deleted student: {student_to_delete.full_name()}")
+            try:
+                deleted = self.data_manager.delete_student(
+                    student_to_delete.id, expected=student_to_delete
+                )
+            except ConflictError as error:
+                self.notify(str(error), severity="warning")
             else:
-                self.notify("Failed to delete student", severity="error")
+                if deleted:
+                    self.notify(f"Deleted student: {student_to_delete.full_name()}")
+                else:
+                    self.notify("Failed to delete student", severity="error")
             self.deletion_in_progress = False
         
         def on_dismiss():
@@ -986,11 +1520,17 @@ class StudentManagerApp(App):
         self.deletion_in_progress = True
         
         def on_confirm_callback(teacher_to_delete):
-            if self.data_manager.delete_teacher(teacher_to_delete.id):
-                self._load_teachers()
-                self.notify(f"Deleted teacher: {teacher_to_delete.full_name()}")
+            try:
+                deleted = self.data_manager.delete_teacher(
+                    teacher_to_delete.id, expected=teacher_to_delete
+                )
+            except ConflictError as error:
+                self.notify(str(error), severity="warning")
             else:
-                self.notify("Failed to delete teacher", severity="error")
+                if deleted:
+                    self.notify(f"Deleted teacher: {teacher_to_delete.full_name()}")
+                else:
+                    self.notify("Failed to delete teacher", severity="error")
             self.deletion_in_progress = False
             
         def on_dismiss():
@@ -1012,11 +1552,17 @@ class StudentManagerApp(App):
         self.deletion_in_progress = True
         
         def on_confirm_callback(faculty_to_delete):
-            if self.data_manager.delete_faculty(faculty_to_delete.id):
-                self._load_faculties()
-                self.notify(f"Deleted faculty: {faculty_to_delete.name}")
+            try:
+                deleted = self.data_manager.delete_faculty(
+                    faculty_to_delete.id, expected=faculty_to_delete
+                )
+            except ConflictError as error:
+                self.notify(str(error), severity="warning")
             else:
-                self.notify("Failed to delete faculty", severity="error")
+                if deleted:
+                    self.notify(f"Deleted faculty: {faculty_to_delete.name}")
+                else:
+                    self.notify("Failed to delete faculty", severity="error")
             self.deletion_in_progress = False
             
         def on_dismiss():
@@ -1028,11 +1574,35 @@ class StudentManagerApp(App):
     
     def action_focus_search(self) -> None:
         """Focus the search input."""
+        if self.current_tab == STATS_TAB:
+            return
         self.query_one("#search-input", expect_type=Input).focus()
     
     def action_refresh(self) -> None:
-        """Refresh the current entity list."""
-        if self.current_tab == "students":
+        """Load changes made in other sessions, then refresh the current entity list.
+        
+        Changes are normally picked up as they happen; this also redraws the
+        list. Loading runs in a worker, as it may wait for background writes.
+        """
+        self.run_worker(self._sync_and_refresh, thread=True, group="refresh")
+    
+    def _sync_and_refresh(self) -> None:
+        """Load changes made in other sessions and refresh the list on the UI thread."""
+        try:
+            changed = self.data_manager.sync()
+        except (OSError, ValueError) as error:
+            self.call_from_thread(self.notify, f"Could not load changes: {error}", severity="error")
+            changed = []
+        self.call_from_thread(self._refresh_current_list, changed)
+    
+    def _refresh_current_list(self, changed) -> None:
+        """Redraw the current tab, mentioning the collections changed in other sessions."""
+        if changed:
+            self.notify(f"Loaded changes to {', '.join(changed)} from other sessions")
+        if self.current_tab == STATS_TAB:
+            self._refresh_stats()
+            self.notify("Refreshed statistics")
+        elif self.current_tab == "students":
             self._load_students()
             self.notify("Refreshed student list")
         elif self.current_tab == "teachers":
@@ -1042,6 +1612,44 @@ class StudentManagerApp(App):
             self._load_faculties()
             self.notify("Refreshed faculty list")
     
+    def action_save(self) -> None:
+        """Write the changes held back by the write policy now."""
+        if self.data_manager.read_only:
+            return
+        self.run_worker(self._write_queued_changes, thread=True, group="save")
+    
+    def _write_queued_changes(self) -> None:
+        """Write queued changes from a worker thread and report the outcome."""
+        count = self.data_manager.unsaved_changes
+        try:
+            self.data_manager.flush()
+        except (OSError, ValueError) as error:
+            self.call_from_thread(self.notify, f"Could not save changes: {error}", severity="error")
+            return
+        message = f"Saved {count} changes" if count else "All changes saved"
+        self.call_from_thread(self.notify, message)
+    
+    async def action_export(self) -> None:
+        """Export the records shown on the current tab, as filtered by the search."""
+        if self.current_tab == STATS_TAB:
+            return
+        tab = self.current_tab
+        query = self._table_queries[tab]
+        
+        def on_export_callback(path):
+            self.run_worker(lambda: self._run_export(tab, path, query), thread=True, group="export")
+        
+        await self.push_screen(ExportModal(tab, query, on_export_callback=on_export_callback))
+    
+    def _run_export(self, tab: str, path: str, query: str) -> None:
+        """Write an export from a worker thread and report the outcome."""
+        try:
+            count = self.data_manager.export(tab, path, query)
+        except (OSError, ValueError) as error:
+            self.call_from_thread(self.notify, f"Export failed: {error}", severity="error")
+            return
+        self.call_from_thread(self.notify, f"Exported {count} {tab} to {path}")
+    
     @on(Button.Pressed, "#add-button")
     def on_add_button(self) -> None:
         """Handle the add button press."""
@@ -1067,6 +1675,15 @@ class StudentManagerApp(App):
         """Handle when the user presses Enter in the search input."""
         self._perform_search()
     
+    @on(Input.Changed, "#search-input")
+    def on_search_changed(self) -> None:
+        """Search as the user types, once typing pauses."""
+        if self._search_timer is not None:
+            self._search_timer.stop()
+        self._search_timer = self.set_timer(
+            SEARCH_DEBOUNCE, lambda: self._perform_search(announce=False)
+        )
+    
     @on(Button.Pressed, "#students-tab")
     def on_students_tab_pressed(self) -> None:
         """Handle students tab button press."""
@@ -1082,81 +1699,109 @@ class StudentManagerApp(App):
         """Handle faculties tab button press."""
         self._switch_tab("faculties")
     
-    def _perform_search(self) -> None:
-        """Search for entities based on current tab."""
+    @on(Button.Pressed, "#stats-tab")
+    def on_stats_tab_pressed(self) -> None:
+        """Handle stats tab button press."""
+        self._switch_tab(STATS_TAB)
+    
+    def _perform_search(self, announce: bool = True) -> None:
+        """Search for entities based on current tab.
+        
+        The search runs in a worker thread so the UI stays responsive; a newer
+        search cancels any that is still running, and results that no longer
+        match the search input or the current tab are discarded.
+        """
+        if self._search_timer is not None:
+            self._search_timer.stop()
+            self._search_timer = None
+        if self.current_tab == STATS_TAB:
+            return
+        
         query = self.query_one("#search-input", expect_type=Input).value
         
         if not query:
-            self.action_refresh()
+            self.workers.cancel_group(self, "search")
+            if announce:
+                self.action_refresh()
+            else:
+                self._load_current_tab()
             return
-            
-        if self.current_tab == "students":
-            self._search_students(query)
-        elif self.current_tab == "teachers":
-            self._search_teachers(query)
-        else:
-            self._search_faculties(query)
-    
-    def _search_students(self, query: str) -> None:
-        """Search students and update table."""
-        table = self.query_one("#students-table", expect_type=DataTable)
-        table.clear()
-        
-        results = self.data_manager.search_students(query)
-        
-        for student in results:
-            table.add_row(
-                student.full_name(),
-                str(student.age),
-                student.major,
-                f"{student.gpa:.2f}",
-                key=student.id
-            )
         
-        self.notify(f"Found {len(results)} matching students")
+        tab = self.current_tab
+        sort = self._table_sorts[tab]
+        self.run_worker(
+            lambda: self._run_search(tab, query, sort, announce),
+            thread=True,
+            exclusive=True,
+            group="search",
+        )
     
-    def _search_teachers(self, query: str) -> None:
-        """Search teachers and update table."""
-        table = self.query_one("#teachers-table", expect_type=DataTable)
-        table.clear()
+    def _search_ids(self, tab: str, query: str):
+        """Return the ids of the records of a tab that match a search."""
+        if tab == "students":
+            return self.data_manager.search_student_ids(query)
+        if tab == "teachers":
+            return self.data_manager.search_teacher_ids(query)
+        return self.data_manager.search_faculty_ids(query)
+    
+    def _run_search(self, tab: str, query: str, sort, announce: bool) -> None:
+        """Query the data manager from a worker thread, sorting the results if asked."""
+        version = self.data_manager.get_version(tab)
+        results = self._search_ids(tab, query)
+        if sort is not None:
+            results = self.data_manager.sorted_ids(tab, sort[0], sort[1], results)
         
-        results = self.data_manager.search_teachers(query)
-        
-        for teacher in results:
-            table.add_row(
-                teacher.full_name(),
-                str(teacher.age),
-                teacher.department,
-                teacher.title,
-                key=teacher.id
+        if not get_current_worker().is_cancelled:
+            self.call_from_thread(
+                self._show_search_results, tab, query, sort, results, version, announce
             )
-        
-        self.notify(f"Found {len(results)} matching teachers")
     
-    def _search_faculties(self, query: str) -> None:
-        """Search faculties and update table."""
-        table = self.query_one("#faculties-table", expect_type=DataTable)
-        table.clear()
-        
-        results = self.data_manager.search_faculties(query)
+    def _show_search_results(self, tab: str, query: str, sort, results, version: int,
+                             announce: bool) -> None:
+        """Render search results unless a newer search has superseded them."""
+        if tab != self.current_tab:
+            return
+        if query != self.query_one("#search-input", expect_type=Input).value:
+            return
+        if version != self.data_manager.get_version(tab) or sort != self._table_sorts[tab]:
+            # The data or the sort order changed while searching; the results may be stale
+            self._perform_search(announce)
+            return
         
-        for faculty in results:
-            table.add_row(
-                faculty.name,
-                faculty.building,
-                faculty.head_name,
-                str(faculty.established_year),
-                str(faculty.num_staff),
-                key=faculty.id
-            )
+        self._table_queries[tab] = query
+        self._table_versions[tab] = version
+        if tab == "students":
+            self._show_student_results(results)
+        elif tab == "teachers":
+            self._show_teacher_results(results)
+        else:
+            self._show_faculty_results(results)
         
-        self.notify(f"Found {len(results)} matching faculties")
-
+        if announce:
+            self.notify(f"Found {len(results)} matching {tab}")
+    
+    def _show_student_results(self, results) -> None:
+        """Show the students with the given ids in the table."""
+        table = self.query_one("#students-table", expect_type=VirtualTable)
+        table.set_rows(results, self._student_cells)
+    
+    def _show_teacher_results(self, results) -> None:
+        """Show the teachers with the given ids in the table."""
+        table = self.query_one("#teachers-table", expect_type=VirtualTable)
+        table.set_rows(results, self._teacher_cells)
+    
+    def _show_faculty_results(self, results) -> None:
+        """Show the faculties with the given ids in the table."""
+        table = self.query_one("#faculties-table", expect_type=VirtualTable)
+        table.set_rows(results, self._faculty_cells)
 
 def main():
-    """Run the application."""
-    app = StudentManagerApp()
+    """Run the application, making sure queued changes are written before exiting."""
+    app = StudentManagerApp(DataManager(background_writes=True))
     app.run()
+    if app.save_error is not None:
+        print(f"Could not save changes: {app.save_error}", file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
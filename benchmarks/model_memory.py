@@ -0,0 +1,100 @@
+"""Compare the memory used per student by plain and slotted model classes.
+
+Records are built from freshly decoded JSON, as when loading a snapshot, so
+string values are not shared unless the model interns them. Run from the
+repository root:
+
+    python benchmarks/model_memory.py [number_of_students]
+"""
+import gc
+import json
+import os
+import random
+import string
+import sys
+import tracemalloc
+import uuid
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Student  # noqa: E402
+
+MAJORS = ["Mathematics", "Physics", "Computer Science", "History", "Biology", "Économie"]
+
+
+@dataclass
+class PlainStudent:
+    """The original Student model: a regular dataclass with a __dict__."""
+    first_name: str
+    last_name: str
+    age: int
+    major: str
+    gpa: float
+    id: str = None
+
+    def __post_init__(self):
+        if self.id is None:
+            self.id = str(uuid.uuid4())
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlainStudent":
+        return cls(
+            id=data.get("id"),
+            first_name=data.get("first_name"),
+            last_name=data.get("last_name"),
+            age=data.get("age"),
+            major=data.get("major"),
+            gpa=data.get("gpa")
+        )
+
+
+def make_lines(count: int):
+    """Create the JSON text of a roster of random students, one per line."""
+    rng = random.Random(42)
+
+    def word():
+        return "".join(rng.choices(string.ascii_letters, k=rng.randint(3, 10))).capitalize()
+
+    return [
+        json.dumps({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "first_name": word(),
+            "last_name": word(),
+            "age": rng.randint(16, 99),
+            "major": rng.choice(MAJORS),
+            "gpa": round(rng.uniform(0, 4), 2),
+        })
+        for _ in range(count)
+    ]
+
+
+def measure(model, lines):
+    """Return the bytes held by the records built from the given lines."""
+    gc.collect()
+    tracemalloc.start()
+    records = {}
+    for line in lines:
+        record = model.from_dict(json.loads(line))
+        records[record.id] = record
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    lines = make_lines(count)
+
+    print(f"{count} students, including ids and the dict keyed by id")
+    print(f"{'model':10} {'total':>10} {'per record':>12}")
+    results = {}
+    for name, model in (("plain", PlainStudent), ("slotted", Student)):
+        size = results[name] = measure(model, lines)
+        print(f"{name:10} {size / 1e6:8.1f}MB {size / count:10.0f} B")
+    saved = 1 - results["slotted"] / results["plain"]
+    print(f"\nslotted records use {saved:.0%} less memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare per-query allocations of lowercasing fields vs. cached search keys.
+
+Run from the repository root:
+
+    python benchmarks/search_keys.py [number_of_students]
+"""
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Student, normalize_search_text  # noqa: E402
+
+MAJORS = ["Mathematics", "Physics", "Computer Science", "History", "Biology", "Économie"]
+QUERIES = ["an", "son", "math", "econ", "zzz"]
+
+
+def make_students(count: int):
+    """Create a roster of random students."""
+    rng = random.Random(42)
+
+    def word():
+        return "".join(rng.choices(string.ascii_letters, k=rng.randint(3, 10))).capitalize()
+
+    return [
+        Student(word(), word(), rng.randint(16, 99), rng.choice(MAJORS), round(rng.uniform(0, 4), 2))
+        for _ in range(count)
+    ]
+
+
+def search_lowercasing(students, query):
+    """The original search loop: lowercases every field of every record."""
+    query = query.lower()
+    return [
+        student for student in students
+        if (query in student.first_name.lower() or
+            query in student.last_name.lower() or
+            query in student.major.lower())
+    ]
+
+
+def search_cached(students, query):
+    """Search through the cached normalised key of every record."""
+    query = normalize_search_text(query)
+    return [student for student in students if query in student.search_key()]
+
+
+def temporary_strings(students):
+    """Count and size the strings the lowercasing loop creates per query."""
+    count = size = 0
+    for student in students:
+        for value in (student.first_name, student.last_name, student.major):
+            count += 1
+            size += sys.getsizeof(value.lower())
+    return count, size
+
+
+def measure(search, students, query):
+    """Return elapsed seconds and bytes allocated beyond the result list."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = search(students, query)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak - sys.getsizeof(results)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    students = make_students(count)
+    for student in students:
+        student.search_key()
+
+    strings, size = temporary_strings(students)
+    print(f"{count} students")
+    print(f"lowercasing: {strings} temporary strings ({size / 1e6:.1f} MB) per query")
+    print("cached keys: 0 temporary strings per query\n")
+    print(f"{'query':8} {'lowercasing':>14} {'cached':>14} {'cached extra bytes':>20}")
+    for query in QUERIES:
+        slow, _ = measure(search_lowercasing, students, query)
+        fast, extra = measure(search_cached, students, query)
+        print(f"{query!r:8} {slow * 1000:12.1f}ms {fast * 1000:12.1f}ms {max(extra, 0):20}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare the size and read/write time of the snapshot formats.
+
+Run from the repository root:
+
+    python benchmarks/snapshot_formats.py [number_of_students]
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Student  # noqa: E402
+from storage import SNAPSHOT_FORMATS, read_snapshot, write_snapshot  # noqa: E402
+
+MAJORS = ["Mathematics", "Physics", "Computer Science", "History", "Biology", "Économie"]
+
+
+def make_records(count: int):
+    """Create the stored form of a roster of random students."""
+    rng = random.Random(42)
+
+    def word():
+        return "".join(rng.choices(string.ascii_letters, k=rng.randint(3, 10))).capitalize()
+
+    return [
+        Student(word(), word(), rng.randint(16, 99), rng.choice(MAJORS),
+                round(rng.uniform(0, 4), 2)).to_dict()
+        for _ in range(count)
+    ]
+
+
+def timed(function, *args):
+    """Return the result of a call and the seconds it took."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    records = make_records(count)
+
+    print(f"{count} students")
+    print(f"{'format':8} {'size':>10} {'write':>10} {'read dicts':>12} {'read models':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for snapshot_format, extension in SNAPSHOT_FORMATS.items():
+            path = os.path.join(directory, f"students{extension}")
+            _, write_time = timed(write_snapshot, path, records, 0, snapshot_format)
+            _, dict_time = timed(read_snapshot, path)
+            _, model_time = timed(read_snapshot, path, 0, Student.from_dict)
+            size = os.path.getsize(path)
+            print(f"{snapshot_format:8} {size / 1e6:8.1f}MB {write_time:9.2f}s "
+                  f"{dict_time:11.2f}s {model_time:11.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import sys
+from typing import List, Optional
+
+from data_io import EXPORT_FORMATS, IMPORT_FORMATS, read_records
+from data_manager import (
+    DEFAULT_DATA_DIR,
+    FLUSH_AFTER,
+    FLUSH_INTERVAL,
+    WRITE_POLICIES,
+    DataManager,
+)
+from models import Faculty, Student, Teacher
+from storage import BACKENDS, SNAPSHOT_FORMATS, JsonBackend, create_backend, migrate_storage
+
+
+def _run(args) -> int:
+    """Start the TUI."""
+    from app import StudentManagerApp
+
+    try:
+        data_manager = DataManager(
+            args.data_dir, backend=args.backend, snapshot_format=args.snapshot_format,
+            read_only=args.read_only, background_writes=True, write_policy=args.write_policy,
+            flush_interval=args.flush_interval, flush_after=args.flush_after,
+        )
+    except ValueError as error:
+        # E.g. --read-only with the sqlite backend
+        print(error, file=sys.stderr)
+        return 2
+    app = StudentManagerApp(data_manager=data_manager)
+    app.run()
+    if app.save_error is not None:
+        print(f"Could not save changes: {app.save_error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _migrate(args) -> int:
+    """Copy all data from one storage backend to another."""
+    if args.source == args.target:
+        print("Source and target backends must differ", file=sys.stderr)
+        return 2
+
+    source = create_backend(args.source, args.data_dir)
+    target = create_backend(args.target, args.data_dir)
+    try:
+        counts = migrate_storage(source, target)
+    finally:
+        source.close()
+        target.close()
+
+    for name, count in counts.items():
+        print(f"Migrated {count} {name} from {args.source} to {args.target}")
+    return 0
+
+
+def _convert(args) -> int:
+    """Rewrite the JSON backend's snapshots in another format."""
+    # Snapshots are read in whichever format they are in
+    source = JsonBackend(args.data_dir)
+    target = JsonBackend(args.data_dir, snapshot_format=args.format)
+    counts = migrate_storage(source, target)
+    for name in counts:
+        target.remove_other_snapshots(name)
+
+    for name, count in counts.items():
+        print(f"Converted {count} {name} to {args.format}")
+    return 0
+
+
+# Model of the records in each collection, for import and export
+COLLECTIONS = {"students": Student, "teachers": Teacher, "faculties": Faculty}
+
+
+def _import(args) -> int:
+    """Add the records of a CSV or JSONL file to a collection."""
+    data_manager = DataManager(args.data_dir, backend=args.backend)
+    try:
+        records = read_records(args.path, COLLECTIONS[args.collection], args.format)
+        count = getattr(data_manager, f"bulk_add_{args.collection}")(records)
+    except (OSError, ValueError) as error:
+        print(f"Nothing imported from {args.path}:\n{error}", file=sys.stderr)
+        return 1
+    finally:
+        data_manager.close()
+
+    print(f"Imported {count} {args.collection} from {args.path}")
+    return 0
+
+
+def _export(args) -> int:
+    """Write the records of a collection, or those matching a search, to a file."""
+    data_manager = DataManager(args.data_dir, backend=args.backend)
+    try:
+        count = data_manager.export(args.collection, args.path, args.query, args.format)
+    except (OSError, ValueError) as error:
+        print(f"Export to {args.path} failed: {error}", file=sys.stderr)
+        return 1
+    finally:
+        data_manager.close()
+
+    print(f"Exported {count} {args.collection} to {args.path}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the command line parser."""
+    parser = argparse.ArgumentParser(
+        prog="university-manager",
+        description="Manage university students, teachers and faculties.",
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=DEFAULT_DATA_DIR,
+        help="directory holding the data files (default: %(default)s)",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="start the TUI (default)")
+    run_parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        help="storage backend (default: $UNIVERSITY_MANAGER_BACKEND or json)",
+    )
+    run_parser.add_argument(
+        "--snapshot-format",
+        choices=tuple(SNAPSHOT_FORMATS),
+        help="format the JSON backend writes snapshots in "
+             "(default: the format they are in, json for new data)",
+    )
+    run_parser.add_argument(
+        "--read-only",
+        action="store_true",
+        help="browse the mapped snapshots made by 'convert mapped' without loading them",
+    )
+    run_parser.add_argument(
+        "--write-policy",
+        choices=WRITE_POLICIES,
+        help="when changes are written: as made, in bursts, or on 's' and exit "
+             "(default: $UNIVERSITY_MANAGER_WRITE_POLICY or immediate)",
+    )
+    run_parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=FLUSH_INTERVAL,
+        metavar="SECONDS",
+        help="longest a change waits with --write-policy interval (default: %(default)s)",
+    )
+    run_parser.add_argument(
+        "--flush-after",
+        type=int,
+        default=FLUSH_AFTER,
+        metavar="CHANGES",
+        help="queued changes that start a write with --write-policy interval "
+             "(default: %(default)s)",
+    )
+    run_parser.set_defaults(handler=_run)
+
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="copy all data from one storage backend to another"
+    )
+    migrate_parser.add_argument("source", choices=BACKENDS, help="backend to read from")
+    migrate_parser.add_argument("target", choices=BACKENDS, help="backend to write to")
+    migrate_parser.set_defaults(handler=_migrate)
+
+    convert_parser = subparsers.add_parser(
+        "convert", help="rewrite the JSON backend's snapshots in another format"
+    )
+    convert_parser.add_argument(
+        "format", choices=tuple(SNAPSHOT_FORMATS), help="snapshot format to convert to"
+    )
+    convert_parser.set_defaults(handler=_convert)
+
+    import_parser = subparsers.add_parser(
+        "import", help="add the records of a CSV or JSONL file to a collection"
+    )
+    import_parser.add_argument("collection", choices=tuple(COLLECTIONS), help="collection to add to")
+    import_parser.add_argument("path", help="file to read, with a header row if CSV")
+    import_parser.add_argument(
+        "--format",
+        choices=tuple(IMPORT_FORMATS),
+        help="file format (default: from the file extension)",
+    )
+    import_parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        help="storage backend (default: $UNIVERSITY_MANAGER_BACKEND or json)",
+    )
+    import_parser.set_defaults(handler=_import)
+
+    export_parser = subparsers.add_parser(
+        "export", help="write the records of a collection to a CSV, JSONL or columnar file"
+    )
+    export_parser.add_argument("collection", choices=tuple(COLLECTIONS), help="collection to export")
+    export_parser.add_argument("path", help="file to write")
+    export_parser.add_argument("--query", help="only export records matching this search")
+    export_parser.add_argument(
+        "--format",
+        choices=tuple(EXPORT_FORMATS),
+        help="file format (default: from the file extension)",
+    )
+    export_parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        help="storage backend (default: $UNIVERSITY_MANAGER_BACKEND or json)",
+    )
+    export_parser.set_defaults(handler=_export)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command line interface."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(["--data-dir", args.data_dir, "run"])
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
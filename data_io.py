@@ -0,0 +1,219 @@
+import csv
+import json
+import os
+import struct
+from dataclasses import fields
+from functools import lru_cache
+from itertools import islice
+from typing import IO, Dict, Iterable, Iterator, List, Tuple
+
+from storage import decode_binary_snapshot, encode_binary_snapshot
+
+
+# Formats records can be imported from, with their file extensions
+IMPORT_FORMATS = {"csv": ".csv", "jsonl": ".jsonl"}
+
+# Formats records can be exported to, with their file extensions
+EXPORT_FORMATS = {"csv": ".csv", "jsonl": ".jsonl", "columnar": ".cols"}
+
+# Records converted and written at a time when exporting
+EXPORT_CHUNK_SIZE = 10_000
+
+# First bytes of a columnar export, followed by length-prefixed row groups
+COLUMNAR_MAGIC = b"UMCOLS\x01"
+_ROW_GROUP_SIZE = struct.Struct("<Q")
+
+# Errors listed in full by summarize_errors; the rest are only counted
+MAX_REPORTED_ERRORS = 10
+
+
+def summarize_errors(errors: List[str]) -> str:
+    """Join error messages into one, listing only the first few."""
+    summary = "\n".join(errors[:MAX_REPORTED_ERRORS])
+    if len(errors) > MAX_REPORTED_ERRORS:
+        summary += f"\n... and {len(errors) - MAX_REPORTED_ERRORS} more"
+    return summary
+
+
+def detect_format(path: str, formats: Dict[str, str] = None) -> str:
+    """Return the format of a file from its extension, among the import formats by default."""
+    if formats is None:
+        formats = IMPORT_FORMATS
+    extension = os.path.splitext(path)[1].lower()
+    for file_format, format_extension in formats.items():
+        if extension == format_extension:
+            return file_format
+    raise ValueError(
+        f"Cannot tell the format of {path}; use one of {', '.join(formats.values())}"
+    )
+
+
+def iter_rows(f: IO[str], file_format: str) -> Iterator[Tuple[int, dict]]:
+    """Yield the line number and fields of every record in an open CSV or JSONL file.
+
+    Rows are read one at a time, so the file is never held in memory.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == "jsonl":
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"line {number}: {error.msg}") from error
+            if not isinstance(row, dict):
+                raise ValueError(f"line {number}: expected a JSON object")
+            yield number, row
+    else:
+        raise ValueError(f"Unknown import format: {file_format}")
+
+
+@lru_cache(maxsize=None)
+def _import_fields(model) -> Tuple[Tuple[str, type, str], ...]:
+    """Return the name, type and message label of every field a model is built from."""
+    return tuple(
+        (item.name, item.type, item.name.replace("_", " ").capitalize())
+        for item in fields(model)
+        if item.init
+    )
+
+
+def record_from_row(model, row: dict):
+    """Build a model instance from imported fields, converting text to numbers.
+
+    A missing or empty id gives the record a new one; any other missing field
+    raises ValueError, as does a number that does not parse.
+    """
+    values = {}
+    for name, kind, label in _import_fields(model):
+        value = row.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            if name == "id":
+                continue
+            raise ValueError(f"{label} is required")
+        if kind is int and isinstance(value, str):
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError(f"{label} must be an integer") from None
+        elif kind is float and isinstance(value, (str, int)) and not isinstance(value, bool):
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"{label} must be a number") from None
+        values[name] = value
+    # from_dict interns shared values such as majors, as when loading
+    return model.from_dict(values)
+
+
+def read_records(path: str, model, file_format: str = None) -> List:
+    """Read and validate every record of a CSV or JSONL file.
+
+    The format is taken from the file extension unless given. CSV files need
+    a header row naming the fields. Raises ValueError listing the invalid
+    lines by number if any record is invalid.
+    """
+    if file_format is None:
+        file_format = detect_format(path)
+
+    records = []
+    errors = []
+    # utf-8-sig also accepts the byte order mark spreadsheets put in CSV files
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for number, row in iter_rows(f, file_format):
+            try:
+                record = record_from_row(model, row)
+                record.validate()
+            except ValueError as error:
+                errors.append(f"line {number}: {error}")
+            else:
+                records.append(record)
+    if errors:
+        raise ValueError(summarize_errors(errors))
+    return records
+
+
+def export_fields(model) -> List[str]:
+    """Return the names of the fields exported for a model, id first."""
+    names = [name for name, _, _ in _import_fields(model)]
+    names.remove("id")
+    return ["id"] + names
+
+
+def _chunks(records: Iterable, size: int) -> Iterator[List[dict]]:
+    """Yield the stored form of the records, a list of at most ``size`` at a time."""
+    records = iter(records)
+    while True:
+        chunk = [record.to_dict() for record in islice(records, size)]
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_records(records: Iterable, path: str, model, file_format: str = None,
+                  chunk_size: int = EXPORT_CHUNK_SIZE) -> int:
+    """Write records to a CSV, JSON Lines or columnar file; return how many.
+
+    Records are converted and written ``chunk_size`` at a time, so only one
+    chunk of output is in memory however many records there are. The format
+    is taken from the file extension unless given. A columnar file holds one
+    compressed row group per chunk, each laid out column by column like a
+    binary snapshot; read it back with iter_columnar. The file is removed if
+    writing fails part way.
+    """
+    if file_format is None:
+        file_format = detect_format(path, EXPORT_FORMATS)
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+
+    count = 0
+    try:
+        if file_format == "columnar":
+            with open(path, "wb") as f:
+                f.write(COLUMNAR_MAGIC)
+                for chunk in _chunks(records, chunk_size):
+                    group = encode_binary_snapshot(chunk)
+                    f.write(_ROW_GROUP_SIZE.pack(len(group)))
+                    f.write(group)
+                    count += len(chunk)
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                if file_format == "csv":
+                    writer = csv.DictWriter(f, export_fields(model))
+                    writer.writeheader()
+                for chunk in _chunks(records, chunk_size):
+                    if file_format == "csv":
+                        writer.writerows(chunk)
+                    else:
+                        f.write("".join(json.dumps(item, ensure_ascii=False) + "\n"
+                                        for item in chunk))
+                    count += len(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return count
+
+
+def iter_columnar(path: str) -> Iterator[dict]:
+    """Yield the records of a columnar export, one row group in memory at a time."""
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar export")
+        while True:
+            header = f.read(_ROW_GROUP_SIZE.size)
+            if not header:
+                return
+            if len(header) < _ROW_GROUP_SIZE.size:
+                raise ValueError(f"{path} is truncated")
+            (size,) = _ROW_GROUP_SIZE.unpack(header)
+            group = f.read(size)
+            if len(group) < size:
+                raise ValueError(f"{path} is truncated")
+            yield from decode_binary_snapshot(group)
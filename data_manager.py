@@ -1,226 +1,1291 @@
-import json
 import os
 import importlib
-from typing import List, Optional
+import threading
+from contextlib import ExitStack, contextmanager, nullcontext
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from data_io import summarize_errors, write_records
+
+from mapped_snapshot import MappedRecords
+from models import Student, Teacher, Faculty, normalize_search_text
+from search_index import SearchIndex, normalize_query
+from sort_index import SortIndex
+from stats import FacultyStats, TeacherStats
+from student_columns import StudentColumns
+from storage import JsonBackend, StorageBackend, create_backend
+from writer import BackgroundWriter
+
+
+# Default location of the data files, next to this module
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Kinds of change reported to listeners registered with DataManager.subscribe
+CHANGE_ADDED = "added"
+CHANGE_UPDATED = "updated"
+CHANGE_REMOVED = "removed"
+CHANGE_RELOADED = "reloaded"
+
+# When changes are written: as they are made, in bursts, or only on flush and close
+WRITE_POLICIES = ("immediate", "interval", "manual")
+
+# Name of the environment variable that selects the default write policy
+WRITE_POLICY_ENV_VAR = "UNIVERSITY_MANAGER_WRITE_POLICY"
+
+# Defaults of the "interval" policy: seconds changes may wait, and changes written together
+FLUSH_INTERVAL = 1.0
+FLUSH_AFTER = 1000
+
+
+def _number_key(value) -> tuple:
+    """Sort key of a number that may be missing; missing numbers sort after the rest."""
+    return (value is None, value or 0)
+
+
+# Sort key of each field a collection can be sorted by, in table column order;
+# text is compared like searches, ignoring case and accents
+_SORT_KEYS = {
+    "students": {
+        "name": lambda student: normalize_search_text(student.full_name()),
+        "age": lambda student: _number_key(student.age),
+        "major": lambda student: normalize_search_text(student.major or ""),
+        "gpa": lambda student: _number_key(student.gpa),
+    },
+    "teachers": {
+        "name": lambda teacher: normalize_search_text(teacher.full_name()),
+        "age": lambda teacher: _number_key(teacher.age),
+        "department": lambda teacher: normalize_search_text(teacher.department or ""),
+        "title": lambda teacher: normalize_search_text(teacher.title or ""),
+    },
+    "faculties": {
+        "name": lambda faculty: normalize_search_text(faculty.name or ""),
+        "building": lambda faculty: normalize_search_text(faculty.building or ""),
+        "head": lambda faculty: normalize_search_text(faculty.head_name or ""),
+        "established_year": lambda faculty: _number_key(faculty.established_year),
+        "staff": lambda faculty: _number_key(faculty.num_staff),
+    },
+}
+
+# Fields each collection can be sorted by with DataManager.sorted_ids
+SORT_FIELDS = {name: tuple(keys) for name, keys in _SORT_KEYS.items()}
+
+
+class Change(NamedTuple):
+    """A change to one collection, as reported to DataManager listeners."""
+    collection: str  # "students", "teachers" or "faculties"
+    kind: str  # One of the CHANGE_* constants
+    record_id: Optional[str]  # None for reloads
+    version: int  # Collection version right after the change
+
+
+class _Collection:
+    """In-memory records of one entity type."""
+
+    def __init__(self, name: str, model, aggregates=None):
+        self.name = name
+        self.model = model
+        # Records are keyed by id; dicts keep insertion order and give
+        # constant-time lookups, updates and deletes
+        self.records: Dict[str, object] = {}
+        # Built off the lock by build_search_index and then maintained; until
+        # then searches scan the records
+        self.search_index: Optional[SearchIndex] = None
+        # Changes made while the search index is being built, replayed onto it
+        # before it is used; None when no build is running
+        self._index_backlog: Optional[List[Tuple[str, object]]] = None
+        # Optional aggregates with add/remove/clear, maintained like the index
+        self.aggregates = aggregates
+        # Set when the aggregates have not been filled since the last load
+        self.aggregates_stale = False
+        # Field name -> record order by it, built on first use and then maintained
+        self.sort_orders: Dict[str, SortIndex] = {}
+        # Id -> the record as last stored, or None if it was not, for each record
+        # with a change queued for the background writer and not written yet
+        self.unwritten: Dict[str, object] = {}
+        # Incremented on every change so cached views can detect staleness
+        self.version = 0
+        # Normalised query, version and results of the last search
+        self._last_search = None
+        # Records are read from the backend on first use
+        self.loaded = False
+        # Guards loading, mutations and searches; lookups by id need no lock
+        self.lock = threading.RLock()
+
+    @property
+    def mapped(self) -> bool:
+        """Whether records are served read-only from a mapped snapshot."""
+        return isinstance(self.records, MappedRecords)
+
+    def index(self, record) -> None:
+        """Add a record, or its new version, to the search index, aggregates and sort orders."""
+        if self.search_index is not None:
+            self.search_index.add(record)
+        elif self._index_backlog is not None:
+            self._index_backlog.append((record.id, record))
+        if self.aggregates is not None:
+            self.aggregates.add(record)
+        for order in self.sort_orders.values():
+            order.add(record)
+
+    def unindex(self, record_id: str) -> None:
+        """Remove a record from the search index, aggregates and sort orders."""
+        if self.search_index is not None:
+            self.search_index.remove(record_id)
+        elif self._index_backlog is not None:
+            self._index_backlog.append((record_id, None))
+        if self.aggregates is not None:
+            self.aggregates.remove(record_id)
+        for order in self.sort_orders.values():
+            order.remove(record_id)
+
+    def reindex(self) -> None:
+        """Rebuild the search index and aggregates from the records.
+
+        A search index that has not been built yet is left to
+        ``build_search_index``, which starts over if it is running. Sort
+        orders are dropped and rebuilt when next used.
+        """
+        if self.search_index is not None:
+            self.search_index.clear()
+            for record in self.records.values():
+                self.search_index.add(record)
+        else:
+            self._index_backlog = None
+        if self.aggregates is not None:
+            self.aggregates.clear()
+            for record in self.records.values():
+                self.aggregates.add(record)
+        self.sort_orders.clear()
+
+    def build_search_index(self) -> None:
+        """Build the search index if it is missing, holding the lock only briefly.
+
+        The index is built from a copy of the records; changes made meanwhile
+        are recorded and replayed onto it before it replaces the scans.
+        """
+        while True:
+            with self.lock:
+                if self.search_index is not None:
+                    return
+                records = list(self.records.values())
+                backlog = self._index_backlog = []
+            index = SearchIndex()
+            for record in records:
+                index.add(record)
+            with self.lock:
+                if self._index_backlog is not backlog:
+                    # Reloaded meanwhile, so the copy is out of date
+                    continue
+                for record_id, record in backlog:
+                    if record is None:
+                        index.remove(record_id)
+                    else:
+                        index.add(record)
+                self.search_index = index
+                self._index_backlog = None
+                return
+
+    def search_ids(self, query: str) -> Sequence[str]:
+        """Return the ids of the records with a search field containing the query.
+
+        For a mapped snapshot the ids are read lazily from the file.
+        """
+        if self.mapped:
+            return self.records.ids(self.search_index.search(query))
+        return [record.id for record in self.search(query)]
+
+    def search(self, query: str) -> List:
+        """Return the records with a search field containing the query.
+
+        When the query extends the previous one and nothing has changed since,
+        the previous results are narrowed instead of consulting the index,
+        which pays off once they are a small part of the collection.
+        """
+        if self.mapped:
+            return [self.records[record_id] for record_id in self.search_ids(query)]
+        normalized = normalize_query(query)
+        last = self._last_search
+        if (last is not None and last[1] == self.version and last[0] in normalized and
+                len(last[2]) < len(self.records) // 4):
+            results = [record for record in last[2] if normalized in record.search_key()]
+        elif self.search_index is None:
+            results = [record for record in self.records.values()
+                       if normalized in record.search_key()]
+        else:
+            results = [self.records[record_id] for record_id in self.search_index.search(normalized)]
+        self._last_search = (normalized, self.version, results)
+        return list(results)
+
+
+class ConflictError(RuntimeError):
+    """Raised when a record changed after the caller read it, e.g. in another session."""
+
+
+def _conflict_message(collection, record_id: str) -> str:
+    """Describe a record that changed after the caller read it."""
+    return (f"{collection.model.__name__} {record_id} was changed by someone else; "
+            "reload and try again")
+
+
+def _dropped_message(collection, record_ids: List[str]) -> str:
+    """Describe queued changes dropped because others changed the records first."""
+    if len(record_ids) == 1:
+        subject = f"{collection.model.__name__} {record_ids[0]} was"
+    else:
+        subject = f"{len(record_ids)} {collection.name} were"
+    return (f"{subject} changed by someone else before your changes were saved; "
+            "their changes were kept")
+
+
+class _TransactionLog:
+    """What a transaction changed in one collection, for commit or rollback."""
+
+    def __init__(self):
+        # Id -> the record before the transaction, or None if there was none
+        self.before: Dict[str, object] = {}
+        # Ids inserted as new keys, in the order they now appear in the records
+        self.inserted: Dict[str, None] = {}
+        # Ids in order before the first delete, which moves re-added records to the end
+        self.order: Optional[List[str]] = None
 
 
 class DataManager:
-    """Manages the storage and retrieval of university data."""
-    
-    def __init__(self, data_dir: str = None):
+    """Manages the storage and retrieval of university data.
+
+    Records are kept in memory and every mutation is passed on to a storage
+    backend. The default JSON backend keeps a snapshot plus an append-only
+    journal per collection; ``backend="sqlite"`` stores them in an indexed
+    SQLite database instead. When no backend is given, the
+    ``UNIVERSITY_MANAGER_BACKEND`` environment variable picks one.
+    ``compact_threshold``, ``snapshot_backups`` and ``snapshot_format``
+    (``"json"``, the faster, smaller ``"binary"`` or ``"mapped"``; by default
+    the format the snapshots are in) configure the JSON backend.
+
+    Each collection is read from the backend the first time it is accessed,
+    so startup cost scales with the data actually used; ``prefetch`` loads
+    the rest, e.g. from a background thread, and builds the search indexes.
+    Until a collection's index is built, its searches scan the records.
+
+    Several processes may share the data. Every change is made under the
+    backend's inter-process lock after first applying the changes other
+    processes made, so nothing they wrote is overwritten; ``sync`` applies
+    them on demand. ``update_*`` and ``delete_*`` take the record the caller
+    last saw as ``expected`` and raise ConflictError if it has changed since.
+
+    With ``background_writes=True`` the caller still applies other
+    processes' changes and checks ``expected`` under the backend's lock,
+    but its change is only applied in memory and queued; a BackgroundWriter
+    thread writes it to the backend, compacting when due, so callers never
+    wait for the disk. If another process changes a record before the
+    queued change to it is written, that change stands and the queued one
+    is dropped, so memory always matches the stored data. ``flush`` waits
+    for the queue to empty, write failures and dropped changes (as
+    ConflictError) are passed to ``on_write_error``, and ``close`` writes
+    whatever is still queued.
+
+    ``write_policy`` trades durability for throughput. ``"immediate"``
+    writes each change as it is made. ``"interval"`` queues changes for the
+    writer thread and writes them once the oldest has waited
+    ``flush_interval`` seconds or ``flush_after`` are queued, so a burst of
+    edits costs one write. ``"manual"`` writes only on ``flush`` and
+    ``close``. Both imply background writes; when no policy is given, the
+    ``UNIVERSITY_MANAGER_WRITE_POLICY`` environment variable picks one.
+
+    With ``read_only=True`` collections are served from the JSON backend's
+    mapped snapshots instead (other backends raise ValueError): opening one
+    does not read its records, which are decoded when looked up, and
+    searches scan the stored search keys. Any change raises RuntimeError,
+    and the statistics are computed on first use.
+    """
+
+    def __init__(self, data_dir: str = None, compact_threshold: int = 1000,
+                 snapshot_backups: int = 1, backend=None, snapshot_format: str = None,
+                 read_only: bool = False, background_writes: bool = False,
+                 write_policy: str = None, flush_interval: float = FLUSH_INTERVAL,
+                 flush_after: int = FLUSH_AFTER):
         """Initialize the data manager with the specified data directory."""
         # Use absolute path based on the script location
         if data_dir is None:
-            self.data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+            self.data_dir = DEFAULT_DATA_DIR
         else:
             self.data_dir = data_dir
-            
+
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir, exist_ok=True)
-            
+
         # Define file paths
         self.student_file = os.path.join(self.data_dir, "students.json")
         self.teacher_file = os.path.join(self.data_dir, "teachers.json")
         self.faculty_file = os.path.join(self.data_dir, "faculties.json")
-        
-        # Initialize data lists
-        self.students = []
-        self.teachers = []
-        self.faculties = []
-        
-        # Load all data
-        self._load_data()
-        
-    def _load_data(self) -> None:
-        """Load all data from JSON files."""
-        from models import Student, Teacher, Faculty
-        
-        # Load students
-        if os.path.exists(self.student_file):
-            try:
-                with open(self.student_file, "r") as f:
-                    data = json.load(f)
-                    self.students = [Student.from_dict(item) for item in data]
-            except json.JSONDecodeError:
-                self.students = []
-        else:
-            self._save_students()
-            
-        # Load teachers
-        if os.path.exists(self.teacher_file):
-            try:
-                with open(self.teacher_file, "r") as f:
-                    data = json.load(f)
-                    self.teachers = [Teacher.from_dict(item) for item in data]
-            except json.JSONDecodeError:
-                self.teachers = []
+
+        if isinstance(backend, StorageBackend):
+            self.backend = backend
         else:
-            self._save_teachers()
-            
-        # Load faculties
-        if os.path.exists(self.faculty_file):
-            try:
-                with open(self.faculty_file, "r") as f:
-                    data = json.load(f)
-                    self.faculties = [Faculty.from_dict(item) for item in data]
-            except json.JSONDecodeError:
-                self.faculties = []
+            self.backend = create_backend(
+                backend,
+                self.data_dir,
+                compact_threshold=compact_threshold,
+                snapshot_backups=snapshot_backups,
+                snapshot_format=snapshot_format,
+            )
+        if read_only and not isinstance(self.backend, JsonBackend):
+            # Only the JSON backend's snapshots can be mapped
+            self.backend.close()
+            raise ValueError("Read-only mode needs the json backend")
+        self.read_only = read_only
+        # Set by close; sync does nothing from then on
+        self.closed = False
+        policy = write_policy or os.environ.get(WRITE_POLICY_ENV_VAR) or "immediate"
+        self.write_policy = policy.lower()
+        if self.write_policy not in WRITE_POLICIES:
+            raise ValueError(
+                f"Unknown write policy: {self.write_policy} "
+                f"(expected one of {', '.join(WRITE_POLICIES)})"
+            )
+
+        self._students = _Collection("students", Student, StudentColumns())
+        self._teachers = _Collection("teachers", Teacher, TeacherStats())
+        self._faculties = _Collection("faculties", Faculty, FacultyStats())
+        self._collections = {
+            collection.name: collection
+            for collection in (self._students, self._teachers, self._faculties)
+        }
+        self._listeners: List[Callable[[Change], None]] = []
+        # Collection name -> changes of the open transaction, or None outside one
+        self._transaction: Optional[Dict[str, _TransactionLog]] = None
+        # Backend locks held until the open transaction ends
+        self._transaction_locks: Optional[ExitStack] = None
+        # Held by every mutation and for the whole of a transaction
+        self._write_lock = threading.RLock()
+        # Called with each background write failure, from the writer thread, and with
+        # each queued change dropped for another process's, from any thread
+        self.on_write_error: Optional[Callable[[Exception], None]] = None
+        self._writer = None
+        # Backend lock the writer thread holds, without the collection's, while saving a snapshot
+        self._saving_lock = None
+        if not read_only and (background_writes or self.write_policy != "immediate"):
+            # Seconds changes wait before being written; None until flushed
+            delays = {"interval": flush_interval, "manual": None}
+            self._writer = BackgroundWriter(
+                self._write_queued, on_error=self._report_write_error,
+                delay=delays.get(self.write_policy, 0.0),
+                flush_after=flush_after if self.write_policy == "interval" else None,
+            )
+
+        # Collections are loaded on first access; see prefetch()
+
+    @property
+    def students(self) -> List:
+        """All students in insertion order."""
+        return list(self._loaded(self._students).records.values())
+
+    @property
+    def teachers(self) -> List:
+        """All teachers in insertion order."""
+        return list(self._loaded(self._teachers).records.values())
+
+    @property
+    def faculties(self) -> List:
+        """All faculties in insertion order."""
+        return list(self._loaded(self._faculties).records.values())
+
+    @property
+    def load_warnings(self) -> List[str]:
+        """Problems found while loading, such as snapshots recovered from backups.
+
+        Collections load lazily, so warnings may be added after startup.
+        """
+        return self.backend.warnings
+
+    def get_version(self, collection: str) -> int:
+        """Return a counter that increases whenever the named collection changes."""
+        return self._loaded(self._collections[collection]).version
+
+    def subscribe(self, listener: Callable[[Change], None]) -> None:
+        """Register a callback receiving a Change for every add, update, delete or reload.
+
+        The callback is called synchronously on the thread that made the
+        change. Comparing ``Change.version`` with ``get_version`` tells
+        whether a view built at some point already includes the change.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Change], None]) -> None:
+        """Remove a callback registered with subscribe."""
+        self._listeners.remove(listener)
+
+    def _notify(self, change: Change) -> None:
+        """Report a change to every listener."""
+        for listener in list(self._listeners):
+            listener(change)
+
+    def _loaded(self, collection: _Collection) -> _Collection:
+        """Return the collection, loading it from the backend on first use."""
+        if not collection.loaded:
+            with collection.lock:
+                if not collection.loaded:
+                    self._load_collection(collection)
+        return collection
+
+    def prefetch(self) -> None:
+        """Load every collection that has not been accessed yet and build the search indexes.
+
+        Safe to call from a background thread after the first screen is shown.
+        """
+        for collection in self._collections.values():
+            self._loaded(collection)
+        for collection in self._collections.values():
+            collection.build_search_index()
+
+    def _load_data(self) -> None:
+        """Load all data from the storage backend, replacing what is in memory."""
+        for collection in self._collections.values():
+            self._load_collection(collection)
+
+    def _load_collection(self, collection: _Collection) -> None:
+        """Load one collection from the storage backend."""
+        if self.read_only:
+            self._map_collection(collection)
+            return
+        with collection.lock, self.backend.lock(collection.name):
+            # Records are built one at a time as the backend reads them
+            self._fill(collection, self.backend.load(collection.name, collection.model.from_dict))
+            collection.loaded = True
+            change = Change(collection.name, CHANGE_RELOADED, None, collection.version)
+            if self.backend.needs_compaction(collection.name, len(collection.records)):
+                self._save(collection)
+        self._notify(change)
+
+    def _fill(self, collection: _Collection, records: Dict[str, object]) -> None:
+        """Replace the records of a collection and rebuild its index and aggregates."""
+        collection.records = records
+        collection.reindex()
+        collection.version += 1
+
+    def _storage_lock(self, collection: _Collection):
+        """Return a context manager holding the backend's lock on a collection.
+
+        In a transaction the lock is taken on first use and kept until the
+        transaction ends, so no other process can change what it has read.
+        """
+        if self._transaction_locks is None:
+            return self.backend.lock(collection.name)
+        if collection.name not in self._transaction:
+            self._transaction_locks.enter_context(self.backend.lock(collection.name))
+        return nullcontext()
+
+    @contextmanager
+    def _caught_up(self, collection: _Collection):
+        """Hold the backend's lock on a collection and apply other processes' changes to it.
+
+        Yields the changes applied; the caller holds the collection's lock.
+        While the writer thread saves a snapshot under the backend's lock no
+        other process can write, so a change goes ahead without waiting for
+        it; should another process write right after it is released, the
+        conflict is found when the queued change is written.
+        """
+        if self._transaction_locks is None and self._saving_lock is not None:
+            if self._saving_lock is self.backend.lock(collection.name):
+                yield []
+                return
+        with self._storage_lock(collection):
+            yield self._catch_up(collection)
+
+    def _catch_up(self, collection: _Collection) -> List[Change]:
+        """Apply the changes other processes made to a collection; return them.
+
+        The caller holds the collection's lock and the backend's lock on it.
+        New journal entries are applied one by one; if the stored collection
+        was rewritten, it is loaded again and compared with the records held.
+        Queued changes to the records others changed are dropped.
+        """
+        if collection.mapped or not self.backend.changed(collection.name):
+            return []
+        operations = self.backend.read_changes(collection.name, collection.model.from_dict)
+        if operations is None:
+            records = self.backend.load(collection.name, collection.model.from_dict)
+            return self._replace(collection, records)
+
+        changes = []
+        records = collection.records
+        dropped = {}
+        for op, record_id, record in operations:
+            if record_id in collection.unwritten:
+                # Written first, so it stands; the queued change would only undo it
+                dropped[record_id] = records.get(record_id) != (None if op == "delete" else record)
+            if op == "delete":
+                if records.pop(record_id, None) is None:
+                    continue
+                collection.unindex(record_id)
+                kind = CHANGE_REMOVED
+            else:
+                kind = CHANGE_UPDATED if record_id in records else CHANGE_ADDED
+                records[record_id] = record
+                collection.index(record)
+            collection.version += 1
+            changes.append(Change(collection.name, kind, record_id, collection.version))
+        if dropped:
+            self._drop_unwritten(collection, dropped)
+        return changes
+
+    def _drop_unwritten(self, collection: _Collection, dropped: Dict[str, bool]) -> None:
+        """Drop the queued changes to records other processes changed first.
+
+        ``dropped`` maps each record id to whether the queued change differed
+        from theirs; those changes are reported to ``on_write_error``.
+        """
+        for record_id in dropped:
+            del collection.unwritten[record_id]
+        self._writer.discard(collection.name, set(dropped))
+        lost = [record_id for record_id, differed in dropped.items() if differed]
+        if lost:
+            self._report_write_error(ConflictError(_dropped_message(collection, lost)))
+
+    def _wait_for_writer(self) -> None:
+        """Hold back a change while the background writer has too much queued.
+
+        Called before taking any lock; a transaction is never held back,
+        since the writer cannot proceed until it ends.
+        """
+        if self._writer is not None and self._transaction is None:
+            self._writer.wait_for_room()
+
+    def _replace(self, collection: _Collection, records: Dict[str, object]) -> List[Change]:
+        """Replace the records of a collection with a fresh copy; return the changes.
+
+        Records are compared by value, so only the ones that were added,
+        changed or removed are re-indexed and reported. If the records kept
+        are not in their old order with the new ones after them, or many
+        records were added or removed, the collection is rebuilt and
+        reported as reloaded instead. Records with queued changes keep them
+        unless they were stored differently since, in which case the queued
+        changes are dropped.
+        """
+        old = collection.records
+        dropped = {}
+        for record_id, stored in collection.unwritten.items():
+            record = records.get(record_id)
+            if record != stored:
+                dropped[record_id] = record != old.get(record_id)
+            elif record_id in old:
+                # Unchanged elsewhere; keep the change that is still to be written
+                records[record_id] = old[record_id]
+            else:
+                records.pop(record_id, None)
+        if dropped:
+            self._drop_unwritten(collection, dropped)
+        kept = [record_id for record_id in old if record_id in records]
+        added = [record_id for record_id in records if record_id not in old]
+        removed = len(old) - len(kept)
+        if removed + len(added) > len(records) // 2 or list(records) != kept + added:
+            self._fill(collection, records)
+            return [Change(collection.name, CHANGE_RELOADED, None, collection.version)]
+
+        changes = []
+        for record_id in old:
+            if record_id in records:
+                continue
+            collection.unindex(record_id)
+            collection.version += 1
+            changes.append(Change(collection.name, CHANGE_REMOVED, record_id, collection.version))
+        for record_id in kept:
+            record = records[record_id]
+            if record == old[record_id]:
+                # Keep the instance the index and any open dialog refer to
+                records[record_id] = old[record_id]
+                continue
+            collection.index(record)
+            collection.version += 1
+            changes.append(Change(collection.name, CHANGE_UPDATED, record_id, collection.version))
+        for record_id in added:
+            collection.index(records[record_id])
+            collection.version += 1
+            changes.append(Change(collection.name, CHANGE_ADDED, record_id, collection.version))
+        collection.records = records
+        return changes
+
+    def sync(self) -> List[str]:
+        """Apply the changes other processes made to the loaded collections.
+
+        Listeners are told about each change, and the names of the
+        collections that changed are returned. Checking a collection that
+        has not changed costs a few ``stat`` calls. Once the manager is
+        closed nothing is checked, so a watcher thread may outlive it.
+        """
+        if self.read_only:
+            return []
+        changed = []
+        for collection in self._collections.values():
+            with self._write_lock:
+                if (self.closed or not collection.loaded or
+                        not self.backend.changed(collection.name)):
+                    continue
+                with collection.lock, self._storage_lock(collection):
+                    changes = self._catch_up(collection)
+            if changes:
+                changed.append(collection.name)
+            for change in changes:
+                self._notify(change)
+        return changed
+
+    def _map_collection(self, collection: _Collection) -> None:
+        """Serve one collection from its mapped snapshot without reading the records."""
+        with collection.lock:
+            snapshot = self.backend.open_mapped(collection.name)
+            if snapshot is None:
+                collection.records = {}
+                collection.search_index = None
+            else:
+                collection.records = MappedRecords(snapshot, collection.model.from_dict)
+                # The snapshot searches its stored keys and returns record positions
+                collection.search_index = snapshot
+            collection.sort_orders.clear()
+            collection.aggregates_stale = collection.aggregates is not None
+            collection.version += 1
+            collection.loaded = True
+            change = Change(collection.name, CHANGE_RELOADED, None, collection.version)
+        self._notify(change)
+
+    def _aggregates(self, collection: _Collection):
+        """Return the aggregates of a collection, filling them on first use if needed."""
+        collection = self._loaded(collection)
+        if collection.aggregates_stale:
+            with collection.lock:
+                if collection.aggregates_stale:
+                    collection.aggregates.clear()
+                    for record in collection.records.values():
+                        collection.aggregates.add(record)
+                    collection.aggregates_stale = False
+        return collection.aggregates
+
+    def _check_writable(self) -> None:
+        """Refuse changes when the data was opened read-only."""
+        if self.read_only:
+            raise RuntimeError("Data is open read-only")
+
+    def _save(self, collection: _Collection) -> None:
+        """Write the full contents of a collection to the storage backend."""
+        data = [record.to_dict() for record in collection.records.values()]
+        self.backend.save(collection.name, data)
+
+    def _log(self, collection: _Collection, op: str, record_id: str, data: dict = None,
+             before=None) -> None:
+        """Persist a single mutation, compacting the collection when due.
+
+        Inside a transaction nothing is written until it commits, and with
+        background writes the change is queued for the writer thread;
+        ``before`` is the record as it was, or None if it is new.
+        """
+        if self._transaction is not None:
+            return
+        if self._writer is not None:
+            self._queue(collection, [(op, record_id, data)], {record_id: before})
+            return
+        self.backend.write(collection.name, op, record_id, data)
+        if self.backend.needs_compaction(collection.name, len(collection.records)):
+            self._save(collection)
+
+    def _queue(self, collection: _Collection, operations: List, before: Dict[str, object]) -> None:
+        """Queue changes for the writer thread, given the records as they were before them."""
+        for record_id, record in before.items():
+            # What is stored until the first queued change to the record is written
+            collection.unwritten.setdefault(record_id, record)
+        self._writer.submit(collection.name, operations)
+
+    def _remember(self, collection: _Collection, record_id: str, inserting: bool = False,
+                  deleting: bool = False) -> None:
+        """Note a record's state before the open transaction, if any, changes it."""
+        if self._transaction is None:
+            return
+        log = self._transaction.get(collection.name)
+        if log is None:
+            log = self._transaction[collection.name] = _TransactionLog()
+        if record_id not in log.before:
+            log.before[record_id] = collection.records.get(record_id)
+        if inserting:
+            log.inserted.pop(record_id, None)
+            log.inserted[record_id] = None
+        if deleting and log.order is None:
+            log.order = list(collection.records)
+
+    def _published(self, change: Change) -> Optional[Change]:
+        """Return a change to notify listeners of now, or None if a transaction defers it."""
+        return change if self._transaction is None else None
+
+    def _add(self, collection: _Collection, record) -> None:
+        """Add a record to a collection and persist it."""
+        self._check_writable()
+        self._wait_for_writer()
+        with self._write_lock, self._loaded(collection).lock, self._caught_up(collection) as external:
+            # Other processes' changes are final, so they are reported even in a transaction
+            previous = collection.records.get(record.id)
+            self._remember(collection, record.id, inserting=previous is None)
+            collection.records[record.id] = record
+            collection.index(record)
+            collection.version += 1
+            change = self._published(
+                Change(collection.name, CHANGE_ADDED, record.id, collection.version)
+            )
+            self._log(collection, "add", record.id, record.to_dict(), previous)
+        for other in external:
+            self._notify(other)
+        if change is not None:
+            self._notify(change)
+
+    def _update(self, collection: _Collection, record, expected=None) -> bool:
+        """Replace an existing record in a collection and persist it.
+
+        Raises ConflictError if ``expected`` is given and the stored record
+        no longer equals it.
+        """
+        self._check_writable()
+        self._wait_for_writer()
+        change = None
+        with self._write_lock, self._loaded(collection).lock, self._caught_up(collection) as external:
+            current = collection.records.get(record.id)
+            if current is not None:
+                if expected is not None and current != expected:
+                    raise ConflictError(_conflict_message(collection, record.id))
+                self._remember(collection, record.id)
+                collection.records[record.id] = record
+                collection.index(record)
+                collection.version += 1
+                change = self._published(
+                    Change(collection.name, CHANGE_UPDATED, record.id, collection.version)
+                )
+                self._log(collection, "update", record.id, record.to_dict(), current)
+        for other in external:
+            self._notify(other)
+        if change is not None:
+            self._notify(change)
+        return current is not None
+
+    def _delete(self, collection: _Collection, record_id: str, expected=None) -> bool:
+        """Remove a record from a collection and persist the deletion.
+
+        Raises ConflictError if ``expected`` is given and the stored record
+        no longer equals it.
+        """
+        self._check_writable()
+        self._wait_for_writer()
+        change = None
+        with self._write_lock, self._loaded(collection).lock, self._caught_up(collection) as external:
+            current = collection.records.get(record_id)
+            if current is not None:
+                if expected is not None and current != expected:
+                    raise ConflictError(_conflict_message(collection, record_id))
+                self._remember(collection, record_id, deleting=True)
+                del collection.records[record_id]
+                collection.unindex(record_id)
+                collection.version += 1
+                change = self._published(
+                    Change(collection.name, CHANGE_REMOVED, record_id, collection.version)
+                )
+                self._log(collection, "delete", record_id, before=current)
+        for other in external:
+            self._notify(other)
+        if change is not None:
+            self._notify(change)
+        return current is not None
+
+    def _bulk_add(self, collection: _Collection, records: Iterable) -> int:
+        """Validate and add many records, persisting them with one batched write.
+
+        Nothing is added unless every record is valid and has an id not yet
+        in use; otherwise ValueError lists the problems. Listeners get a
+        single reload instead of one change per record.
+        """
+        self._check_writable()
+        records = list(records)
+        self._wait_for_writer()
+        with self._write_lock, self._loaded(collection).lock, self._caught_up(collection) as external:
+            errors = []
+            new_ids = set()
+            for number, record in enumerate(records, 1):
+                try:
+                    record.validate()
+                except ValueError as error:
+                    errors.append(f"record {number}: {error}")
+                if record.id in collection.records or record.id in new_ids:
+                    errors.append(f"record {number}: duplicate id {record.id}")
+                new_ids.add(record.id)
+            if errors:
+                raise ValueError(summarize_errors(errors))
+            change = None
+            if records:
+                self._bulk_insert(collection, records)
+                change = self._published(
+                    Change(collection.name, CHANGE_RELOADED, None, collection.version)
+                )
+        for other in external:
+            self._notify(other)
+        if change is not None:
+            self._notify(change)
+        return len(records)
+
+    def _bulk_insert(self, collection: _Collection, records: List) -> None:
+        """Add validated records to a collection and write them in one batch.
+
+        The batch is one journal append, or one SQLite transaction, so its
+        cost grows with the records added rather than the collection; a
+        snapshot is written only when compaction is due.
+        """
+        for record in records:
+            self._remember(collection, record.id, inserting=True)
+            collection.records[record.id] = record
+            collection.index(record)
+        collection.version += 1
+        if self._transaction is not None:
+            return
+        operations = [("add", record.id, record.to_dict()) for record in records]
+        if self._writer is not None:
+            self._queue(collection, operations, dict.fromkeys(record.id for record in records))
+            return
+        self.backend.write_batch(collection.name, operations)
+        if self.backend.needs_compaction(collection.name, len(collection.records)):
+            self._save(collection)
+
+    @contextmanager
+    def transaction(self):
+        """Group changes so they are persisted together, or not at all.
+
+        Changes made inside ``with data_manager.transaction():`` take effect
+        in memory at once, but nothing is written until the block ends. Then
+        the net change to each record is written in one batch per
+        collection, e.g. one journal append, however many times the record
+        changed. Listeners get one reload per changed collection instead of
+        a change per record. If the block raises, every change is undone in
+        memory and nothing is written. A transaction nested in another joins
+        it. Changes from other threads wait until the transaction ends, and
+        other processes cannot change a collection from when the transaction
+        first changes it until the transaction ends.
+        """
+        self._check_writable()
+        with self._write_lock:
+            if self._transaction is not None:
+                yield
+                return
+            transaction = self._transaction = {}
+            with ExitStack() as self._transaction_locks:
+                try:
+                    yield
+                except BaseException:
+                    self._transaction = self._transaction_locks = None
+                    self._finish_transaction(transaction, commit=False)
+                    raise
+                self._transaction = self._transaction_locks = None
+                self._finish_transaction(transaction, commit=True)
+
+    def _finish_transaction(self, transaction: Dict[str, _TransactionLog], commit: bool) -> None:
+        """Persist or undo the changes of a transaction and notify listeners.
+
+        Collections are written one at a time; if writing one fails, it and
+        the collections not yet written are rolled back before re-raising.
+        """
+        pending = list(transaction.items())
+        changes = []
+        try:
+            if commit:
+                written = []
+                while pending:
+                    name, log = pending[0]
+                    collection = self._collections[name]
+                    with collection.lock:
+                        self._commit_log(collection, log)
+                        collection.version += 1
+                        changes.append(Change(name, CHANGE_RELOADED, None, collection.version))
+                    written.append(pending.pop(0)[0])
+                for name in written:
+                    collection = self._collections[name]
+                    with collection.lock:
+                        # The writer thread compacts when due as it writes
+                        if (self._writer is None and
+                                self.backend.needs_compaction(name, len(collection.records))):
+                            self._save(collection)
+        finally:
+            # Undo an aborted transaction, or whatever a failed commit did not write
+            for name, log in pending:
+                collection = self._collections[name]
+                with collection.lock:
+                    self._rollback_log(collection, log)
+                    collection.version += 1
+                    changes.append(Change(name, CHANGE_RELOADED, None, collection.version))
+            for change in changes:
+                self._notify(change)
+
+    def _commit_log(self, collection: _Collection, log: _TransactionLog) -> None:
+        """Write the net effect of a transaction on one collection as one batch."""
+        records = collection.records
+        operations = []
+        for record_id, previous in log.before.items():
+            if previous is not None and (record_id not in records or record_id in log.inserted):
+                # Deleted, or deleted and added again, which moves it to the end
+                operations.append(("delete", record_id, None))
+            elif previous is not None:
+                operations.append(("update", record_id, records[record_id].to_dict()))
+        for record_id in log.inserted:
+            if record_id in records:
+                operations.append(("add", record_id, records[record_id].to_dict()))
+        if operations and self._writer is not None:
+            before = {record_id: log.before[record_id] for _, record_id, _ in operations}
+            self._queue(collection, operations, before)
+        elif operations:
+            self.backend.write_batch(collection.name, operations)
+
+    def _rollback_log(self, collection: _Collection, log: _TransactionLog) -> None:
+        """Restore the records a transaction changed in one collection, in their order."""
+        records = collection.records
+        for record_id, previous in log.before.items():
+            if previous is None:
+                if records.pop(record_id, None) is not None:
+                    collection.unindex(record_id)
+            else:
+                records[record_id] = previous
+                collection.index(previous)
+        if log.order is not None:
+            # Put re-added records back in place; the index orders results the same way
+            collection.records = {record_id: records[record_id] for record_id in log.order}
+            collection.reindex()
+
+    def export(self, collection: str, path: str, query: str = None,
+               file_format: str = None) -> int:
+        """Write the records of the named collection to a file; return how many.
+
+        Only records matching ``query`` are written when one is given. The ids
+        are taken at the start, and records are then fetched and written a
+        chunk at a time, so the export neither copies the collection nor holds
+        its lock while writing; records deleted meanwhile are skipped. See
+        data_io.write_records for the formats.
+        """
+        collection = self._loaded(self._collections[collection])
+        with collection.lock:
+            ids = collection.search_ids(query) if query else collection.records
+            ids = ids if isinstance(ids, list) else list(ids)
+        records = collection.records
+        matching = (record for record in map(records.get, ids) if record is not None)
+        return write_records(matching, path, collection.model, file_format)
+
+    def sorted_ids(self, collection: str, field: str, descending: bool = False,
+                   ids: Iterable[str] = None) -> List[str]:
+        """Return the ids of the named collection's records sorted by a field.
+
+        ``ids``, e.g. search results, limits the result to those records. The
+        order of each field is built on first use, outside the collection's
+        lock unless the records change meanwhile, and kept up to date with
+        every change after that, so later calls only read it off. Records
+        with equal values keep their insertion order. See SORT_FIELDS for
+        the fields.
+        """
+        keys = _SORT_KEYS[collection]
+        if field not in keys:
+            raise ValueError(
+                f"Cannot sort {collection} by {field} "
+                f"(expected one of {', '.join(SORT_FIELDS[collection])})"
+            )
+        collection = self._loaded(self._collections[collection])
+        with collection.lock:
+            version = collection.version
+            order = collection.sort_orders.get(field)
+            records = list(collection.records.values()) if order is None else None
+        if order is None:
+            order = SortIndex(keys[field], records)
+            del records
+        with collection.lock:
+            if field not in collection.sort_orders:
+                if collection.version != version:
+                    # Changed while sorting; sort again rather than replay the changes
+                    order = SortIndex(keys[field], collection.records.values())
+                collection.sort_orders[field] = order
+            order = collection.sort_orders[field]
+            return order.ids(descending) if ids is None else order.sort(ids, descending)
+
+    def compact(self) -> None:
+        """Fold every pending incremental write into a full snapshot.
+
+        With background writes, the writer thread does this once it has
+        written everything queued.
+        """
+        if self.read_only:
+            return
+        if self._writer is not None:
+            self._writer.flush()
+            self._writer.call(self._compact)
         else:
-            self._save_faculties()
-    
+            self._compact()
+
+    def _compact(self) -> None:
+        """Write a snapshot of every loaded collection with journaled changes."""
+        with self._write_lock:
+            for collection in self._collections.values():
+                if self._transaction is not None and collection.name in self._transaction:
+                    # Its changes are not written until the transaction commits
+                    continue
+                if not collection.loaded:
+                    continue
+                with collection.lock, self.backend.lock(collection.name):
+                    # Writing a snapshot replaces the journal, other processes' entries included
+                    changes = self._catch_up(collection)
+                    if self.backend.pending_writes(collection.name):
+                        self._save(collection)
+                for change in changes:
+                    self._notify(change)
+
+    @property
+    def unsaved_changes(self) -> int:
+        """Number of changes queued for writing and not written yet."""
+        return 0 if self._writer is None else self._writer.pending
+
+    def flush(self, timeout: float = None) -> None:
+        """Write every queued change now and wait until it is written.
+
+        Raises the write error if writing fails, and TimeoutError if
+        ``timeout`` seconds pass first. Does nothing without background writes.
+        """
+        if self._writer is not None:
+            self._writer.flush(timeout)
+
+    def _write_queued(self, name: str, operations: List) -> None:
+        """Write a batch of queued changes to one collection, on the writer thread.
+
+        Other processes' changes since the batch was queued are applied
+        first, which drops the queued changes to the records they changed,
+        from this batch too. A snapshot that is due is encoded and written
+        after the collection's lock is released, so changes, lookups and
+        searches go on meanwhile.
+        """
+        collection = self._collections[name]
+        with ExitStack() as storage_lock:
+            with self._write_lock, collection.lock:
+                storage_lock.enter_context(self.backend.lock(name))
+                changes = self._catch_up(collection)
+                if operations:
+                    self.backend.write_batch(name, operations)
+                written = {record_id: (op, data) for op, record_id, data in operations}
+                queued = self._writer.queued(name, written)
+                for record_id, (op, data) in written.items():
+                    if record_id not in queued:
+                        collection.unwritten.pop(record_id, None)
+                    elif op == "delete":
+                        collection.unwritten[record_id] = None
+                    else:
+                        # Changed again since; conflicts are now judged against this
+                        collection.unwritten[record_id] = collection.model.from_dict(data)
+                records = None
+                if self.backend.needs_compaction(name, len(collection.records)):
+                    records = list(collection.records.values())
+                    self._saving_lock = self.backend.lock(name)
+            if records is not None:
+                try:
+                    self.backend.save(name, [record.to_dict() for record in records])
+                finally:
+                    self._saving_lock = None
+        for change in changes:
+            self._notify(change)
+
+    def _report_write_error(self, error: Exception) -> None:
+        """Pass a background write failure to ``on_write_error``."""
+        if self.on_write_error is not None:
+            self.on_write_error(error)
+
+    def close(self) -> None:
+        """Write any queued changes and release the storage backend.
+
+        Raises the write error if queued changes cannot be written; the
+        backend is released either way.
+        """
+        try:
+            if self._writer is not None:
+                self._writer.close()
+        finally:
+            with self._write_lock:
+                self.closed = True
+                self.backend.close()
+
     # Student methods
     def _save_students(self) -> None:
         """Save student data to JSON file."""
-        data = [student.to_dict() for student in self.students]
-        with open(self.student_file, "w") as f:
-            json.dump(data, f, indent=4)
-    
+        self._save(self._loaded(self._students))
+
     def get_all_students(self) -> List:
         """Return all students."""
         return self.students
-    
+
+    def get_all_student_ids(self) -> Sequence[str]:
+        """Return the IDs of all students in insertion order."""
+        collection = self._loaded(self._students)
+        if collection.mapped:
+            return collection.records.ids()
+        return list(collection.records)
+
     def add_student(self, student) -> None:
         """Add a new student."""
-        self.students.append(student)
-        self._save_students()
-    
+        self._add(self._students, student)
+
+    def bulk_add_students(self, students: Iterable) -> int:
+        """Add many students at once, writing them to storage once; return how many.
+
+        Raises ValueError, adding none, if any student is invalid.
+        """
+        return self._bulk_add(self._students, students)
+
     def get_student_by_id(self, student_id: str):
         """Get a student by ID."""
-        for student in self.students:
-            if student.id == student_id:
-                return student
-        return None
-    
-    def update_student(self, student) -> bool:
-        """Update an existing student."""
-        for i, existing_student in enumerate(self.students):
-            if existing_student.id == student.id:
-                self.students[i] = student
-                self._save_students()
-                return True
-        return False
-    
-    def delete_student(self, student_id: str) -> bool:
-        """Delete a student by ID."""
-        for i, student in enumerate(self.students):
-            if student.id == student_id:
-                del self.students[i]
-                self._save_students()
-                return True
-        return False
-    
+        return self._loaded(self._students).records.get(student_id)
+
+    def update_student(self, student, expected=None) -> bool:
+        """Update an existing student.
+
+        If ``expected`` is given, raise ConflictError unless the stored student
+        still equals it.
+        """
+        return self._update(self._students, student, expected)
+
+    def delete_student(self, student_id: str, expected=None) -> bool:
+        """Delete a student by ID.
+
+        If ``expected`` is given, raise ConflictError unless the stored student
+        still equals it.
+        """
+        return self._delete(self._students, student_id, expected)
+
     def search_students(self, query: str) -> List:
         """Search students by name or major."""
-        query = query.lower()
-        results = []
-        for student in self.students:
-            if (query in student.first_name.lower() or 
-                query in student.last_name.lower() or 
-                query in student.major.lower()):
-                results.append(student)
-        return results
-        
+        with self._loaded(self._students).lock:
+            return self._students.search(query)
+
+    def search_student_ids(self, query: str) -> Sequence[str]:
+        """Return the IDs of the students a search matches, in insertion order."""
+        with self._loaded(self._students).lock:
+            return self._students.search_ids(query)
+
+    @property
+    def student_columns(self) -> StudentColumns:
+        """Columnar store of student ages, GPAs and majors for reporting.
+
+        It is kept up to date with every change, e.g.
+        ``student_columns.mean_by_major("gpa")`` is the average GPA per major.
+        """
+        return self._aggregates(self._students)
+
     # Teacher methods
     def _save_teachers(self) -> None:
         """Save teacher data to JSON file."""
-        data = [teacher.to_dict() for teacher in self.teachers]
-        with open(self.teacher_file, "w") as f:
-            json.dump(data, f, indent=4)
-    
+        self._save(self._loaded(self._teachers))
+
     def get_all_teachers(self) -> List:
         """Return all teachers."""
         return self.teachers
-    
+
+    def get_all_teacher_ids(self) -> Sequence[str]:
+        """Return the IDs of all teachers in insertion order."""
+        collection = self._loaded(self._teachers)
+        if collection.mapped:
+            return collection.records.ids()
+        return list(collection.records)
+
     def add_teacher(self, teacher) -> None:
         """Add a new teacher."""
-        self.teachers.append(teacher)
-        self._save_teachers()
-    
+        self._add(self._teachers, teacher)
+
+    def bulk_add_teachers(self, teachers: Iterable) -> int:
+        """Add many teachers at once, writing them to storage once; return how many.
+
+        Raises ValueError, adding none, if any teacher is invalid.
+        """
+        return self._bulk_add(self._teachers, teachers)
+
     def get_teacher_by_id(self, teacher_id: str):
         """Get a teacher by ID."""
-        for teacher in self.teachers:
-            if teacher.id == teacher_id:
-                return teacher
-        return None
-    
-    def update_teacher(self, teacher) -> bool:
-        """Update an existing teacher."""
-        for i, existing_teacher in enumerate(self.teachers):
-            if existing_teacher.id == teacher.id:
-                self.teachers[i] = teacher
-                self._save_teachers()
-                return True
-        return False
-    
-    def delete_teacher(self, teacher_id: str) -> bool:
-        """Delete a teacher by ID."""
-        for i, teacher in enumerate(self.teachers):
-            if teacher.id == teacher_id:
-                del self.teachers[i]
-                self._save_teachers()
-                return True
-        return False
-    
+        return self._loaded(self._teachers).records.get(teacher_id)
+
+    def update_teacher(self, teacher, expected=None) -> bool:
+        """Update an existing teacher.
+
+        If ``expected`` is given, raise ConflictError unless the stored teacher
+        still equals it.
+        """
+        return self._update(self._teachers, teacher, expected)
+
+    def delete_teacher(self, teacher_id: str, expected=None) -> bool:
+        """Delete a teacher by ID.
+
+        If ``expected`` is given, raise ConflictError unless the stored teacher
+        still equals it.
+        """
+        return self._delete(self._teachers, teacher_id, expected)
+
     def search_teachers(self, query: str) -> List:
         """Search teachers by name, department or title."""
-        query = query.lower()
-        results = []
-        for teacher in self.teachers:
-            if (query in teacher.first_name.lower() or 
-                query in teacher.last_name.lower() or 
-                query in teacher.department.lower() or
-                query in teacher.title.lower()):
-                results.append(teacher)
-        return results
-        
+        with self._loaded(self._teachers).lock:
+            return self._teachers.search(query)
+
+    def search_teacher_ids(self, query: str) -> Sequence[str]:
+        """Return the IDs of the teachers a search matches, in insertion order."""
+        with self._loaded(self._teachers).lock:
+            return self._teachers.search_ids(query)
+
+    @property
+    def teacher_stats(self) -> TeacherStats:
+        """Teacher counts per department and title, kept up to date with every change."""
+        return self._aggregates(self._teachers)
+
     # Faculty methods
     def _save_faculties(self) -> None:
         """Save faculty data to JSON file."""
-        data = [faculty.to_dict() for faculty in self.faculties]
-        with open(self.faculty_file, "w") as f:
-            json.dump(data, f, indent=4)
-    
+        self._save(self._loaded(self._faculties))
+
     def get_all_faculties(self) -> List:
         """Return all faculties."""
         return self.faculties
-    
+
+    def get_all_faculty_ids(self) -> Sequence[str]:
+        """Return the IDs of all faculties in insertion order."""
+        collection = self._loaded(self._faculties)
+        if collection.mapped:
+            return collection.records.ids()
+        return list(collection.records)
+
     def add_faculty(self, faculty) -> None:
         """Add a new faculty."""
-        self.faculties.append(faculty)
-        self._save_faculties()
-    
+        self._add(self._faculties, faculty)
+
+    def bulk_add_faculties(self, faculties: Iterable) -> int:
+        """Add many faculties at once, writing them to storage once; return how many.
+
+        Raises ValueError, adding none, if any faculty is invalid.
+        """
+        return self._bulk_add(self._faculties, faculties)
+
     def get_faculty_by_id(self, faculty_id: str):
         """Get a faculty by ID."""
-        for faculty in self.faculties:
-            if faculty.id == faculty_id:
-                return faculty
-        return None
-    
-    def update_faculty(self, faculty) -> bool:
-        """Update an existing faculty."""
-        for i, existing_faculty in enumerate(self.faculties):
-            if existing_faculty.id == faculty.id:
-                self.faculties[i] = faculty
-                self._save_faculties()
-                return True
-        return False
-    
-    def delete_faculty(self, faculty_id: str) -> bool:
-        """Delete a faculty by ID."""
-        for i, faculty in enumerate(self.faculties):
-            if faculty.id == faculty_id:
-                del self.faculties[i]
-                self._save_faculties()
-                return True
-        return False
-    
+        return self._loaded(self._faculties).records.get(faculty_id)
+
+    def update_faculty(self, faculty, expected=None) -> bool:
+        """Update an existing faculty.
+
+        If ``expected`` is given, raise ConflictError unless the stored faculty
+        still equals it.
+        """
+        return self._update(self._faculties, faculty, expected)
+
+    def delete_faculty(self, faculty_id: str, expected=None) -> bool:
+        """Delete a faculty by ID.
+
+        If ``expected`` is given, raise ConflictError unless the stored faculty
+        still equals it.
+        """
+        return self._delete(self._faculties, faculty_id, expected)
+
     def search_faculties(self, query: str) -> List:
         """Search faculties by name, building, or head name."""
-        query = query.lower()
-        results = []
-        for faculty in self.faculties:
-            if (query in faculty.name.lower() or 
-                query in faculty.building.lower() or
-                query in faculty.head_name.lower()):
-                results.append(faculty)
-        return results
\ No newline at end of file
+        with self._loaded(self._faculties).lock:
+            return self._faculties.search(query)
+
+    def search_faculty_ids(self, query: str) -> Sequence[str]:
+        """Return the IDs of the faculties a search matches, in insertion order."""
+        with self._loaded(self._faculties).lock:
+            return self._faculties.search_ids(query)
+
+    @property
+    def faculty_stats(self) -> FacultyStats:
+        """Staff numbers per faculty and in total, kept up to date with every change."""
+        return self._aggregates(self._faculties)
\ No newline at end of file
@@ -0,0 +1,290 @@
+import json
+import mmap
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence, ValuesView
+from typing import Callable, Iterator, List, Optional
+
+from models import build_search_key
+from search_index import normalize_query
+
+
+# First bytes of a mapped snapshot
+MAPPED_MAGIC = b"UMMAP\x01\x00\x00"
+
+# Magic, record count, then the start of every section in file order:
+# record offsets, records, id offsets, ids, id order, search key offsets, search keys
+_HEADER = struct.Struct("<8sQ7Q")
+
+# Terminates every search key, so a match never spans two records
+_KEY_END = b"\n"
+
+
+def _align(parts: List[bytes], size: int) -> int:
+    """Pad the parts written so far to a multiple of 8 bytes; return the new size."""
+    padding = -size % 8
+    if padding:
+        parts.append(b"\0" * padding)
+    return size + padding
+
+
+def _table(table: array) -> bytes:
+    """Return the little-endian bytes of an integer table."""
+    if sys.byteorder == "big":
+        table = array(table.typecode, table)
+        table.byteswap()
+    return table.tobytes()
+
+
+def encode_mapped_snapshot(data: List[dict], search_fields=()) -> bytes:
+    """Encode records in the fixed-layout format read by MappedSnapshot.
+
+    Each record is stored as compact JSON at an offset listed in a table, so
+    any one record can be decoded without reading the others. Ids are also
+    stored on their own together with their sorted order for lookups by id,
+    and the normalised search key built from ``search_fields`` is stored for
+    every record so searches scan the file instead of decoded records.
+    """
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    # Sections are appended to in one pass; each offset table starts at 0
+    records, ids, keys = bytearray(), bytearray(), bytearray()
+    record_offsets, id_offsets, key_offsets = array("Q", [0]), array("Q", [0]), array("Q", [0])
+    for item in data:
+        records += encode(item).encode("utf-8")
+        record_offsets.append(len(records))
+        ids += item["id"].encode("utf-8")
+        id_offsets.append(len(ids))
+        key = build_search_key(*(item.get(field) for field in search_fields))
+        keys += key.replace("\n", " ").encode("utf-8")
+        keys += _KEY_END
+        key_offsets.append(len(keys))
+
+    def id_at(index):
+        return ids[id_offsets[index]:id_offsets[index + 1]]
+
+    order = array("I", sorted(range(len(data)), key=id_at))
+
+    parts: List[bytes] = []
+    size = _HEADER.size
+    starts = []
+    for section in (
+        _table(record_offsets), records,
+        _table(id_offsets), ids,
+        _table(order),
+        _table(key_offsets), keys,
+    ):
+        starts.append(size)
+        parts.append(section)
+        size = _align(parts, size + len(section))
+    return _HEADER.pack(MAPPED_MAGIC, len(data), *starts) + b"".join(parts)
+
+
+class MappedSnapshot:
+    """Read-only view of a mapped snapshot file through ``mmap``.
+
+    Opening the file only reads its header; records, ids and search keys are
+    decoded from the mapping when asked for, so the cost of opening does not
+    depend on the number of records. Records are identified by their
+    position in insertion order.
+    """
+
+    def __init__(self, path: str):
+        """Map the snapshot at the given path; raise ValueError if it is not one."""
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as error:
+            self._file.close()
+            raise ValueError(f"{path} is empty") from error
+        self._views = []
+        try:
+            self._read_header()
+        except (ValueError, TypeError, struct.error) as error:
+            self.close()
+            raise ValueError(f"{path} is not a valid mapped snapshot: {error}") from error
+
+    def _read_header(self) -> None:
+        """Check the header and set up the offset tables."""
+        if len(self._map) < _HEADER.size:
+            raise ValueError("file too short")
+        magic, count, *starts = _HEADER.unpack_from(self._map, 0)
+        if magic != MAPPED_MAGIC:
+            raise ValueError("bad magic")
+        self._count = count
+        (record_offsets, self._records_start, id_offsets, self._ids_start,
+         id_order, key_offsets, self._keys_start) = starts
+
+        self._record_offsets = self._table(record_offsets, "Q", count + 1)
+        self._id_offsets = self._table(id_offsets, "Q", count + 1)
+        self._id_order = self._table(id_order, "I", count)
+        self._key_offsets = self._table(key_offsets, "Q", count + 1)
+        self._keys_end = self._keys_start + self._key_offsets[count]
+        if (self._records_start + self._record_offsets[count] > len(self._map) or
+                self._ids_start + self._id_offsets[count] > len(self._map) or
+                self._keys_end > len(self._map)):
+            raise ValueError("sections extend past the end of the file")
+
+    def _table(self, start: int, typecode: str, count: int):
+        """Return an integer table stored in the file without copying it."""
+        itemsize = array(typecode).itemsize
+        end = start + count * itemsize
+        if end > len(self._map):
+            raise ValueError("table extends past the end of the file")
+        if sys.byteorder == "big":
+            # Tables are little-endian; only big-endian machines pay for a copy
+            table = array(typecode, self._map[start:end])
+            table.byteswap()
+            return table
+        view = memoryview(self._map)[start:end].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def __len__(self) -> int:
+        return self._count
+
+    def record(self, index: int) -> dict:
+        """Decode the record at the given position."""
+        start = self._records_start + self._record_offsets[index]
+        end = self._records_start + self._record_offsets[index + 1]
+        return json.loads(self._map[start:end])
+
+    def record_id(self, index: int) -> str:
+        """Return the id of the record at the given position."""
+        start = self._ids_start + self._id_offsets[index]
+        end = self._ids_start + self._id_offsets[index + 1]
+        return self._map[start:end].decode("utf-8")
+
+    def index_of(self, record_id: str) -> Optional[int]:
+        """Return the position of the record with the given id, if there is one."""
+        order = self._id_order
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.record_id(order[middle]) < record_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self.record_id(order[low]) == record_id:
+            return order[low]
+        return None
+
+    def search(self, query: str) -> Sequence:
+        """Return the positions of the records with a search field containing the query.
+
+        The stored search keys are scanned with ``mmap.find``, so records
+        that do not match are never decoded. Positions are in insertion order.
+        """
+        needle = normalize_query(query).replace("\n", "").encode("utf-8")
+        if not needle:
+            return range(self._count)
+
+        matches = array("I")
+        offsets = self._key_offsets
+        start, end = self._keys_start, self._keys_end
+        position = self._map.find(needle, start, end)
+        while position != -1:
+            index = bisect_right(offsets, position - start) - 1
+            matches.append(index)
+            # Continue after the key of the record just matched
+            position = self._map.find(needle, start + offsets[index + 1], end)
+        return matches
+
+    def close(self) -> None:
+        """Unmap the file."""
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self._map.close()
+        self._file.close()
+
+
+def iter_mapped_snapshot(path: str) -> Iterator[dict]:
+    """Yield every record of a mapped snapshot in order."""
+    snapshot = MappedSnapshot(path)
+    try:
+        for index in range(len(snapshot)):
+            yield snapshot.record(index)
+    finally:
+        snapshot.close()
+
+
+class MappedIds(Sequence):
+    """Lazy sequence of the ids of some or all records of a mapped snapshot."""
+
+    def __init__(self, snapshot: MappedSnapshot, positions: Sequence = None):
+        """Cover the records at the given positions, or every record."""
+        self._snapshot = snapshot
+        self._positions = range(len(snapshot)) if positions is None else positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._snapshot.record_id(position) for position in self._positions[index]]
+        return self._snapshot.record_id(self._positions[index])
+
+
+class _MappedValues(ValuesView):
+    """Records of a MappedRecords, decoded in file order without caching them."""
+
+    def __iter__(self):
+        records = self._mapping
+        for index in range(len(records.snapshot)):
+            yield records._factory(records.snapshot.record(index))
+
+
+class MappedRecords(Mapping):
+    """Read-only mapping of id to record over a mapped snapshot.
+
+    Records are decoded and passed to ``factory`` when looked up; the most
+    recently used ones are kept so redrawing a screen does not decode again.
+    """
+
+    def __init__(self, snapshot: MappedSnapshot, factory: Callable[[dict], object],
+                 cache_size: int = 1024):
+        """Wrap a snapshot, building records with the given factory."""
+        self.snapshot = snapshot
+        self._factory = factory
+        self._cache: "OrderedDict[str, object]" = OrderedDict()
+        self._cache_size = cache_size
+        # Lookups come from the UI thread and from search workers
+        self._cache_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(MappedIds(self.snapshot))
+
+    def __contains__(self, record_id) -> bool:
+        return record_id in self._cache or self.snapshot.index_of(record_id) is not None
+
+    def __getitem__(self, record_id: str):
+        with self._cache_lock:
+            record = self._cache.get(record_id)
+            if record is not None:
+                self._cache.move_to_end(record_id)
+                return record
+
+        index = self.snapshot.index_of(record_id)
+        if index is None:
+            raise KeyError(record_id)
+        record = self._factory(self.snapshot.record(index))
+        with self._cache_lock:
+            self._cache[record_id] = record
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return record
+
+    def values(self) -> ValuesView:
+        return _MappedValues(self)
+
+    def ids(self, positions: Sequence = None) -> MappedIds:
+        """Return the ids of the records at the given positions, or of every record."""
+        return MappedIds(self.snapshot, positions)
@@ -1,9 +1,90 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from typing import Optional
+import sys
+import unicodedata
 import uuid
 
 
-@dataclass
+# Joins the normalised field values inside a search key
+SEARCH_KEY_SEPARATOR = "\x1f"
+
+# Inclusive bounds enforced by validate(), in the forms and on bulk imports
+STUDENT_AGE_RANGE = (16, 99)
+TEACHER_AGE_RANGE = (18, 99)
+GPA_RANGE = (0.0, 4.0)
+ESTABLISHED_YEAR_RANGE = (1500, 2025)  # Update this as needed
+
+
+def normalize_search_text(text: str) -> str:
+    """Casefold text and strip accents so that "José" matches "jose"."""
+    text = text.casefold()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def build_search_key(*values) -> str:
+    """Build the normalised search key from a record's searchable values."""
+    return SEARCH_KEY_SEPARATOR.join(normalize_search_text(value or "") for value in values)
+
+
+def _check_required(record, *names) -> None:
+    """Raise ValueError if any of the named text fields is empty."""
+    for name in names:
+        if not getattr(record, name):
+            raise ValueError(f"{name.replace('_', ' ').capitalize()} is required")
+
+
+def _check_number(value, label: str, bounds=None, integer: bool = False) -> None:
+    """Raise ValueError unless the value is a number (an int if asked) within the bounds."""
+    kinds = int if integer else (int, float)
+    if isinstance(value, bool) or not isinstance(value, kinds):
+        raise ValueError(f"{label} must be {'an integer' if integer else 'a number'}")
+    if bounds is not None and not (bounds[0] <= value <= bounds[1]):
+        raise ValueError(f"{label} must be between {bounds[0]} and {bounds[1]}")
+
+
+def _intern(value):
+    """Intern a string so records sharing a value (e.g. a major) share one object."""
+    # sys.intern rejects str subclasses, so isinstance() would not do
+    return sys.intern(value) if type(value) is str else value  # pylint: disable=unidiomatic-typecheck
+
+
+def _slotted_dataclass(cls):
+    """Turn a class into a dataclass whose instances use __slots__ instead of a __dict__.
+
+    Slotted records take about a quarter less memory (see
+    ``benchmarks/model_memory.py``), not counting the search key each one
+    caches once it is searched. ``dataclass(slots=True)`` needs Python 3.10,
+    so older versions rebuild the class the same way.
+    """
+    if sys.version_info >= (3, 10):
+        return dataclass(slots=True)(cls)
+
+    cls = dataclass(cls)
+    names = tuple(item.name for item in fields(cls))
+    namespace = dict(cls.__dict__)
+    namespace["__slots__"] = names
+    # Defaults live in __init__; as class attributes they would clash with the slots
+    for name in names + ("__dict__", "__weakref__"):
+        namespace.pop(name, None)
+
+    # Fields left out of __init__ were only defaulted through the class attribute
+    init = cls.__init__
+    unset = [(item.name, item.default) for item in fields(cls) if not item.init]
+
+    def __init__(self, *args, **kwargs):
+        for name, default in unset:
+            setattr(self, name, default)
+        init(self, *args, **kwargs)
+
+    __init__.__doc__ = init.__doc__
+    namespace["__init__"] = __init__
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_slotted_dataclass
 class Student:
     """Represents a university student."""
     first_name: str
@@ -13,6 +94,10 @@ class Student:
     gpa: float
     id: str = None
 
+    # Searchable values and the key built from them; see search_key()
+    # pylint: disable-next=invalid-field-call  # Made a dataclass by _slotted_dataclass
+    _search_cache: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+
     def __post_init__(self):
         if self.id is None:
             self.id = str(uuid.uuid4())
@@ -20,6 +105,27 @@ class Student:
     def full_name(self) -> str:
         """Return student's full name."""
         return f"{self.first_name} {self.last_name}"
+
+    def search_key(self) -> str:
+        """Return the normalised first name, last name and major for searching.
+
+        The key is cached and rebuilt only when one of those fields has been
+        reassigned, so repeated searches do not allocate per record.
+        """
+        cache = self._search_cache
+        if (cache is None or cache[0] is not self.first_name or
+                cache[1] is not self.last_name or cache[2] is not self.major):
+            cache = self._search_cache = (
+                self.first_name, self.last_name, self.major,
+                build_search_key(self.first_name, self.last_name, self.major),
+            )
+        return cache[3]
+
+    def validate(self) -> None:
+        """Raise ValueError if a field is missing, or the age or GPA is out of range."""
+        _check_required(self, "first_name", "last_name", "major")
+        _check_number(self.age, "Age", STUDENT_AGE_RANGE, integer=True)
+        _check_number(self.gpa, "GPA", GPA_RANGE)
     
     def to_dict(self) -> dict:
         """Convert student object to dictionary for storage."""
@@ -40,12 +146,12 @@ class Student:
             first_name=data.get("first_name"),
             last_name=data.get("last_name"),
             age=data.get("age"),
-            major=data.get("major"),
+            major=_intern(data.get("major")),
             gpa=data.get("gpa")
         )
 
 
-@dataclass
+@_slotted_dataclass
 class Teacher:
     """Represents a university teacher."""
     first_name: str
@@ -54,6 +160,10 @@ class Teacher:
     department: str
     title: str  # e.g., "Professor", "Assistant Professor", etc.
     id: str = None
+
+    # Searchable values and the key built from them; see search_key()
+    # pylint: disable-next=invalid-field-call  # Made a dataclass by _slotted_dataclass
+    _search_cache: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.id is None:
@@ -62,6 +172,27 @@ class Teacher:
     def full_name(self) -> str:
         """Return teacher's full name."""
         return f"{self.first_name} {self.last_name}"
+
+    def search_key(self) -> str:
+        """Return the normalised name, department and title for searching.
+
+        The key is cached and rebuilt only when one of those fields has been
+        reassigned.
+        """
+        cache = self._search_cache
+        if (cache is None or cache[0] is not self.first_name or
+                cache[1] is not self.last_name or cache[2] is not self.department or
+                cache[3] is not self.title):
+            cache = self._search_cache = (
+                self.first_name, self.last_name, self.department, self.title,
+                build_search_key(self.first_name, self.last_name, self.department, self.title),
+            )
+        return cache[4]
+
+    def validate(self) -> None:
+        """Raise ValueError if a field is missing or the age is out of range."""
+        _check_required(self, "first_name", "last_name", "department", "title")
+        _check_number(self.age, "Age", TEACHER_AGE_RANGE, integer=True)
     
     def to_dict(self) -> dict:
         """Convert teacher object to dictionary for storage."""
@@ -82,12 +213,12 @@ class Teacher:
             first_name=data.get("first_name"),
             last_name=data.get("last_name"),
             age=data.get("age"),
-            department=data.get("department"),
-            title=data.get("title")
+            department=_intern(data.get("department")),
+            title=_intern(data.get("title"))
         )
 
 
-@dataclass
+@_slotted_dataclass
 class Faculty:
     """Represents a university faculty/department."""
     name: str
@@ -96,10 +227,38 @@ class Faculty:
     established_year: int
     num_staff: int
     id: str = None
+
+    # Searchable values and the key built from them; see search_key()
+    # pylint: disable-next=invalid-field-call  # Made a dataclass by _slotted_dataclass
+    _search_cache: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.id is None:
             self.id = str(uuid.uuid4())
+
+    def search_key(self) -> str:
+        """Return the normalised name, building and head name for searching.
+
+        The key is cached and rebuilt only when one of those fields has been
+        reassigned.
+        """
+        cache = self._search_cache
+        if (cache is None or cache[0] is not self.name or
+                cache[1] is not self.building or cache[2] is not self.head_name):
+            cache = self._search_cache = (
+                self.name, self.building, self.head_name,
+                build_search_key(self.name, self.building, self.head_name),
+            )
+        return cache[3]
+
+    def validate(self) -> None:
+        """Raise ValueError if a field is missing, or the year or staff number is invalid."""
+        _check_required(self, "name", "building", "head_name")
+        _check_number(self.established_year, "Established year", ESTABLISHED_YEAR_RANGE,
+                      integer=True)
+        _check_number(self.num_staff, "Number of staff", integer=True)
+        if self.num_staff <= 0:
+            raise ValueError("Number of staff must be positive")
     
     def to_dict(self) -> dict:
         """Convert faculty object to dictionary for storage."""
@@ -118,7 +277,7 @@ class Faculty:
         return cls(
             id=data.get("id"),
             name=data.get("name"),
-            building=data.get("building"),
+            building=_intern(data.get("building")),
             head_name=data.get("head_name"),
             established_year=data.get("established_year"),
             num_staff=data.get("num_staff")
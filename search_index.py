@@ -0,0 +1,124 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+
+from models import SEARCH_KEY_SEPARATOR, normalize_search_text
+
+
+def _trigrams(value: str) -> Set[str]:
+    """Return the distinct three-character substrings of a value."""
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def normalize_query(query: str) -> str:
+    """Normalise a search query the same way record search keys are."""
+    return normalize_search_text(query).replace(SEARCH_KEY_SEPARATOR, "")
+
+
+class SearchIndex:
+    """Incrementally maintained substring index over record search keys.
+
+    Records provide their normalised searchable field values through
+    ``search_key()``. The values are indexed by distinct value rather than
+    per record: each distinct value maps to the ids of the records that
+    contain it, and each trigram maps to the distinct values containing it.
+    A query of three or more characters intersects the posting lists of its
+    trigrams to find candidate values and only verifies those, so names and
+    majors shared by many records are checked once per query.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        # Search key of every indexed record, shared with the record's cache
+        self._record_keys: Dict[str, str] = {}
+        # Insertion sequence of every record, used to return results in order
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+        # Distinct value -> ids of the records having it in any field
+        self._value_ids: Dict[str, Set[str]] = {}
+        # Trigram -> distinct values containing it
+        self._trigram_values: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._record_keys)
+
+    def clear(self) -> None:
+        """Remove every record from the index."""
+        self._record_keys.clear()
+        self._order.clear()
+        self._next_order = 0
+        self._value_ids.clear()
+        self._trigram_values.clear()
+
+    def add(self, record) -> None:
+        """Index a record, replacing any previous version with the same id."""
+        if record.id in self._record_keys:
+            self._unindex_values(record.id)
+        else:
+            self._order[record.id] = self._next_order
+            self._next_order += 1
+
+        key = record.search_key()
+        self._record_keys[record.id] = key
+        for value in set(key.split(SEARCH_KEY_SEPARATOR)):
+            ids = self._value_ids.get(value)
+            if ids is None:
+                ids = self._value_ids[value] = set()
+                for trigram in _trigrams(value):
+                    self._trigram_values[trigram].add(value)
+            ids.add(record.id)
+
+    def remove(self, record_id: str) -> None:
+        """Remove a record from the index."""
+        if record_id not in self._record_keys:
+            return
+        self._unindex_values(record_id)
+        del self._record_keys[record_id]
+        del self._order[record_id]
+
+    def _unindex_values(self, record_id: str) -> None:
+        """Detach a record from the distinct values it was indexed under."""
+        for value in set(self._record_keys[record_id].split(SEARCH_KEY_SEPARATOR)):
+            ids = self._value_ids[value]
+            ids.discard(record_id)
+            if not ids:
+                del self._value_ids[value]
+                for trigram in _trigrams(value):
+                    values = self._trigram_values[trigram]
+                    values.discard(value)
+                    if not values:
+                        del self._trigram_values[trigram]
+
+    def _candidate_values(self, query: str) -> Iterable[str]:
+        """Return the distinct values that may contain the query."""
+        if len(query) < 3:
+            return self._value_ids
+
+        postings = []
+        for trigram in _trigrams(query):
+            values = self._trigram_values.get(trigram)
+            if not values:
+                return ()
+            postings.append(values)
+        postings.sort(key=len)
+        return set.intersection(*postings)
+
+    def search(self, query: str) -> List[str]:
+        """Return the ids of records with a field containing the query.
+
+        Matching ignores case and accents, and ids are returned in the order
+        the records were first added.
+        """
+        query = normalize_query(query)
+        if not query:
+            # Ids are never re-inserted, so this dict is already in order
+            return list(self._order)
+
+        matches: Set[str] = set()
+        for value in self._candidate_values(query):
+            if query in value:
+                matches.update(self._value_ids[value])
+
+        # Sorting a small result set is cheaper than a pass over every id
+        if len(matches) < len(self._order) // 8:
+            return sorted(matches, key=self._order.__getitem__)
+        return [record_id for record_id in self._order if record_id in matches]
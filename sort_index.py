@@ -0,0 +1,63 @@
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+class SortIndex:
+    """Record ids kept in order of one sort key, maintained as records change.
+
+    Entries are ``(key, sequence, id)`` tuples in a sorted list, where the
+    sequence numbers records in insertion order so records with equal keys
+    keep their order. Sorting all records costs one sort when the index is
+    built; after that a change moves one entry with a binary search, and
+    the ordered ids are read off the list.
+    """
+
+    def __init__(self, key: Callable[[object], object], records: Iterable = ()):
+        """Build the index of the records, in insertion order, by the given key function."""
+        self._key = key
+        self._entries: List[Tuple[object, int, str]] = []
+        # Entry of every indexed record, to find it again when it changes
+        self._by_id: Dict[str, Tuple[object, int, str]] = {}
+        for sequence, record in enumerate(records):
+            entry = (key(record), sequence, record.id)
+            self._entries.append(entry)
+            self._by_id[record.id] = entry
+        self._entries.sort()
+        self._next_sequence = len(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, record) -> None:
+        """Index a record, moving it if an earlier version with the same id is indexed."""
+        key = self._key(record)
+        previous = self._by_id.get(record.id)
+        if previous is None:
+            sequence = self._next_sequence
+            self._next_sequence += 1
+        elif key == previous[0]:
+            return
+        else:
+            # An edit keeps the record's place among equal keys
+            sequence = previous[1]
+            del self._entries[bisect_left(self._entries, previous)]
+        entry = self._by_id[record.id] = (key, sequence, record.id)
+        insort(self._entries, entry)
+
+    def remove(self, record_id: str) -> None:
+        """Remove a record from the index."""
+        entry = self._by_id.pop(record_id, None)
+        if entry is not None:
+            del self._entries[bisect_left(self._entries, entry)]
+
+    def ids(self, descending: bool = False) -> List[str]:
+        """Return the ids of every record in key order."""
+        entries = reversed(self._entries) if descending else self._entries
+        return [entry[2] for entry in entries]
+
+    def sort(self, ids: Iterable[str], descending: bool = False) -> List[str]:
+        """Return the given ids in key order, e.g. search results; unknown ids are left out."""
+        by_id = self._by_id
+        known = [record_id for record_id in ids if record_id in by_id]
+        known.sort(key=by_id.__getitem__, reverse=descending)
+        return known
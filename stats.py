@@ -0,0 +1,140 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+
+def _uncount(counter: Counter, key) -> None:
+    """Decrement a key of a counter, dropping it when it reaches zero."""
+    remaining = counter[key] - 1
+    if remaining > 0:
+        counter[key] = remaining
+    else:
+        del counter[key]
+
+
+class ValueCounts:
+    """Multiset of numeric values with a running count and total.
+
+    Values are counted per distinct value, rounded to ``precision`` decimal
+    places when given, so the minimum, maximum and histograms cost one step
+    per distinct value, however many records there are. The total and mean
+    use the unrounded values.
+    """
+
+    def __init__(self, precision: int = None):
+        """Initialize an empty multiset."""
+        self.precision = precision
+        self.counts: Counter = Counter()
+        self.count = 0
+        self.total = 0
+
+    def _key(self, value):
+        return value if self.precision is None else round(value, self.precision)
+
+    def add(self, value) -> None:
+        """Count one occurrence of a value."""
+        self.counts[self._key(value)] += 1
+        self.count += 1
+        self.total += value
+
+    def remove(self, value) -> None:
+        """Forget one occurrence of a value that was added."""
+        _uncount(self.counts, self._key(value))
+        self.count -= 1
+        self.total -= value
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Average of the values, or None when there are none."""
+        return self.total / self.count if self.count else None
+
+    @property
+    def min(self):
+        """Smallest value, or None when there are none."""
+        return min(self.counts) if self.counts else None
+
+    @property
+    def max(self):
+        """Largest value, or None when there are none."""
+        return max(self.counts) if self.counts else None
+
+    def histogram(self, bin_width: float, start: float = 0) -> List[Tuple[float, int]]:
+        """Return ``(bin start, count)`` pairs for the non-empty bins, in order."""
+        bins: Counter = Counter()
+        for value, count in self.counts.items():
+            bins[start + (value - start) // bin_width * bin_width] += count
+        return sorted(bins.items())
+
+
+class TeacherStats:
+    """Teacher counts per department and per title, updated on every change."""
+
+    def __init__(self):
+        """Initialize empty counters."""
+        self._values: Dict[str, Tuple[str, str]] = {}
+        self.departments: Counter = Counter()
+        self.titles: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def clear(self) -> None:
+        """Forget every teacher."""
+        self._values.clear()
+        self.departments.clear()
+        self.titles.clear()
+
+    def add(self, teacher) -> None:
+        """Count a teacher, replacing any previous version with its id."""
+        self.remove(teacher.id)
+        values = self._values[teacher.id] = (teacher.department or "", teacher.title or "")
+        self.departments[values[0]] += 1
+        self.titles[values[1]] += 1
+
+    def remove(self, teacher_id: str) -> None:
+        """Stop counting a teacher."""
+        values = self._values.pop(teacher_id, None)
+        if values is not None:
+            _uncount(self.departments, values[0])
+            _uncount(self.titles, values[1])
+
+
+class FacultyStats:
+    """Staff numbers per faculty and in total, updated on every change."""
+
+    def __init__(self):
+        """Initialize empty totals."""
+        self._values: Dict[str, Tuple[str, int]] = {}
+        self._names: Counter = Counter()
+        # Faculty name -> staff, summed over faculties sharing a name
+        self.staff_by_faculty: Counter = Counter()
+        self.total_staff = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def clear(self) -> None:
+        """Forget every faculty."""
+        self._values.clear()
+        self._names.clear()
+        self.staff_by_faculty.clear()
+        self.total_staff = 0
+
+    def add(self, faculty) -> None:
+        """Count a faculty, replacing any previous version with its id."""
+        self.remove(faculty.id)
+        name, staff = self._values[faculty.id] = (faculty.name or "", int(faculty.num_staff or 0))
+        self._names[name] += 1
+        self.staff_by_faculty[name] += staff
+        self.total_staff += staff
+
+    def remove(self, faculty_id: str) -> None:
+        """Stop counting a faculty."""
+        values = self._values.pop(faculty_id, None)
+        if values is None:
+            return
+        name, staff = values
+        self.total_staff -= staff
+        self.staff_by_faculty[name] -= staff
+        _uncount(self._names, name)
+        if name not in self._names:
+            del self.staff_by_faculty[name]
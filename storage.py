@@ -0,0 +1,1047 @@
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from contextlib import nullcontext
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from mapped_snapshot import (
+    MAPPED_MAGIC,
+    MappedSnapshot,
+    encode_mapped_snapshot,
+    iter_mapped_snapshot,
+)
+
+
+# Unix locks files through fcntl, Windows through msvcrt
+fcntl = msvcrt = None
+try:
+    import fcntl
+except ImportError:
+    pass
+try:
+    import msvcrt
+except ImportError:
+    pass
+
+
+# Name of the environment variable that selects the default storage backend
+BACKEND_ENV_VAR = "UNIVERSITY_MANAGER_BACKEND"
+
+# Columns of every collection, in storage order, with their SQLite types
+SCHEMA = {
+    "students": (
+        ("id", "TEXT"),
+        ("first_name", "TEXT"),
+        ("last_name", "TEXT"),
+        ("age", "INTEGER"),
+        ("major", "TEXT"),
+        ("gpa", "REAL"),
+    ),
+    "teachers": (
+        ("id", "TEXT"),
+        ("first_name", "TEXT"),
+        ("last_name", "TEXT"),
+        ("age", "INTEGER"),
+        ("department", "TEXT"),
+        ("title", "TEXT"),
+    ),
+    "faculties": (
+        ("id", "TEXT"),
+        ("name", "TEXT"),
+        ("building", "TEXT"),
+        ("head_name", "TEXT"),
+        ("established_year", "INTEGER"),
+        ("num_staff", "INTEGER"),
+    ),
+}
+
+# Characters of JSON text read at a time by the streaming snapshot reader
+READ_CHUNK_SIZE = 1 << 16
+
+# Snapshot formats written by the JSON backend, with their file extensions
+SNAPSHOT_FORMATS = {"json": ".json", "binary": ".bin", "mapped": ".map"}
+
+# First bytes of a binary snapshot, followed by a flags byte
+BINARY_MAGIC = b"UMSNAP\x01"
+_FLAG_ZLIB = 1
+
+# Control characters that may join the values of a text column in a binary
+# snapshot; the first one no value contains is used
+_TEXT_SEPARATORS = "\x00\x1e\x1f"
+
+# Range of the integers a packed "q" column holds; larger ones are stored as JSON
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+# JSON whitespace, and the characters that may follow a number in an array
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_END = ",] \t\n\r"
+
+# Fields whose normalised text is searched, as in each model's search_key();
+# mapped snapshots store the search key of every record
+SEARCH_FIELDS = {
+    "students": ("first_name", "last_name", "major"),
+    "teachers": ("first_name", "last_name", "department", "title"),
+    "faculties": ("name", "building", "head_name"),
+}
+
+# Secondary indexes created by the SQLite backend
+SQLITE_INDEXES = {
+    "students": ("first_name", "last_name", "major"),
+    "teachers": ("first_name", "last_name", "department"),
+    "faculties": ("name",),
+}
+
+
+class FileLock:
+    """Advisory exclusive lock shared by every process using the same lock file.
+
+    The lock is re-entrant within a process and also excludes other threads
+    of the process. Processes that do not take the lock are not stopped.
+    """
+
+    def __init__(self, path: str):
+        """Initialize the lock held on the file at the given path."""
+        self.path = path
+        self._file = None
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+
+    def __enter__(self) -> "FileLock":
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                if self._file is None:
+                    self._file = open(self.path, "a+b")
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+                else:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._thread_lock.release()
+
+    def close(self) -> None:
+        """Close the lock file; the lock must not be held."""
+        with self._thread_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Journal:
+    """Append-only JSON Lines log of mutations made to one collection.
+
+    Each line records a single ``add``, ``update`` or ``delete`` operation.
+    Replaying the journal on top of the last snapshot reproduces the current
+    state, so a mutation costs one small append instead of a full rewrite.
+    """
+
+    def __init__(self, path: str):
+        """Initialize the journal stored at the given path."""
+        self.path = path
+        self.entries = 0
+        # Bytes of the journal already applied; anything after was written by others
+        self.offset = 0
+
+    def append(self, op: str, record_id: str, data: Optional[dict] = None) -> None:
+        """Append a single operation to the journal."""
+        self.extend([(op, record_id, data)])
+
+    def extend(self, operations: List[Tuple[str, str, Optional[dict]]]) -> None:
+        """Append ``(op, record_id, data)`` operations with a single write."""
+        lines = []
+        for op, record_id, data in operations:
+            entry = {"op": op, "id": record_id}
+            if data is not None:
+                entry["data"] = data
+            lines.append(json.dumps(entry) + "\n")
+        with open(self.path, "ab") as f:
+            f.write("".join(lines).encode("utf-8"))
+            self.offset = f.tell()
+        self.entries += len(lines)
+
+    def replay(self, records: Dict[str, object], factory: Callable[[dict], object]) -> None:
+        """Apply every journaled operation to the records, in order.
+
+        Replay is idempotent, so a journal that survived a crash between a
+        snapshot write and its truncation can safely be applied again. A torn
+        final line left by an interrupted append is cut off so that later
+        appends start on a clean line.
+        """
+        self.entries = 0
+        self.offset = 0
+        for op, record_id, record in self.read_new(factory):
+            if op == "delete":
+                records.pop(record_id, None)
+            else:
+                records[record_id] = record
+
+    def read_new(self, factory: Callable[[dict], object]) -> List[Tuple[str, str, object]]:
+        """Return the ``(op, record_id, record)`` operations after ``offset`` and advance it.
+
+        Records are built with ``factory``; deletes carry None. A torn final
+        line is cut off, so callers must hold the collection's lock.
+        """
+        if not os.path.exists(self.path):
+            self.offset = 0
+            return []
+
+        operations = []
+        torn = False
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    torn = True
+                    break
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    torn = True
+                    break
+
+                data = entry.get("data")
+                operations.append(
+                    (entry["op"], entry["id"], None if entry["op"] == "delete" else factory(data))
+                )
+                self.offset += len(line)
+                self.entries += 1
+
+        if torn:
+            with open(self.path, "r+b") as f:
+                f.truncate(self.offset)
+        return operations
+
+    def clear(self) -> None:
+        """Discard all journaled operations once they are in a snapshot."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.entries = 0
+        self.offset = 0
+
+
+def _fsync_directory(directory: str) -> None:
+    """Flush a directory entry so a completed rename survives a crash."""
+    if not hasattr(os, "O_DIRECTORY"):
+        # Directories cannot be opened for fsync on Windows
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _backup_path(path: str, generation: int) -> str:
+    """Return the path of the given backup generation of a snapshot."""
+    return f"{path}.{generation}"
+
+
+def _rotate_backups(path: str, backups: int) -> None:
+    """Shift existing backups down one generation and back up the snapshot.
+
+    The snapshot is linked, or copied, rather than moved to the backup, so
+    it stays in place until the new one replaces it.
+    """
+    if backups <= 0 or not os.path.exists(path):
+        return
+    for generation in range(backups - 1, 0, -1):
+        older = _backup_path(path, generation)
+        if os.path.exists(older):
+            os.replace(older, _backup_path(path, generation + 1))
+    backup = _backup_path(path, 1)
+    temp_backup = backup + ".tmp"
+    if os.path.exists(temp_backup):
+        os.remove(temp_backup)
+    try:
+        os.link(path, temp_backup)
+    except OSError:
+        # Not every file system supports hard links
+        shutil.copy2(path, temp_backup)
+    os.replace(temp_backup, backup)
+
+
+def _pack_array(values: array) -> bytes:
+    """Return the little-endian bytes of an array."""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack_array(typecode: str, raw: memoryview, offset: int, count: int) -> Tuple[array, int]:
+    """Read ``count`` little-endian items of an array; return it and the next offset."""
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    if end > len(raw):
+        raise ValueError("Truncated binary snapshot")
+    values.frombytes(raw[offset:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, end
+
+
+def _column_type(values: List[object]) -> str:
+    """Pick the storage type of a column from the values it holds.
+
+    Strings are stored as one UTF-8 blob, integers and floats as packed
+    arrays, and any column mixing types, or holding integers too large for
+    64 bits, is stored as JSON.
+    """
+    kinds = {type(value) for value in values if value is not None}
+    if kinds <= {str}:
+        return "s"
+    if kinds == {int}:
+        if all(_INT64_MIN <= value <= _INT64_MAX for value in values if value is not None):
+            return "q"
+        return "j"
+    if kinds == {float}:
+        return "d"
+    return "j"
+
+
+def encode_binary_snapshot(data: List[dict], compress: bool = True) -> bytes:
+    """Encode records in the compact columnar binary snapshot format.
+
+    The layout is self-describing: the field names come from the records and
+    each field is stored as one column holding every record's value, with
+    the rows holding ``None`` (or lacking the field) listed separately. Text
+    values are joined by a control character none of them contains, so a
+    column decodes with a single split. The columns are zlib-compressed
+    unless ``compress`` is false.
+    """
+    names: Dict[str, None] = {}
+    for item in data:
+        names.update(dict.fromkeys(item))
+
+    parts = [struct.pack("<II", len(data), len(names))]
+    for name in names:
+        values = [item.get(name) for item in data]
+        kind = _column_type(values)
+        nulls = array("I", (row for row, value in enumerate(values) if value is None))
+        encoded_name = name.encode("utf-8")
+        if kind == "s":
+            texts = ["" if value is None else value for value in values]
+            joined = "".join(texts)
+            separator = next((char for char in _TEXT_SEPARATORS if char not in joined), None)
+            if separator is None:
+                kind = "j"
+        parts += [
+            struct.pack("<H", len(encoded_name)), encoded_name, kind.encode("ascii"),
+            struct.pack("<I", len(nulls)), _pack_array(nulls),
+        ]
+        if kind == "s":
+            blob = separator.join(texts).encode("utf-8")
+            parts += [separator.encode("ascii"), struct.pack("<Q", len(blob)), blob]
+        elif kind == "j":
+            blob = json.dumps(values).encode("utf-8")
+            parts += [struct.pack("<Q", len(blob)), blob]
+        else:
+            filled = (0 if value is None else value for value in values)
+            parts.append(_pack_array(array(kind, filled)))
+
+    payload = b"".join(parts)
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 1)
+        flags |= _FLAG_ZLIB
+    return BINARY_MAGIC + bytes([flags]) + payload
+
+
+def decode_binary_snapshot(raw: bytes) -> Iterator[dict]:
+    """Yield the records of a binary snapshot in order.
+
+    Raises ``ValueError`` if the data is not a valid binary snapshot.
+    """
+    if not raw.startswith(BINARY_MAGIC) or len(raw) <= len(BINARY_MAGIC):
+        raise ValueError("Not a binary snapshot")
+    flags = raw[len(BINARY_MAGIC)]
+    payload = raw[len(BINARY_MAGIC) + 1:]
+    try:
+        if flags & _FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+        view = memoryview(payload)
+        count, column_count = struct.unpack_from("<II", view, 0)
+        offset = 8
+        names = []
+        columns = []
+        for _ in range(column_count):
+            (name_length,) = struct.unpack_from("<H", view, offset)
+            offset += 2
+            names.append(bytes(view[offset:offset + name_length]).decode("utf-8"))
+            offset += name_length
+            kind = chr(view[offset])
+            offset += 1
+            (null_count,) = struct.unpack_from("<I", view, offset)
+            nulls, offset = _unpack_array("I", view, offset + 4, null_count)
+
+            if kind == "s":
+                separator = chr(view[offset])
+                (size,) = struct.unpack_from("<Q", view, offset + 1)
+                offset += 9
+                text = bytes(view[offset:offset + size]).decode("utf-8")
+                offset += size
+                values = text.split(separator) if count else []
+            elif kind == "j":
+                (size,) = struct.unpack_from("<Q", view, offset)
+                values = json.loads(bytes(view[offset + 8:offset + 8 + size]).decode("utf-8"))
+                offset += 8 + size
+            elif kind in ("q", "d"):
+                packed, offset = _unpack_array(kind, view, offset, count)
+                values = packed.tolist()
+            else:
+                raise ValueError(f"Unknown column type {kind!r}")
+
+            if len(values) != count:
+                raise ValueError("Column length does not match the record count")
+            for row in nulls:
+                values[row] = None
+            columns.append(values)
+    except (struct.error, zlib.error, IndexError) as error:
+        raise ValueError(f"Damaged binary snapshot: {error}") from error
+
+    for row in zip(*columns):
+        yield dict(zip(names, row))
+
+
+def write_snapshot(path: str, data: List[dict], backups: int = 0,
+                   snapshot_format: str = "json", search_fields=()) -> None:
+    """Durably replace the snapshot at the given path.
+
+    The data is written as JSON, in the compact ``"binary"`` format or in the
+    ``"mapped"`` format, which stores the search key built from
+    ``search_fields`` for every record and can be opened read-only with
+    MappedSnapshot without decoding it. It goes to a temporary file in the
+    same directory, is flushed to disk and atomically renamed over the
+    snapshot, so readers only ever see the old or the new contents in full.
+    When ``backups`` is positive the previous snapshot is kept as
+    ``<path>.1`` and older ones are shifted up to ``<path>.<backups>``.
+    """
+    if snapshot_format not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if snapshot_format == "binary":
+                f.write(encode_binary_snapshot(data))
+            elif snapshot_format == "mapped":
+                f.write(encode_mapped_snapshot(data, search_fields))
+            else:
+                text = io.TextIOWrapper(f, encoding="utf-8")
+                json.dump(data, text, indent=4)
+                text.flush()
+                text.detach()
+            f.flush()
+            os.fsync(f.fileno())
+        _rotate_backups(path, backups)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(directory)
+
+
+def iter_json_array(f: IO[str], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[object]:
+    """Yield the elements of the JSON array in a text file one at a time.
+
+    Only the element being decoded and one chunk of text are held in memory,
+    so a large snapshot never exists as a full list of dicts. Raises
+    ``ValueError`` if the file does not contain exactly one JSON array.
+    """
+    decoder = json.JSONDecoder()
+    skip_whitespace = _WHITESPACE.match
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        """Read another chunk, dropping text that has been consumed."""
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def next_char() -> str:
+        """Skip whitespace and return the next character, or "" at the end."""
+        nonlocal pos
+        while True:
+            pos = skip_whitespace(buffer, pos).end()
+            if pos < len(buffer) or not fill():
+                return buffer[pos:pos + 1]
+
+    if next_char() != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    if next_char() == "]":
+        pos += 1
+    else:
+        while True:
+            while True:
+                try:
+                    element, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # The element may continue in the next chunk
+                    if not fill():
+                        raise
+                    continue
+                if (isinstance(element, (int, float)) and
+                        (end == len(buffer) or buffer[end] not in _NUMBER_END) and fill()):
+                    # A number cut off at the end of the chunk decodes as its prefix
+                    continue
+                break
+            yield element
+
+            # Separators are handled inline; next_char only runs at chunk ends
+            pos = skip_whitespace(buffer, end).end()
+            separator = buffer[pos:pos + 1] or next_char()
+            pos += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise ValueError("Expected ',' or ']' in JSON array")
+            pos = skip_whitespace(buffer, pos).end()
+            if pos == len(buffer):
+                next_char()
+
+    if next_char():
+        raise ValueError("Extra data after JSON array")
+
+
+def read_snapshot(path: str, backups: int = 0, factory: Callable[[dict], object] = dict
+                  ) -> Optional[Tuple[Dict[str, object], str]]:
+    """Read a snapshot, falling back to its backups if it is damaged.
+
+    Binary and mapped snapshots are recognised by their first bytes; anything
+    else is parsed as JSON, incrementally. Each record is passed to ``factory`` as
+    soon as it is decoded. Returns the resulting records keyed by id
+    together with the path they were read from, or ``None`` when neither
+    the snapshot nor any backup exists. A snapshot that cannot be
+    decoded is moved aside to ``<path>.corrupt`` so that the next write does
+    not rotate it over a good backup.
+    """
+    candidates = [path] + [_backup_path(path, generation) for generation in range(1, backups + 1)]
+    for candidate in candidates:
+        if not os.path.exists(candidate):
+            continue
+        records: Dict[str, object] = {}
+        try:
+            with open(candidate, "rb") as f:
+                magic = f.read(len(MAPPED_MAGIC))
+                f.seek(0)
+                if magic.startswith(BINARY_MAGIC):
+                    items = decode_binary_snapshot(f.read())
+                elif magic == MAPPED_MAGIC:
+                    items = iter_mapped_snapshot(candidate)
+                else:
+                    items = iter_json_array(io.TextIOWrapper(f, encoding="utf-8"))
+                for item in items:
+                    records[item["id"]] = factory(item)
+            return records, candidate
+        except ValueError:
+            pass
+        if candidate == path:
+            os.replace(path, f"{path}.corrupt")
+    return None
+
+
+class StorageBackend:
+    """Interface for persisting the records of each collection.
+
+    Records are exchanged as plain dictionaries (the output of ``to_dict``)
+    so backends stay independent of the model classes.
+    """
+
+    def __init__(self):
+        """Initialize the backend."""
+        # Human readable problems found while loading, e.g. recovered files
+        self.warnings: List[str] = []
+
+    def load(self, name: str, factory: Callable[[dict], object] = dict) -> Dict[str, object]:
+        """Return every record of a collection keyed by id, in insertion order.
+
+        Each stored record is passed to ``factory`` as it is read, so callers
+        can build model objects without first holding every record as a dict.
+        """
+        raise NotImplementedError
+
+    def write(self, name: str, op: str, record_id: str, data: Optional[dict] = None) -> None:
+        """Persist a single ``add``, ``update`` or ``delete`` of a record."""
+        raise NotImplementedError
+
+    def write_batch(self, name: str, operations: List[Tuple[str, str, Optional[dict]]]) -> None:
+        """Persist several ``(op, record_id, data)`` mutations together, in order."""
+        for op, record_id, data in operations:
+            self.write(name, op, record_id, data)
+
+    def save(self, name: str, data: List[dict]) -> None:
+        """Replace the stored contents of a collection with the given records."""
+        raise NotImplementedError
+
+    def pending_writes(self, name: str) -> int:
+        """Return how many writes are not yet folded into a full snapshot."""
+        return 0
+
+    def needs_compaction(self, name: str, record_count: int) -> bool:
+        """Check whether the collection should be rewritten with ``save``."""
+        return False
+
+    def lock(self, name: str):
+        """Return a context manager excluding other processes from writing the collection.
+
+        Callers hold it around ``load``, ``write``, ``save`` and
+        ``read_changes`` so each sees the others' results in full.
+        """
+        return nullcontext()
+
+    def changed(self, name: str) -> bool:
+        """Check cheaply whether another process changed the collection since it was read."""
+        return False
+
+    def read_changes(self, name: str, factory: Callable[[dict], object] = dict
+                     ) -> Optional[List[Tuple[str, str, object]]]:
+        """Return the ``(op, record_id, record)`` changes other processes made since.
+
+        Returns None when the changes cannot be told apart, e.g. after the
+        collection was rewritten, and it must be loaded again in full.
+        """
+        return []
+
+    def open_mapped(self, name: str) -> Optional[MappedSnapshot]:
+        """Open a collection's mapped snapshot for read-only access, if it has one."""
+        raise NotImplementedError(f"{type(self).__name__} has no mapped snapshots")
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class JsonBackend(StorageBackend):
+    """Stores each collection as a snapshot plus a JSON Lines journal of mutations.
+
+    The journal is compacted back into the snapshot once it holds at least
+    ``compact_threshold`` entries and at least as many entries as the
+    collection has records, which keeps the amortised cost of a write
+    constant. Snapshots are replaced atomically and the previous
+    ``snapshot_backups`` generations are kept for recovery. They are written
+    as JSON (``students.json``), in the compact ``"binary"`` format
+    (``students.bin``) or in the ``"mapped"`` format (``students.map``) that
+    ``open_mapped`` serves without loading. Each collection keeps the format
+    its snapshot is in, JSON for new ones, unless ``snapshot_format`` is
+    given; snapshots in other formats are never removed by ``save``, and
+    the most recently written one is read on load.
+
+    Several processes may share the data directory: ``lock`` takes an
+    advisory lock on ``students.lock`` and so on, and changes made by others
+    are found by comparing the snapshot files' stat results and the journal
+    size with those seen last, so only their new journal entries are read.
+    """
+
+    def __init__(self, data_dir: str, compact_threshold: int = 1000, snapshot_backups: int = 1,
+                 snapshot_format: Optional[str] = None):
+        """Initialize the backend over the snapshot files in the data directory."""
+        super().__init__()
+        if snapshot_format is not None and snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(
+                f"Unknown snapshot format: {snapshot_format} "
+                f"(expected one of {', '.join(SNAPSHOT_FORMATS)})"
+            )
+        self.data_dir = data_dir
+        self.compact_threshold = compact_threshold
+        self.snapshot_backups = snapshot_backups
+        self.snapshot_format = snapshot_format
+        self._journals: Dict[str, Journal] = {}
+        # Format each collection's snapshot was found in, or None if it had none
+        self._formats: Dict[str, Optional[str]] = {}
+        # Collections whose snapshot was missing, recovered or in another format on load
+        self._unsaved: Set[str] = set()
+        self._mapped: List[MappedSnapshot] = []
+        self._locks: Dict[str, FileLock] = {}
+        # Signature of each collection's snapshots when last loaded or saved here
+        self._seen: Dict[str, tuple] = {}
+
+    def snapshot_path(self, name: str, snapshot_format: str = None) -> str:
+        """Return the path of a collection's snapshot in the given format or its write format."""
+        extension = SNAPSHOT_FORMATS[snapshot_format or self.write_format(name)]
+        return os.path.join(self.data_dir, f"{name}{extension}")
+
+    def write_format(self, name: str) -> str:
+        """Return the format a collection's snapshot is written in.
+
+        That is the configured format if one was given, else the format the
+        snapshot is in, else JSON.
+        """
+        if self.snapshot_format is not None:
+            return self.snapshot_format
+        if name not in self._formats:
+            self._formats[name] = self._stored_format(name)
+        return self._formats[name] or "json"
+
+    def _snapshot_paths(self, name: str) -> List[str]:
+        """Return the snapshot path of every format."""
+        return [self.snapshot_path(name, snapshot_format) for snapshot_format in SNAPSHOT_FORMATS]
+
+    def _stored_format(self, name: str) -> Optional[str]:
+        """Return the format of a collection's most recently written snapshot, if any."""
+        newest = None
+        newest_modified = -1
+        for snapshot_format in SNAPSHOT_FORMATS:
+            try:
+                modified = os.stat(self.snapshot_path(name, snapshot_format)).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if modified > newest_modified:
+                newest, newest_modified = snapshot_format, modified
+        return newest
+
+    def _journal(self, name: str) -> Journal:
+        """Return the journal of a collection."""
+        if name not in self._journals:
+            self._journals[name] = Journal(os.path.join(self.data_dir, f"{name}.journal.jsonl"))
+        return self._journals[name]
+
+    def lock(self, name: str) -> FileLock:
+        """Return the inter-process lock of a collection."""
+        if name not in self._locks:
+            self._locks[name] = FileLock(os.path.join(self.data_dir, f"{name}.lock"))
+        return self._locks[name]
+
+    def _signature(self, name: str) -> tuple:
+        """Return the inode, size and modification time of every snapshot of a collection.
+
+        Snapshots are replaced through a new file, so any rewrite changes it.
+        """
+        signature = []
+        for path in self._snapshot_paths(name):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
+
+    def changed(self, name: str) -> bool:
+        """Check whether the snapshots or the journal differ from what was last read."""
+        journal = self._journal(name)
+        try:
+            journal_size = os.path.getsize(journal.path)
+        except FileNotFoundError:
+            journal_size = 0
+        return journal_size != journal.offset or self._signature(name) != self._seen.get(name)
+
+    def read_changes(self, name: str, factory: Callable[[dict], object] = dict
+                     ) -> Optional[List[Tuple[str, str, object]]]:
+        """Return the journal entries others appended, or None if the snapshot was rewritten."""
+        if self._signature(name) != self._seen.get(name):
+            return None
+        journal = self._journal(name)
+        if os.path.exists(journal.path) and os.path.getsize(journal.path) < journal.offset:
+            return None
+        return journal.read_new(factory)
+
+    def load(self, name: str, factory: Callable[[dict], object] = dict) -> Dict[str, object]:
+        """Load the snapshot of a collection and replay its journal.
+
+        When snapshots exist in several formats, e.g. after switching
+        formats, the most recently written one is read, since the journal
+        continues from it. A snapshot that is not in the configured format,
+        if one was given, is reported through ``needs_compaction`` so the
+        caller rewrites it, as is a missing or recovered snapshot.
+        """
+        snapshot = None
+        rewrite = False
+        stored_format = self._stored_format(name)
+        formats = [stored_format] if stored_format is not None else []
+        formats += [other for other in SNAPSHOT_FORMATS if other != stored_format]
+        for snapshot_format in formats:
+            path = self.snapshot_path(name, snapshot_format)
+            snapshot_name = os.path.basename(path)
+            snapshot_existed = os.path.exists(path)
+            snapshot = read_snapshot(path, self.snapshot_backups, factory)
+
+            if snapshot_existed and not os.path.exists(path):
+                rewrite = True
+                self.warnings.append(
+                    f"{snapshot_name} was damaged and has been kept as {snapshot_name}.corrupt"
+                )
+            if snapshot is not None:
+                source = snapshot[1]
+                if source != path:
+                    rewrite = True
+                    self.warnings.append(f"Recovered {name} from backup {os.path.basename(source)}")
+                self._formats[name] = snapshot_format
+                if snapshot_format != self.write_format(name):
+                    rewrite = True
+                break
+        else:
+            self._formats[name] = None
+
+        records: Dict[str, object] = {} if snapshot is None else snapshot[0]
+        self._journal(name).replay(records, factory)
+        self._seen[name] = self._signature(name)
+
+        if snapshot is None or rewrite:
+            self._unsaved.add(name)
+        return records
+
+    def write(self, name: str, op: str, record_id: str, data: Optional[dict] = None) -> None:
+        """Append the mutation to the collection's journal."""
+        self._journal(name).append(op, record_id, data)
+
+    def write_batch(self, name: str, operations: List[Tuple[str, str, Optional[dict]]]) -> None:
+        """Append all the mutations to the collection's journal in one write."""
+        self._journal(name).extend(operations)
+
+    def save(self, name: str, data: List[dict]) -> None:
+        """Write a full snapshot of the collection and reset its journal.
+
+        Snapshots in other formats are left in place; being older, they are
+        not read instead of this one.
+        """
+        snapshot_format = self.write_format(name)
+        write_snapshot(self.snapshot_path(name, snapshot_format), data, self.snapshot_backups,
+                       snapshot_format, SEARCH_FIELDS.get(name, ()))
+        self._formats[name] = snapshot_format
+        self._journal(name).clear()
+        self._unsaved.discard(name)
+        self._seen[name] = self._signature(name)
+
+    def remove_other_snapshots(self, name: str) -> None:
+        """Remove a collection's snapshots, and their backups, in formats it is not written in."""
+        keep = self.write_format(name)
+        for snapshot_format in SNAPSHOT_FORMATS:
+            if snapshot_format == keep:
+                continue
+            path = self.snapshot_path(name, snapshot_format)
+            for old in [path] + [_backup_path(path, generation)
+                                 for generation in range(1, self.snapshot_backups + 1)]:
+                if os.path.exists(old):
+                    os.remove(old)
+        self._seen[name] = self._signature(name)
+
+    def pending_writes(self, name: str) -> int:
+        """Return the number of journal entries since the last snapshot."""
+        return self._journal(name).entries
+
+    def needs_compaction(self, name: str, record_count: int) -> bool:
+        """Check whether the journal has grown enough to fold into the snapshot.
+
+        Also true when the snapshot was missing or recovered on load.
+        """
+        if name in self._unsaved:
+            return True
+        entries = self.pending_writes(name)
+        return entries >= self.compact_threshold and entries >= record_count
+
+    def open_mapped(self, name: str) -> Optional[MappedSnapshot]:
+        """Map a collection's ``.map`` snapshot without loading it.
+
+        Returns None, with a warning, when there is no usable mapped snapshot.
+        Journaled changes are not applied, so a warning is also given when
+        the journal holds changes that are missing from the snapshot.
+        """
+        path = self.snapshot_path(name, "mapped")
+        snapshot_name = os.path.basename(path)
+        if not os.path.exists(path):
+            self.warnings.append(
+                f"{snapshot_name} not found; create it with 'university-manager convert mapped'"
+            )
+            return None
+        try:
+            snapshot = MappedSnapshot(path)
+        except ValueError as error:
+            self.warnings.append(str(error))
+            return None
+
+        journal = self._journal(name).path
+        if os.path.exists(journal) and os.path.getsize(journal):
+            self.warnings.append(
+                f"{name} has changes that are not in {snapshot_name}; "
+                f"update it with 'university-manager convert mapped'"
+            )
+        self._mapped.append(snapshot)
+        return snapshot
+
+    def close(self) -> None:
+        """Unmap any mapped snapshots that were opened and close the lock files."""
+        for snapshot in self._mapped:
+            snapshot.close()
+        self._mapped.clear()
+        for lock in self._locks.values():
+            lock.close()
+
+
+class SQLiteBackend(StorageBackend):
+    """Stores every collection as an indexed table in a SQLite database.
+
+    Each mutation is a single-row statement, so there is nothing to compact.
+    Insertion order is preserved through SQLite's implicit ``rowid``. The
+    connection may be used from several threads, one statement at a time.
+    Commits by other processes are detected through ``PRAGMA data_version``;
+    they cannot be attributed to a table, so every collection read before
+    is reported as changed and loaded again.
+    """
+
+    def __init__(self, path: str):
+        """Open (and if needed create) the database at the given path."""
+        super().__init__()
+        self.path = path
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(f"{path}.lock")
+        # data_version of the database when each collection was last loaded
+        self._seen: Dict[str, int] = {}
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            for name, columns in SCHEMA.items():
+                definitions = ", ".join(
+                    f"{column} {column_type}{' PRIMARY KEY' if column == 'id' else ''}"
+                    for column, column_type in columns
+                )
+                self._connection.execute(f"CREATE TABLE IF NOT EXISTS {name} ({definitions})")
+                for column in SQLITE_INDEXES[name]:
+                    self._connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{name}_{column} ON {name} ({column})"
+                    )
+
+    @staticmethod
+    def _columns(name: str) -> List[str]:
+        """Return the column names of a collection's table."""
+        return [column for column, _ in SCHEMA[name]]
+
+    def load(self, name: str, factory: Callable[[dict], object] = dict) -> Dict[str, object]:
+        """Read every row of the collection's table in insertion order."""
+        columns = self._columns(name)
+        with self._lock:
+            cursor = self._connection.execute(
+                f"SELECT {', '.join(columns)} FROM {name} ORDER BY rowid"
+            )
+            records = {row[0]: factory(dict(zip(columns, row))) for row in cursor}
+            self._seen[name] = self._data_version()
+            return records
+
+    def _data_version(self) -> int:
+        """Return a number that changes whenever another connection commits."""
+        with self._lock:
+            return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def lock(self, name: str) -> FileLock:
+        """Return the inter-process lock of the database, shared by every collection."""
+        return self._file_lock
+
+    def changed(self, name: str) -> bool:
+        """Check whether another connection has committed since the collection was loaded."""
+        return self._data_version() != self._seen.get(name)
+
+    def read_changes(self, name: str, factory: Callable[[dict], object] = dict) -> None:
+        """Return None: changes by others are found by loading the table again."""
+        return None
+
+    def write(self, name: str, op: str, record_id: str, data: Optional[dict] = None) -> None:
+        """Apply the mutation to the collection's table."""
+        self.write_batch(name, [(op, record_id, data)])
+
+    def write_batch(self, name: str, operations: List[Tuple[str, str, Optional[dict]]]) -> None:
+        """Apply all the mutations to the collection's table in one transaction."""
+        columns = self._columns(name)
+        with self._lock, self._connection:
+            for op, record_id, data in operations:
+                if op == "delete":
+                    self._connection.execute(f"DELETE FROM {name} WHERE id = ?", (record_id,))
+                elif op == "update":
+                    assignments = ", ".join(f"{column} = ?" for column in columns[1:])
+                    self._connection.execute(
+                        f"UPDATE {name} SET {assignments} WHERE id = ?",
+                        [data[column] for column in columns[1:]] + [record_id],
+                    )
+                else:
+                    self._connection.execute(
+                        f"INSERT OR REPLACE INTO {name} ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' for _ in columns)})",
+                        [data[column] for column in columns],
+                    )
+
+    def save(self, name: str, data: List[dict]) -> None:
+        """Replace every row of the collection's table in one transaction."""
+        columns = self._columns(name)
+        with self._lock, self._connection:
+            self._connection.execute(f"DELETE FROM {name}")
+            self._connection.executemany(
+                f"INSERT INTO {name} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                ([item[column] for column in columns] for item in data),
+            )
+
+    def open_mapped(self, name: str) -> None:
+        """Return None with a warning, as the database has no mapped snapshots."""
+        self.warnings.append(f"{name} cannot be mapped from a SQLite database")
+
+    def close(self) -> None:
+        """Close the database connection and the lock file."""
+        with self._lock:
+            self._connection.close()
+        self._file_lock.close()
+
+
+# Storage backends selectable by name
+BACKENDS = ("json", "sqlite")
+
+
+def create_backend(kind: Optional[str], data_dir: str, **options) -> StorageBackend:
+    """Create a storage backend by name.
+
+    When ``kind`` is not given it is read from the ``UNIVERSITY_MANAGER_BACKEND``
+    environment variable and defaults to ``json``. Extra keyword options, such
+    as ``snapshot_format``, are passed to the JSON backend.
+    """
+    kind = (kind or os.environ.get(BACKEND_ENV_VAR) or "json").lower()
+    if kind == "json":
+        return JsonBackend(data_dir, **options)
+    if kind == "sqlite":
+        return SQLiteBackend(os.path.join(data_dir, "university.db"))
+    raise ValueError(f"Unknown storage backend: {kind} (expected one of {', '.join(BACKENDS)})")
+
+
+def migrate_storage(source: StorageBackend, target: StorageBackend,
+                    names: Iterable[str] = tuple(SCHEMA)) -> Dict[str, int]:
+    """Copy every collection from one backend to another.
+
+    Returns the number of records copied per collection.
+    """
+    counts = {}
+    for name in names:
+        data = list(source.load(name).values())
+        target.save(name, data)
+        counts[name] = len(data)
+    return counts
@@ -0,0 +1,193 @@
+from array import array
+from typing import Dict, List, Optional
+
+from stats import ValueCounts
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional; filters fall back to plain loops
+    numpy = None
+
+
+# Numeric columns kept by StudentColumns, with their array type codes
+NUMERIC_COLUMNS = {"age": "i", "gpa": "d"}
+
+# Decimal places GPAs are counted at in their distribution, as displayed
+GPA_PRECISION = 2
+
+
+class StudentColumns:
+    """Columnar copy of the students' numeric fields for fast aggregates.
+
+    Ages and GPAs are kept in parallel typed arrays, one row per student, and
+    majors are dictionary-encoded as small integer codes into ``majors``.
+    Running totals per major and the distribution of every column are updated
+    on every change, so counts, averages, extremes and histograms cost one
+    step per distinct major or value rather than one per student.
+
+    Filters scan the arrays, vectorised with NumPy when it is installed. A
+    deleted row is filled with the last row, so row order is not insertion
+    order.
+    """
+
+    def __init__(self):
+        """Initialize an empty store."""
+        self._reset()
+
+    def _reset(self) -> None:
+        """Set up empty columns and totals."""
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.columns = {name: array(code) for name, code in NUMERIC_COLUMNS.items()}
+        self.major_codes = array("i")
+        # Distinct majors; a major's code is its position in this list
+        self.majors: List[str] = []
+        self._major_lookup: Dict[str, int] = {}
+        # Per major code: number of students and sum of every numeric column
+        self._counts: List[int] = []
+        self._sums = {name: [] for name in NUMERIC_COLUMNS}
+        # Distribution of every numeric column over all students
+        self.distributions = {
+            "age": ValueCounts(),
+            "gpa": ValueCounts(precision=GPA_PRECISION),
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def clear(self) -> None:
+        """Remove every student."""
+        self._reset()
+
+    def _major_code(self, major: Optional[str]) -> int:
+        """Return the code of a major, assigning one on first sight."""
+        major = major or ""
+        code = self._major_lookup.get(major)
+        if code is None:
+            code = self._major_lookup[major] = len(self.majors)
+            self.majors.append(major)
+            self._counts.append(0)
+            for sums in self._sums.values():
+                sums.append(0)
+        return code
+
+    def _tally(self, row: int, sign: int) -> None:
+        """Add a row to, or with ``sign=-1`` take it out of, the running totals."""
+        code = self.major_codes[row]
+        self._counts[code] += sign
+        for name, values in self.columns.items():
+            value = values[row]
+            self._sums[name][code] += sign * value
+            if sign > 0:
+                self.distributions[name].add(value)
+            else:
+                self.distributions[name].remove(value)
+
+    def add(self, student) -> None:
+        """Store a student's values, replacing any previous row with its id."""
+        values = {"age": int(student.age or 0), "gpa": float(student.gpa or 0.0)}
+        code = self._major_code(student.major)
+
+        row = self._rows.get(student.id)
+        if row is None:
+            row = self._rows[student.id] = len(self.ids)
+            self.ids.append(student.id)
+            for name, column in self.columns.items():
+                column.append(values[name])
+            self.major_codes.append(code)
+        else:
+            self._tally(row, -1)
+            for name, column in self.columns.items():
+                column[row] = values[name]
+            self.major_codes[row] = code
+        self._tally(row, 1)
+
+    def remove(self, student_id: str) -> None:
+        """Remove a student's row by moving the last row into its place."""
+        row = self._rows.pop(student_id, None)
+        if row is None:
+            return
+        self._tally(row, -1)
+
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[row] = self.ids[last]
+            self._rows[moved_id] = row
+            for column in self.columns.values():
+                column[row] = column[last]
+            self.major_codes[row] = self.major_codes[last]
+        self.ids.pop()
+        for column in self.columns.values():
+            column.pop()
+        self.major_codes.pop()
+
+    # Aggregates
+    def count(self, major: str = None) -> int:
+        """Return the number of students, optionally only those in one major."""
+        if major is None:
+            return len(self.ids)
+        code = self._major_lookup.get(major)
+        return 0 if code is None else self._counts[code]
+
+    def total(self, column: str, major: str = None) -> float:
+        """Return the sum of a numeric column, optionally for one major."""
+        sums = self._sums[column]
+        if major is None:
+            return sum(sums)
+        code = self._major_lookup.get(major)
+        return 0 if code is None else sums[code]
+
+    def mean(self, column: str, major: str = None) -> Optional[float]:
+        """Return the average of a numeric column, or None when there are no students."""
+        count = self.count(major)
+        return self.total(column, major) / count if count else None
+
+    def count_by_major(self) -> Dict[str, int]:
+        """Return the number of students in every major that has any."""
+        return {major: count for major, count in zip(self.majors, self._counts) if count}
+
+    def mean_by_major(self, column: str) -> Dict[str, float]:
+        """Return the average of a numeric column for every major, e.g. GPA per major."""
+        return {
+            major: total / count
+            for major, count, total in zip(self.majors, self._counts, self._sums[column])
+            if count
+        }
+
+    # Filters
+    def select(self, column: str, low: float = None, high: float = None,
+               major: str = None) -> List[str]:
+        """Return the ids of students whose column value lies in ``[low, high]``.
+
+        Either bound may be omitted, and ``major`` restricts the result to one
+        major. Ids are returned in row order.
+        """
+        code = None
+        if major is not None:
+            code = self._major_lookup.get(major)
+            if code is None:
+                return []
+
+        if numpy is not None:
+            # Views share the arrays' memory; they are dropped before returning
+            dtype = numpy.dtype(NUMERIC_COLUMNS[column])
+            values = numpy.frombuffer(self.columns[column], dtype=dtype)
+            mask = numpy.ones(len(values), dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            if code is not None:
+                mask &= numpy.frombuffer(self.major_codes, dtype=numpy.intc) == code
+            return [self.ids[row] for row in numpy.flatnonzero(mask).tolist()]
+
+        low = float("-inf") if low is None else low
+        high = float("inf") if high is None else high
+        values = self.columns[column]
+        if code is None:
+            return [self.ids[row] for row, value in enumerate(values) if low <= value <= high]
+        return [
+            self.ids[row]
+            for row, (value, value_code) in enumerate(zip(values, self.major_codes))
+            if value_code == code and low <= value <= high
+        ]
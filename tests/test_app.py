@@ -0,0 +1,59 @@
+import asyncio
+
+from app import StudentManagerApp
+from data_manager import DataManager
+from models import Student
+
+
+def run(app, scenario):
+    """Run a scenario against the app without a terminal."""
+    async def main():
+        async with app.run_test() as pilot:
+            await scenario(pilot)
+
+    asyncio.run(main())
+
+
+async def wait_until(pilot, condition):
+    """Let the app run until the condition holds, for up to five seconds."""
+    for _ in range(100):
+        if condition():
+            return
+        await pilot.pause(0.05)
+    raise AssertionError("timed out")
+
+
+def test_flushed_print_while_running(tmp_path):
+    data_manager = DataManager(str(tmp_path), write_policy="manual")
+    data_manager.add_student(Student("Ann", "Lee", 20, "Mathematics", 3.0))
+    app = StudentManagerApp(data_manager)
+
+    async def scenario(pilot):
+        print("captured", flush=True)
+        await pilot.press("s")
+        await wait_until(pilot, lambda: data_manager.unsaved_changes == 0)
+
+    run(app, scenario)
+
+
+def test_filtered_table_follows_edits(tmp_path):
+    data_manager = DataManager(str(tmp_path))
+    ann, bob = Student("Ann", "Lee", 20, "Art", 3.0), Student("Bob", "Ray", 20, "Art", 3.0)
+    data_manager.add_student(ann)
+    data_manager.add_student(bob)
+    app = StudentManagerApp(data_manager)
+    rows = []
+
+    async def scenario(pilot):
+        table = app.query_one("#students-table")
+        await pilot.click("#search-input")
+        await pilot.press(*"ann", "enter")
+        await wait_until(pilot, lambda: len(table.row_keys) == 1)
+        rows.append(list(table.row_keys))
+        data_manager.update_student(Student("Zed", "Lee", 20, "Art", 3.0, ann.id))
+        data_manager.update_student(Student("Annie", "Ray", 20, "Art", 3.0, bob.id))
+        await pilot.pause()
+        rows.append(list(table.row_keys))
+
+    run(app, scenario)
+    assert rows == [[ann.id], [bob.id]]
@@ -0,0 +1,99 @@
+import pytest
+
+from data_io import iter_columnar, read_records, write_records
+from mapped_snapshot import MappedSnapshot, encode_mapped_snapshot
+from models import Student
+from storage import (
+    SEARCH_FIELDS,
+    decode_binary_snapshot,
+    encode_binary_snapshot,
+    read_snapshot,
+    write_snapshot,
+)
+
+RECORDS = [
+    {"id": "s1", "first_name": "Ann", "last_name": "Lee", "age": 20, "major": "Économie",
+     "gpa": 3.25},
+    {"id": "s2", "first_name": "Bob", "last_name": None, "age": None, "major": "Physics",
+     "gpa": 0.0},
+    {"id": "s3", "first_name": "", "last_name": "Ray", "age": -7, "major": "Physics",
+     "gpa": None},
+]
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_binary_round_trip(compress):
+    assert list(decode_binary_snapshot(encode_binary_snapshot(RECORDS, compress))) == RECORDS
+
+
+def test_binary_round_trip_of_integers_beyond_64_bits():
+    records = [{"id": "a", "value": 2 ** 70}, {"id": "b", "value": -2 ** 63 - 1},
+               {"id": "c", "value": 1}]
+    assert list(decode_binary_snapshot(encode_binary_snapshot(records))) == records
+
+
+def test_binary_round_trip_of_empty_snapshot():
+    assert not list(decode_binary_snapshot(encode_binary_snapshot([])))
+
+
+@pytest.mark.parametrize("snapshot_format", ["json", "binary", "mapped"])
+def test_snapshot_formats_are_recognised_on_read(tmp_path, snapshot_format):
+    path = str(tmp_path / "students.snapshot")
+    write_snapshot(path, RECORDS, snapshot_format=snapshot_format,
+                   search_fields=SEARCH_FIELDS["students"])
+
+    records, source = read_snapshot(path)
+
+    assert source == path
+    assert list(records.values()) == RECORDS
+
+
+def test_mapped_snapshot_lookups_and_search(tmp_path):
+    path = tmp_path / "students.map"
+    path.write_bytes(encode_mapped_snapshot(RECORDS, SEARCH_FIELDS["students"]))
+
+    snapshot = MappedSnapshot(str(path))
+    try:
+        assert len(snapshot) == 3
+        assert [snapshot.record(index) for index in range(3)] == RECORDS
+        assert snapshot.index_of("s2") == 1
+        assert snapshot.index_of("missing") is None
+        # Matching ignores case and accents, and positions are in insertion order
+        assert list(snapshot.search("PHYS")) == [1, 2]
+        assert list(snapshot.search("econ")) == [0]
+        assert not list(snapshot.search("zzz"))
+        assert list(snapshot.search("")) == [0, 1, 2]
+    finally:
+        snapshot.close()
+
+
+def test_mapped_snapshot_rejects_empty_and_invalid_files(tmp_path):
+    empty = tmp_path / "empty.map"
+    empty.write_bytes(b"")
+    invalid = tmp_path / "invalid.map"
+    invalid.write_bytes(b"not a snapshot")
+
+    with pytest.raises(ValueError, match="empty"):
+        MappedSnapshot(str(empty))
+    with pytest.raises(ValueError, match="not a valid mapped snapshot"):
+        MappedSnapshot(str(invalid))
+
+
+@pytest.mark.parametrize("file_format", ["csv", "jsonl"])
+def test_export_and_import_round_trip(tmp_path, file_format):
+    students = [Student("Ann", "Lee", 20, "Économie", 3.25, "s1"),
+                Student("Bob", "Ray", 31, "Physics", 2.0, "s2")]
+    path = str(tmp_path / f"students.{file_format}")
+
+    assert write_records(students, path, Student) == 2
+
+    assert read_records(path, Student) == students
+
+
+def test_columnar_export_round_trip(tmp_path):
+    students = [Student("Ann", "Lee", 20, "Physics", 3.25, f"s{number}") for number in range(5)]
+    path = str(tmp_path / "students.cols")
+
+    write_records(students, path, Student, chunk_size=2)
+
+    assert [Student.from_dict(row) for row in iter_columnar(path)] == students
@@ -0,0 +1,188 @@
+import pytest
+
+from data_manager import CHANGE_RELOADED, ConflictError, DataManager
+from models import Faculty, Student
+
+
+def student(first_name, gpa=3.0, record_id=None):
+    return Student(first_name, "Lee", 20, "Mathematics", gpa, record_id)
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    manager = DataManager(str(tmp_path))
+    yield manager
+    manager.close()
+
+
+def reopen(tmp_path):
+    manager = DataManager(str(tmp_path))
+    try:
+        return [record.id for record in manager.get_all_students()]
+    finally:
+        manager.close()
+
+
+def test_changes_persist_across_sessions(tmp_path, data_manager):
+    ann, bob, cid = student("Ann"), student("Bob"), student("Cid")
+    for record in (ann, bob, cid):
+        data_manager.add_student(record)
+    data_manager.update_student(student("Anna", record_id=ann.id))
+    data_manager.delete_student(bob.id)
+
+    other = DataManager(str(tmp_path))
+    try:
+        assert [record.first_name for record in other.get_all_students()] == ["Anna", "Cid"]
+    finally:
+        other.close()
+
+
+def test_transaction_rollback_restores_records_and_order(tmp_path, data_manager):
+    ann, bob, cid = student("Ann"), student("Bob"), student("Cid")
+    for record in (ann, bob, cid):
+        data_manager.add_student(record)
+    changes = []
+    data_manager.subscribe(changes.append)
+
+    with pytest.raises(KeyError):
+        with data_manager.transaction():
+            data_manager.delete_student(ann.id)
+            data_manager.add_student(student("Ann", record_id=ann.id))
+            data_manager.update_student(student("Robert", record_id=bob.id))
+            data_manager.add_student(student("Dee"))
+            raise KeyError("abort")
+
+    assert data_manager.get_all_students() == [ann, bob, cid]
+    assert data_manager.search_students("robert") == []
+    assert reopen(tmp_path) == [ann.id, bob.id, cid.id]
+    assert [change.kind for change in changes] == [CHANGE_RELOADED]
+
+
+def test_transaction_commit_writes_net_changes(tmp_path, data_manager):
+    ann = student("Ann")
+    with data_manager.transaction():
+        data_manager.add_student(ann)
+        data_manager.update_student(student("Anna", record_id=ann.id))
+        data_manager.add_student(student("Bob"))
+        data_manager.delete_student(data_manager.get_all_students()[1].id)
+
+    assert reopen(tmp_path) == [ann.id]
+    assert data_manager.get_student_by_id(ann.id).first_name == "Anna"
+
+
+def test_stale_expected_record_raises_conflict(data_manager):
+    ann = student("Ann")
+    data_manager.add_student(ann)
+    data_manager.update_student(student("Anna", record_id=ann.id))
+
+    with pytest.raises(ConflictError):
+        data_manager.update_student(student("Annie", record_id=ann.id), expected=ann)
+    with pytest.raises(ConflictError):
+        data_manager.delete_student(ann.id, expected=ann)
+    assert data_manager.get_student_by_id(ann.id).first_name == "Anna"
+
+
+def test_change_by_another_session_raises_conflict(tmp_path, data_manager):
+    ann = student("Ann")
+    data_manager.add_student(ann)
+    other = DataManager(str(tmp_path))
+    try:
+        other.update_student(student("Anna", record_id=ann.id))
+    finally:
+        other.close()
+
+    with pytest.raises(ConflictError):
+        data_manager.update_student(student("Annie", record_id=ann.id), expected=ann)
+    # The other session's change was applied while checking
+    assert data_manager.get_student_by_id(ann.id).first_name == "Anna"
+
+
+@pytest.mark.parametrize("write_policy", ["interval", "manual"])
+def test_queued_change_overtaken_by_another_session_is_dropped(tmp_path, write_policy):
+    ann = student("Ann")
+    seed = DataManager(str(tmp_path))
+    seed.add_student(ann)
+    seed.close()
+
+    errors = []
+    # The change stays queued until flushed
+    manager = DataManager(str(tmp_path), write_policy=write_policy, flush_interval=60)
+    manager.on_write_error = errors.append
+    try:
+        manager.update_student(student("Anna", record_id=ann.id))
+        other = DataManager(str(tmp_path))
+        try:
+            other.delete_student(ann.id)
+        finally:
+            other.close()
+        manager.sync()
+        manager.flush()
+
+        assert manager.get_student_by_id(ann.id) is None
+        assert [type(error) for error in errors] == [ConflictError]
+    finally:
+        manager.close()
+    assert reopen(tmp_path) == []
+
+
+def test_background_writes_are_flushed(tmp_path):
+    manager = DataManager(str(tmp_path), background_writes=True, write_policy="manual")
+    try:
+        ann = student("Ann")
+        manager.add_student(ann)
+        assert manager.unsaved_changes == 1
+        assert reopen(tmp_path) == []
+        manager.flush()
+        assert reopen(tmp_path) == [ann.id]
+    finally:
+        manager.close()
+
+
+def test_sort_puts_missing_numbers_last(data_manager):
+    high, low, missing = student("High", 3.9), student("Low", 1.5), student("Missing", None)
+    for record in (missing, high, low):
+        data_manager.add_student(record)
+
+    assert data_manager.sorted_ids("students", "gpa") == [low.id, high.id, missing.id]
+    assert data_manager.sorted_ids("students", "gpa", descending=True) == [
+        missing.id, high.id, low.id
+    ]
+    unknown, old = Faculty("Arts", "B", "Kim", None, 5), Faculty("Science", "A", "Ray", 1901, 10)
+    data_manager.add_faculty(unknown)
+    data_manager.add_faculty(old)
+    assert data_manager.sorted_ids("faculties", "established_year") == [old.id, unknown.id]
+
+
+def test_search_matches_before_and_after_index_is_built(tmp_path, data_manager):
+    for number in range(50):
+        data_manager.add_student(student(f"Ann{number}"))
+    data_manager.add_student(student("Zoë"))
+    data_manager.close()
+
+    manager = DataManager(str(tmp_path))
+    try:
+        scanned = [record.id for record in manager.search_students("ann1")]
+        accented = manager.search_students("zoe")
+        manager.prefetch()
+        manager.update_student(student("Ann1x", record_id=accented[0].id))
+
+        assert [record.id for record in manager.search_students("ann1")] == scanned + [
+            accented[0].id
+        ]
+        assert manager.search_students("zoe") == []
+        assert len(scanned) == 11
+    finally:
+        manager.close()
+
+
+def test_sync_does_nothing_once_closed(tmp_path):
+    manager = DataManager(str(tmp_path), backend="sqlite")
+    manager.get_all_students()
+    manager.close()
+
+    assert not manager.sync()
+
+
+def test_read_only_needs_json_backend(tmp_path):
+    with pytest.raises(ValueError):
+        DataManager(str(tmp_path), backend="sqlite", read_only=True)
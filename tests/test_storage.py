@@ -0,0 +1,127 @@
+import json
+import os
+
+import pytest
+
+from storage import JsonBackend, SQLiteBackend, write_snapshot
+
+
+def student(record_id, first_name="Ann", gpa=3.5):
+    return {"id": record_id, "first_name": first_name, "last_name": "Lee", "age": 20,
+            "major": "Mathematics", "gpa": gpa}
+
+
+def test_journal_replays_on_top_of_snapshot(tmp_path):
+    backend = JsonBackend(str(tmp_path))
+    backend.save("students", [student("s1"), student("s2")])
+    backend.write("students", "update", "s1", student("s1", gpa=2.0))
+    backend.write("students", "delete", "s2")
+    backend.write_batch("students", [("add", "s3", student("s3")), ("add", "s4", student("s4"))])
+
+    records = JsonBackend(str(tmp_path)).load("students")
+
+    assert list(records) == ["s1", "s3", "s4"]
+    assert records["s1"]["gpa"] == 2.0
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    backend = JsonBackend(str(tmp_path), compact_threshold=2)
+    backend.save("students", [student("s1")])
+    backend.write("students", "add", "s2", student("s2"))
+    assert not backend.needs_compaction("students", 2)
+    backend.write("students", "update", "s1", student("s1", first_name="Bea"))
+    assert backend.needs_compaction("students", 2)
+
+    records = backend.load("students")
+    backend.save("students", list(records.values()))
+
+    assert backend.pending_writes("students") == 0
+    assert not os.path.exists(tmp_path / "students.journal.jsonl")
+    assert JsonBackend(str(tmp_path)).load("students") == records
+
+
+def test_torn_journal_line_is_cut_off(tmp_path):
+    backend = JsonBackend(str(tmp_path))
+    backend.save("students", [student("s1")])
+    backend.write("students", "add", "s2", student("s2"))
+    with open(tmp_path / "students.journal.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "id": "s3", "da')
+
+    backend = JsonBackend(str(tmp_path))
+    assert list(backend.load("students")) == ["s1", "s2"]
+    backend.write("students", "add", "s4", student("s4"))
+
+    assert list(JsonBackend(str(tmp_path)).load("students")) == ["s1", "s2", "s4"]
+
+
+def test_damaged_snapshot_is_recovered_from_backup(tmp_path):
+    backend = JsonBackend(str(tmp_path), snapshot_backups=1)
+    backend.save("students", [student("s1")])
+    backend.save("students", [student("s1"), student("s2")])
+    with open(tmp_path / "students.json", "w", encoding="utf-8") as f:
+        f.write("[{not json")
+
+    backend = JsonBackend(str(tmp_path), snapshot_backups=1)
+    records = backend.load("students")
+
+    assert list(records) == ["s1"]
+    assert os.path.exists(tmp_path / "students.json.corrupt")
+    assert any("backup" in warning for warning in backend.warnings)
+    # The recovered data is written back as the snapshot
+    assert backend.needs_compaction("students", len(records))
+
+
+def test_backup_keeps_snapshot_in_place(tmp_path):
+    write_snapshot(str(tmp_path / "students.json"), [student("s1")], backups=1)
+    write_snapshot(str(tmp_path / "students.json"), [student("s2")], backups=1)
+
+    with open(tmp_path / "students.json", encoding="utf-8") as f:
+        assert [item["id"] for item in json.load(f)] == ["s2"]
+    with open(tmp_path / "students.json.1", encoding="utf-8") as f:
+        assert [item["id"] for item in json.load(f)] == ["s1"]
+
+
+@pytest.mark.parametrize("snapshot_format, extension", [("binary", ".bin"), ("mapped", ".map")])
+def test_snapshot_format_on_disk_is_kept(tmp_path, snapshot_format, extension):
+    JsonBackend(str(tmp_path), snapshot_format=snapshot_format).save("students", [student("s1")])
+
+    backend = JsonBackend(str(tmp_path))
+    records = backend.load("students")
+    assert not backend.needs_compaction("students", len(records))
+    backend.save("students", list(records.values()) + [student("s2")])
+
+    assert sorted(os.listdir(tmp_path)) == [f"students{extension}", f"students{extension}.1"]
+    assert list(JsonBackend(str(tmp_path)).load("students")) == ["s1", "s2"]
+
+
+def test_explicit_format_switch_leaves_old_snapshot(tmp_path):
+    JsonBackend(str(tmp_path), snapshot_format="binary").save("students", [student("s1")])
+
+    backend = JsonBackend(str(tmp_path), snapshot_format="json")
+    records = backend.load("students")
+    assert backend.needs_compaction("students", len(records))
+    backend.save("students", list(records.values()) + [student("s2")])
+
+    assert os.path.exists(tmp_path / "students.bin")
+    # The newer JSON snapshot is read, with or without a configured format
+    backend = JsonBackend(str(tmp_path))
+    assert list(backend.load("students")) == ["s1", "s2"]
+    assert backend.write_format("students") == "json"
+
+
+def test_sqlite_round_trip(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "university.db"))
+    try:
+        backend.save("students", [student("s1"), student("s2")])
+        backend.write("students", "update", "s2", student("s2", gpa=1.5))
+        backend.write_batch("students", [("delete", "s1", None), ("add", "s3", student("s3"))])
+    finally:
+        backend.close()
+
+    backend = SQLiteBackend(str(tmp_path / "university.db"))
+    try:
+        records = backend.load("students")
+    finally:
+        backend.close()
+    assert list(records) == ["s2", "s3"]
+    assert records["s2"]["gpa"] == 1.5
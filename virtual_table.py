@@ -0,0 +1,316 @@
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence
+
+from rich.cells import cell_len
+from rich.segment import Segment
+from textual import events
+from textual.binding import Binding
+from textual.geometry import Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+
+# Cells longer than this are truncated so one value cannot widen a column forever
+MAX_COLUMN_WIDTH = 40
+
+# Appended to the header of the column the rows are sorted by
+SORT_ASCENDING_MARK = " ▲"
+SORT_DESCENDING_MARK = " ▼"
+
+
+class VirtualTable(ScrollView, can_focus=True):
+    """Row-cursor table that only renders the rows scrolled into view.
+
+    The table holds a list of row keys (record ids) and a fetch callback that
+    returns the cell texts for a key. Cells are fetched and formatted only for
+    the rows being drawn and kept in a small cache of recently drawn rows, so
+    showing hundreds of thousands of records costs one list of keys rather
+    than a formatted row each.
+
+    Clicking a column header posts HeaderSelected; the owner sorts the keys
+    and marks the column with ``set_sort``.
+    """
+
+    class HeaderSelected(Message):
+        """Posted when a column header is clicked."""
+
+        def __init__(self, table: "VirtualTable", column: int):
+            """Initialize with the table and the index of the clicked column."""
+            super().__init__()
+            self.table = table
+            self.column = column
+
+        @property
+        def control(self) -> "VirtualTable":
+            """The table whose header was clicked."""
+            return self.table
+
+    COMPONENT_CLASSES = {
+        "virtual-table--header",
+        "virtual-table--cursor",
+    }
+
+    DEFAULT_CSS = """
+    VirtualTable > .virtual-table--header {
+        text-style: bold;
+        background: $boost;
+    }
+
+    VirtualTable > .virtual-table--cursor {
+        background: $accent;
+        text-style: bold;
+    }
+    """
+
+    BINDINGS = [
+        Binding("up", "cursor_up", "Cursor Up", show=False),
+        Binding("down", "cursor_down", "Cursor Down", show=False),
+        Binding("pageup", "page_up", "Page Up", show=False),
+        Binding("pagedown", "page_down", "Page Down", show=False),
+        Binding("home", "cursor_first", "First Row", show=False),
+        Binding("end", "cursor_last", "Last Row", show=False),
+    ]
+
+    def __init__(self, *, buffer_rows: int = 50, name: str = None, id: str = None,
+                 classes: str = None):
+        """Initialize an empty table keeping ``buffer_rows`` off-screen rows cached."""
+        super().__init__(name=name, id=id, classes=classes)
+        self.buffer_rows = buffer_rows
+        self._columns: List[str] = []
+        self._widths: List[int] = []
+        self._keys: Sequence[str] = []
+        self._fetch: Callable[[str], Sequence[str]] = lambda key: ()
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._cursor_row = 0
+        self._sort_column: Optional[int] = None
+        self._sort_descending = False
+
+    # Contents
+    def add_columns(self, *labels: str) -> None:
+        """Add columns with the given header labels."""
+        self._columns.extend(labels)
+        self._widths.extend(min(cell_len(label), MAX_COLUMN_WIDTH) for label in labels)
+        self._update_virtual_size()
+
+    def set_sort(self, column: Optional[int], descending: bool = False) -> None:
+        """Mark the column the rows are sorted by in its header, or none."""
+        self._sort_column = column
+        self._sort_descending = descending
+        if column is not None:
+            width = min(cell_len(self._header_labels()[column]), MAX_COLUMN_WIDTH)
+            self._widths[column] = max(self._widths[column], width)
+            self._update_virtual_size()
+        self.refresh()
+
+    def _header_labels(self) -> List[str]:
+        """Return the column headers, with the sort mark on the sorted column."""
+        labels = list(self._columns)
+        if self._sort_column is not None:
+            mark = SORT_DESCENDING_MARK if self._sort_descending else SORT_ASCENDING_MARK
+            labels[self._sort_column] += mark
+        return labels
+
+    def set_rows(self, keys: Sequence[str], fetch: Callable[[str], Sequence[str]]) -> None:
+        """Show the rows with the given keys, fetching their cells on demand.
+
+        ``fetch`` receives a row key and returns the texts of its cells; it is
+        only called for rows that are about to be drawn. The keys are used as
+        is rather than copied, so a list must not be modified afterwards; any
+        other sequence, such as a lazy view of a mapped snapshot, is only
+        copied into a list when a row is added or removed.
+        """
+        self._keys = keys
+        self._fetch = fetch
+        self._cache.clear()
+        self._cursor_row = max(0, min(self._cursor_row, len(self._keys) - 1))
+        self._update_virtual_size()
+        self.refresh()
+
+    def add_row(self, key: str) -> None:
+        """Append a row without disturbing the cursor or scroll position."""
+        self._mutable_keys().append(key)
+        self._update_virtual_size()
+        self.refresh()
+
+    def remove_row(self, key: str) -> None:
+        """Remove a row, keeping the cursor on the same record where possible."""
+        try:
+            row = self._keys.index(key)
+        except ValueError:
+            return
+        del self._mutable_keys()[row]
+        self._cache.pop(key, None)
+
+        if row < self._cursor_row or self._cursor_row >= len(self._keys):
+            self._cursor_row = max(self._cursor_row - 1, 0)
+        if row < self.scroll_offset.y:
+            # Keep the rows on screen where they were
+            self.scroll_to(y=self.scroll_offset.y - 1, animate=False)
+        self._update_virtual_size()
+        self.refresh()
+
+    def _mutable_keys(self) -> List[str]:
+        """Return the row keys as a list, copying them the first time if needed."""
+        if not isinstance(self._keys, list):
+            self._keys = list(self._keys)
+        return self._keys
+
+    def clear(self) -> None:
+        """Remove every row, keeping the columns."""
+        self.set_rows([], self._fetch)
+
+    @property
+    def row_count(self) -> int:
+        """Number of rows in the table."""
+        return len(self._keys)
+
+    @property
+    def row_keys(self) -> Sequence[str]:
+        """Keys of all rows in display order."""
+        return self._keys
+
+    # Cursor
+    @property
+    def cursor_row(self) -> int:
+        """Index of the row under the cursor."""
+        return self._cursor_row
+
+    @property
+    def cursor_row_key(self) -> Optional[str]:
+        """Key of the row under the cursor, or None when the table is empty."""
+        if 0 <= self._cursor_row < len(self._keys):
+            return self._keys[self._cursor_row]
+        return None
+
+    def move_cursor(self, row: int) -> None:
+        """Move the cursor to a row and scroll it into view."""
+        self._cursor_row = max(0, min(row, len(self._keys) - 1))
+        self._scroll_cursor_into_view()
+        self.refresh()
+
+    def _visible_rows(self) -> int:
+        """Number of data rows that fit below the header."""
+        return max(self.scrollable_content_region.height - 1, 1)
+
+    def _scroll_cursor_into_view(self) -> None:
+        """Scroll vertically so the cursor row is visible."""
+        top = self.scroll_offset.y
+        visible = self._visible_rows()
+        if self._cursor_row < top:
+            self.scroll_to(y=self._cursor_row, animate=False)
+        elif self._cursor_row >= top + visible:
+            self.scroll_to(y=self._cursor_row - visible + 1, animate=False)
+
+    def action_cursor_up(self) -> None:
+        """Move the cursor up one row."""
+        self.move_cursor(self._cursor_row - 1)
+
+    def action_cursor_down(self) -> None:
+        """Move the cursor down one row."""
+        self.move_cursor(self._cursor_row + 1)
+
+    def action_page_up(self) -> None:
+        """Move the cursor up one page."""
+        self.move_cursor(self._cursor_row - self._visible_rows())
+
+    def action_page_down(self) -> None:
+        """Move the cursor down one page."""
+        self.move_cursor(self._cursor_row + self._visible_rows())
+
+    def action_cursor_first(self) -> None:
+        """Move the cursor to the first row."""
+        self.move_cursor(0)
+
+    def action_cursor_last(self) -> None:
+        """Move the cursor to the last row."""
+        self.move_cursor(len(self._keys) - 1)
+
+    def on_click(self, event: events.Click) -> None:
+        """Move the cursor to the clicked row, or report a clicked column header."""
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return
+        if offset.y == 0:
+            column = self._column_at(self.scroll_offset.x + offset.x)
+            if column is not None:
+                self.post_message(self.HeaderSelected(self, column))
+            return
+        row = self.scroll_offset.y + offset.y - 1
+        if row < len(self._keys):
+            self.move_cursor(row)
+
+    def _column_at(self, x: int) -> Optional[int]:
+        """Return the index of the column drawn at a horizontal position, if any."""
+        for index, width in enumerate(self._widths):
+            # Each cell is padded by a space on either side
+            x -= width + 2
+            if x < 0:
+                return index
+        return None
+
+    # Rendering
+    def _update_virtual_size(self) -> None:
+        """Size the scrollable area to the columns and every row plus the header."""
+        width = sum(self._widths) + 2 * len(self._widths)
+        self.virtual_size = Size(width, len(self._keys) + 1)
+
+    def _row_cells(self, row: int) -> List[str]:
+        """Return the cells of a row, fetching them if they are not cached."""
+        key = self._keys[row]
+        cells = self._cache.get(key)
+        if cells is not None:
+            self._cache.move_to_end(key)
+            return cells
+
+        cells = [str(cell) for cell in self._fetch(key)]
+        self._cache[key] = cells
+        if len(self._cache) > self.scrollable_content_region.height + self.buffer_rows:
+            self._cache.popitem(last=False)
+
+        widened = False
+        for index, cell in enumerate(cells[:len(self._widths)]):
+            width = min(cell_len(cell), MAX_COLUMN_WIDTH)
+            if width > self._widths[index]:
+                self._widths[index] = width
+                widened = True
+        if widened:
+            # Lines already drawn this frame used the old widths
+            self._update_virtual_size()
+            self.refresh()
+        return cells
+
+    def _format_cells(self, cells: Sequence[str]) -> str:
+        """Pad and join cells into one line of text."""
+        parts = []
+        for index, width in enumerate(self._widths):
+            cell = cells[index] if index < len(cells) else ""
+            if cell_len(cell) > width:
+                cell = cell[:width - 1] + "…"
+            parts.append(" " + cell + " " * (width - cell_len(cell)) + " ")
+        return "".join(parts)
+
+    def render_line(self, y: int) -> Strip:
+        """Render the header on the first line and data rows below it."""
+        width = self.scrollable_content_region.width
+        scroll_x, scroll_y = self.scroll_offset
+        if y == 0:
+            text = self._format_cells(self._header_labels())
+            style = self.get_component_rich_style("virtual-table--header")
+        else:
+            row = scroll_y + y - 1
+            if row >= len(self._keys):
+                return Strip.blank(width, self.rich_style)
+            text = self._format_cells(self._row_cells(row))
+            if row == self._cursor_row:
+                style = self.get_component_rich_style("virtual-table--cursor")
+            else:
+                style = self.rich_style
+
+        strip = Strip([Segment(text, style)]).crop(scroll_x, scroll_x + width)
+        return strip.extend_cell_length(width, style)
+
+    def refresh_row(self, key: str) -> None:
+        """Drop the cached cells of a row so it is fetched again when drawn."""
+        self._cache.pop(key, None)
+        self.refresh()
@@ -0,0 +1,96 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from typing import Optional
+
+
+# Seconds between checks when inotify is not available, and the longest a wait lasts
+WATCH_INTERVAL = 1.0
+
+# Seconds to let a burst of writes, e.g. a snapshot rename, finish before reporting it
+_SETTLE_DELAY = 0.05
+
+# inotify events meaning a file in the directory was written, replaced or removed
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_WATCHED_EVENTS = (
+    _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+)
+
+
+def _open_inotify(path: str) -> Optional[int]:
+    """Return an inotify descriptor watching a directory, or None if inotify is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(path), _WATCHED_EVENTS) < 0:
+        # E.g. the per-user watch limit is reached
+        os.close(fd)
+        return None
+    return fd
+
+
+class DataWatcher:
+    """Wait for files in a data directory to change.
+
+    On Linux the directory is watched with inotify, so ``wait`` returns as
+    soon as a file is written. Elsewhere, or if inotify cannot be set up,
+    ``wait`` sleeps for ``interval`` and reports a possible change every
+    time; the caller then compares file stats, as DataManager.sync does.
+    Either way the caller decides what actually changed. inotify does not
+    see writes made by other hosts on network file systems, so callers
+    sharing such a directory should compare stats after timeouts as well.
+    """
+
+    def __init__(self, path: str, interval: float = WATCH_INTERVAL):
+        """Start watching the directory at the given path."""
+        self.path = path
+        self.interval = interval
+        self._fd = _open_inotify(path)
+
+    @property
+    def polling(self) -> bool:
+        """Whether changes are found by polling rather than inotify."""
+        return self._fd is None
+
+    def wait(self) -> bool:
+        """Block until a file may have changed or ``interval`` passes.
+
+        Returns whether a file may have changed.
+        """
+        if self._fd is None:
+            time.sleep(self.interval)
+            return True
+        ready, _, _ = select.select([self._fd], [], [], self.interval)
+        if not ready:
+            return False
+        time.sleep(_SETTLE_DELAY)
+        self._drain()
+        return True
+
+    def _drain(self) -> None:
+        """Discard the queued inotify events."""
+        try:
+            while os.read(self._fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        """Stop watching."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,274 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Queued operations beyond which submitting waits for the writer to catch up
+MAX_PENDING_WRITES = 10_000
+
+# Seconds to wait before retrying after a write failed
+RETRY_DELAY = 1.0
+
+Operation = Tuple[str, str, Optional[dict]]
+
+
+class _Pending:
+    """Operations queued for one collection, with at most one update per record in a row."""
+
+    def __init__(self):
+        self.operations: List[Operation] = []
+        # Record id -> position of its last queued operation
+        self.positions: Dict[str, int] = {}
+
+    def add(self, operation: Operation) -> None:
+        """Queue an operation, folding an update into the queued add or update of the record."""
+        op, record_id, data = operation
+        position = self.positions.get(record_id)
+        if op == "update" and position is not None and self.operations[position][0] != "delete":
+            self.operations[position] = (self.operations[position][0], record_id, data)
+            return
+        self.positions[record_id] = len(self.operations)
+        self.operations.append(operation)
+
+    def discard(self, record_ids) -> int:
+        """Drop the queued operations on the given records; return how many were dropped."""
+        kept = [operation for operation in self.operations if operation[1] not in record_ids]
+        dropped = len(self.operations) - len(kept)
+        if dropped:
+            # Updated in place, as the writer may be about to write this list
+            self.operations[:] = kept
+            self.positions = {operation[1]: position for position, operation in enumerate(kept)}
+        return dropped
+
+
+class BackgroundWriter:
+    """Writes queued changes from a thread of its own, so callers never wait for the disk.
+
+    Operations are queued per collection with ``submit`` and handed to
+    ``write(name, operations)`` in batches; repeated updates of a record
+    still queued are written once. ``discard`` drops the operations on some
+    records that are queued, or about to be written, e.g. because another
+    process changed them first.
+
+    Queued operations are written at once, or, with a ``delay``, once the
+    oldest has waited that many seconds or ``flush_after`` are queued, so
+    bursts of changes are written together. With ``delay=None`` they are
+    only written by ``flush`` and ``close``. Once ``max_pending`` operations
+    are queued, they are written at once and ``wait_for_room`` waits for the
+    writer to catch up, except with ``delay=None``. A failed write is passed
+    to ``on_error`` and retried after ``RETRY_DELAY`` seconds, keeping its
+    operations ahead of newer ones.
+    """
+
+    def __init__(self, write: Callable[[str, List[Operation]], None],
+                 max_pending: int = MAX_PENDING_WRITES,
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 delay: Optional[float] = 0.0, flush_after: Optional[int] = None):
+        """Start the writer thread."""
+        self._write = write
+        self.max_pending = max_pending
+        self.on_error = on_error
+        self.delay = delay
+        self.flush_after = flush_after
+        self._pending: Dict[str, _Pending] = {}
+        self._count = 0  # Operations queued
+        self._queued_at = 0.0  # When the oldest queued operation was queued
+        self._flushing = 0  # Callers waiting in flush, which writes everything at once
+        self._calls: List[list] = []  # [function, result, error, done] to run on the thread
+        self._busy = False  # A batch is being written
+        self._writing: Optional[Tuple[str, _Pending]] = None  # Collection and batch being written
+        self._error: Optional[Exception] = None  # Last write failure, cleared by a success
+        self._failures = 0
+        self._last_failure: Optional[Exception] = None  # Kept for flush after a retry succeeds
+        self._closing = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="background-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        """Number of operations waiting to be written."""
+        return self._count
+
+    def wait_for_room(self) -> None:
+        """Wait while ``max_pending`` operations are queued, unless writes are failing.
+
+        Call it before taking any lock the ``write`` function needs.
+        """
+        if self.delay is None or threading.current_thread() is self._thread:
+            return
+        with self._condition:
+            while self._count >= self.max_pending and self._error is None and not self._closing:
+                self._condition.wait()
+
+    def submit(self, name: str, operations: List[Operation]) -> None:
+        """Queue operations on a collection; never waits."""
+        with self._condition:
+            if self._closing:
+                raise RuntimeError("The background writer is closed")
+            if not self._pending:
+                self._queued_at = time.monotonic()
+            pending = self._pending.get(name)
+            if pending is None:
+                pending = self._pending[name] = _Pending()
+            before = len(pending.operations)
+            for operation in operations:
+                pending.add(operation)
+            self._count += len(pending.operations) - before
+            self._condition.notify_all()
+
+    def queued(self, name: str, record_ids: Iterable[str]) -> Set[str]:
+        """Return which of the given records have operations queued and not yet being written."""
+        with self._condition:
+            pending = self._pending.get(name)
+            if pending is None:
+                return set()
+            return {record_id for record_id in record_ids if record_id in pending.positions}
+
+    def discard(self, name: str, record_ids) -> None:
+        """Drop the operations on some records of a collection, queued or about to be written.
+
+        The caller must keep the batch being written from reaching the disk
+        meanwhile, e.g. by holding a lock ``write`` takes before writing.
+        """
+        with self._condition:
+            pending = self._pending.get(name)
+            if pending is not None:
+                self._count -= pending.discard(record_ids)
+                if not pending.operations:
+                    del self._pending[name]
+            if self._writing is not None and self._writing[0] == name:
+                self._writing[1].discard(record_ids)
+            self._condition.notify_all()
+
+    def call(self, function: Callable[[], object]):
+        """Run a function on the writer thread between writes and return its result.
+
+        Queued operations that are not due yet are left queued.
+        """
+        if threading.current_thread() is self._thread:
+            return function()
+        call = [function, None, None, threading.Event()]
+        with self._condition:
+            if self._closing:
+                raise RuntimeError("The background writer is closed")
+            self._calls.append(call)
+            self._condition.notify_all()
+        call[3].wait()
+        error = call[2]
+        if isinstance(error, BaseException):
+            raise error
+        return call[1]
+
+    def flush(self, timeout: float = None) -> None:
+        """Wait until every queued operation is written.
+
+        Raises the error if a write fails meanwhile, and TimeoutError if
+        ``timeout`` seconds pass first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            failures = self._failures
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                while self._pending or self._busy:
+                    # Set together with the failure count, so never None here
+                    error = self._last_failure
+                    if self._failures != failures and isinstance(error, Exception):
+                        raise error
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"{self._count} changes are still waiting to be written")
+                    self._condition.wait(remaining)
+            finally:
+                self._flushing -= 1
+
+    def _due(self) -> Optional[float]:
+        """Return the seconds until the queued operations are due; None if only a flush is."""
+        if self._flushing or self._closing:
+            return 0.0
+        if self.delay is None:
+            return None
+        if self._count >= min(self.max_pending, self.flush_after or self.max_pending):
+            return 0.0
+        return self._queued_at + self.delay - time.monotonic()
+
+    def close(self, timeout: float = None) -> None:
+        """Write everything queued and stop the thread; raise if that fails."""
+        try:
+            self.flush(timeout)
+        finally:
+            with self._condition:
+                self._closing = True
+                self._condition.notify_all()
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        """Run queued calls and write queued batches when due, until closed."""
+        while True:
+            with self._condition:
+                while not self._calls and not self._closing:
+                    due = self._due() if self._pending else None
+                    if due is not None and due <= 0:
+                        break
+                    self._condition.wait(due)
+                if self._closing and (not self._pending or self._error is not None):
+                    for call in self._calls:
+                        call[2] = RuntimeError("The background writer is closed")
+                        call[3].set()
+                    return
+                if self._calls:
+                    batch = None
+                    call = self._calls.pop(0)
+                else:
+                    name = next(iter(self._pending))
+                    batch = self._pending.pop(name)
+                    self._count -= len(batch.operations)
+                    self._busy = True
+                    self._writing = (name, batch)
+                    call = None
+                    # Let callers waiting for room queue more while this batch is written
+                    self._condition.notify_all()
+
+            if call is not None:
+                try:
+                    call[1] = call[0]()
+                except Exception as error:  # pylint: disable=broad-except
+                    call[2] = error
+                call[3].set()
+                continue
+
+            try:
+                self._write(name, batch.operations)
+            except Exception as error:  # pylint: disable=broad-except
+                self._requeue(name, batch, error)
+                if self.on_error is not None:
+                    self.on_error(error)
+                retry = time.monotonic() + RETRY_DELAY
+                with self._condition:
+                    while not self._closing and time.monotonic() < retry:
+                        self._condition.wait(retry - time.monotonic())
+            else:
+                with self._condition:
+                    self._busy = False
+                    self._writing = None
+                    self._error = None
+                    self._condition.notify_all()
+
+    def _requeue(self, name: str, batch: _Pending, error: Exception) -> None:
+        """Put a failed batch back in front of whatever was queued since."""
+        with self._condition:
+            newer = self._pending.pop(name, None)
+            if newer is not None:
+                self._count -= len(newer.operations)
+                for operation in newer.operations:
+                    batch.add(operation)
+            self._count += len(batch.operations)
+            # Retry it first
+            self._pending = {name: batch, **self._pending}
+            self._busy = False
+            self._writing = None
+            self._error = self._last_failure = error
+            self._failures += 1
+            self._condition.notify_all()